@@ -0,0 +1,205 @@
+"""
+Caching helpers for Movie Booking SDK
+In-memory LRU caches, a byte-bounded disk cache and single-flight request collapsing
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class LRUCache:
+    """Bounded least-recently-used cache with optional per-entry expiry"""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl  # default lifetime in seconds, None = until evicted
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value, or default if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        """Cache a value until expires_at (epoch seconds) or the default TTL"""
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """Remove a key if present"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries"""
+        self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > time.time())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Cache size and hit/miss counters"""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+class DiskLRUCache:
+    """Directory of cached files evicted least-recently-used by total bytes
+
+    The in-memory index is rebuilt from the directory (oldest mtime first)
+    when the cache is created, so entries survive restarts.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Index files already on disk"""
+        files = []
+        for path in self.directory.iterdir():
+            if path.is_file() and not path.name.endswith(".tmp"):
+                stat = path.stat()
+                files.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.total_bytes += size
+        self._evict()
+
+    def path_for(self, key: str) -> Path:
+        """Location of a cache entry"""
+        return self.directory / key
+
+    def temp_path_for(self, key: str) -> Path:
+        """Scratch location to render an entry into before put()"""
+        return self.directory / f"{key}.{os.getpid()}.tmp"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the cached file for key, marking it recently used"""
+        if key not in self._entries:
+            self.misses += 1
+            return None
+
+        path = self.path_for(key)
+        if not path.exists():
+            # Removed behind our back (e.g. by another worker's eviction)
+            self.total_bytes -= self._entries.pop(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return path
+
+    def put(self, key: str, source: Path) -> Path:
+        """Move a rendered file into the cache and evict to stay in budget"""
+        path = self.path_for(key)
+        os.replace(source, path)
+
+        if key in self._entries:
+            self.total_bytes -= self._entries[key]
+        self._entries[key] = path.stat().st_size
+        self._entries.move_to_end(key)
+        self.total_bytes += self._entries[key]
+        self._evict(keep=key)
+        return path
+
+    def purge(self, prefix: str) -> int:
+        """Remove every entry whose key starts with prefix, including other workers' files"""
+        removed = 0
+        for path in self.directory.glob(f"{prefix}*"):
+            if path.name.endswith(".tmp"):
+                continue
+            if path.name in self._entries:
+                self.total_bytes -= self._entries.pop(path.name)
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def _evict(self, keep: Optional[str] = None):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self.total_bytes -= size
+            self.evictions += 1
+            self.path_for(key).unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Cache occupancy and hit/miss counters"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func once per key; concurrent callers await the same result"""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.shared += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
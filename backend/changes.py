@@ -0,0 +1,185 @@
+"""
+Movie change log for Movie Booking SDK
+Every movie write bumps the movie's version and records which theaters,
+formats and time slots were added, modified or removed, so polling
+clients can fetch the changes since the version they hold instead of the
+whole configuration
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from .database import find_one_and_update, insert_document, find_documents, delete_documents
+from .events import event_broker
+
+# Change log configuration
+MOVIE_CHANGE_RETENTION = int(os.environ.get("MOVIE_CHANGE_RETENTION", "500"))  # versions kept per movie
+MOVIE_CHANGE_LOG_GRACE_SECONDS = float(os.environ.get("MOVIE_CHANGE_LOG_GRACE_SECONDS", "10"))  # write to log insert
+
+# Movie fields that are bookkeeping or derived, not content
+UNTRACKED_FIELDS = {"_id", "id", "theaters", "version", "updated_at", "search_prefixes", "title_key",
+                    "image_placeholders"}
+
+def slot_key(slot) -> str:
+    """Identity of a time slot within its format: its date and start time"""
+    slot = slot if isinstance(slot, dict) else {"time": str(slot)}
+    start = f"{slot['minutes']:04d}" if slot.get("minutes") is not None else slot.get("time")
+    return f"{slot.get('date') or '*'}@{start}"
+
+def changed_fields(before: dict, after: dict, exclude=frozenset()) -> Dict[str, object]:
+    """Fields whose value differs, with their new value (None when removed)"""
+    return {
+        field: after.get(field)
+        for field in set(before) | set(after)
+        if field not in exclude and before.get(field) != after.get(field)
+    }
+
+def diff_keyed(before: List[dict], after: List[dict], key):
+    """(added, removed, [(old, new)] present in both) of two lists keyed by key(item)"""
+    old = {key(item): item for item in before}
+    new = {key(item): item for item in after}
+    added = [item for item_key, item in new.items() if item_key not in old]
+    removed = [item for item_key, item in old.items() if item_key not in new]
+    common = [(old[item_key], item) for item_key, item in new.items() if item_key in old]
+    return added, removed, common
+
+def diff_movie(before: dict, after: dict) -> List[dict]:
+    """Change operations turning one version of a movie into the next
+
+    Theaters are matched by id, formats by category_id and slots by date
+    and start time; each operation carries only the part that changed.
+    """
+    changes = []
+    fields = changed_fields(before, after, UNTRACKED_FIELDS)
+    if fields:
+        changes.append({"op": "update", "kind": "movie", "value": fields})
+
+    added, removed, common = diff_keyed(before.get("theaters") or [], after.get("theaters") or [],
+                                        lambda theater: theater.get("id"))
+    changes += [{"op": "add", "kind": "theater", "theater_id": theater.get("id"), "value": theater} for theater in added]
+    changes += [{"op": "remove", "kind": "theater", "theater_id": theater.get("id")} for theater in removed]
+
+    for old_theater, theater in common:
+        theater_id = theater.get("id")
+        fields = changed_fields(old_theater, theater, {"formats"})
+        if fields:
+            changes.append({"op": "update", "kind": "theater", "theater_id": theater_id, "value": fields})
+
+        added, removed, formats = diff_keyed(old_theater.get("formats") or [], theater.get("formats") or [],
+                                             lambda format_info: format_info.get("category_id"))
+        changes += [
+            {"op": "add", "kind": "format", "theater_id": theater_id,
+             "category_id": format_info.get("category_id"), "value": format_info}
+            for format_info in added
+        ]
+        changes += [
+            {"op": "remove", "kind": "format", "theater_id": theater_id, "category_id": format_info.get("category_id")}
+            for format_info in removed
+        ]
+
+        for old_format, format_info in formats:
+            category_id = format_info.get("category_id")
+            fields = changed_fields(old_format, format_info, {"times"})
+            if fields:
+                changes.append({"op": "update", "kind": "format", "theater_id": theater_id,
+                                "category_id": category_id, "value": fields})
+
+            added, removed, slots = diff_keyed(old_format.get("times") or [], format_info.get("times") or [], slot_key)
+            location = {"theater_id": theater_id, "category_id": category_id}
+            changes += [{"op": "add", "kind": "slot", **location, "slot": slot_key(slot), "value": slot} for slot in added]
+            changes += [{"op": "remove", "kind": "slot", **location, "slot": slot_key(slot)} for slot in removed]
+            changes += [
+                {"op": "update", "kind": "slot", **location, "slot": slot_key(slot), "value": slot}
+                for old_slot, slot in slots if old_slot != slot
+            ]
+
+    return changes
+
+async def update_movie(movie_id: str, update_dict: dict) -> Optional[dict]:
+    """Apply a $set to a movie, bump its version and log what changed
+
+    The pre-image comes back from the same atomic update, so the logged
+    diff is exact even with concurrent writers. Returns the movie after
+    the update, or None if it doesn't exist. Movies stored before
+    versioning count as version 1, as they do for readers.
+    """
+    update_dict["updated_at"] = datetime.utcnow()
+    update = {"$set": update_dict, "$inc": {"version": 1}}
+    before = await find_one_and_update(
+        "movie_configurations", {"id": movie_id, "version": {"$exists": True}}, update,
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        before = await find_one_and_update(
+            "movie_configurations", {"id": movie_id, "version": {"$exists": False}},
+            {"$set": {**update_dict, "version": 2}},
+            return_document=ReturnDocument.BEFORE
+        )
+    if before is None:
+        # Versioned by a concurrent writer between the two attempts
+        before = await find_one_and_update(
+            "movie_configurations", {"id": movie_id, "version": {"$exists": True}}, update,
+            return_document=ReturnDocument.BEFORE
+        )
+    if before is None:
+        return None
+
+    after = {**before, **update_dict, "version": before.get("version", 1) + 1}
+    entry = {
+        "movie_id": movie_id,
+        "version": after["version"],
+        "changes": diff_movie(before, after),
+        "changed_at": update_dict["updated_at"]
+    }
+    await insert_document("movie_changes", entry)
+    event_broker.publish_change(entry)
+    await delete_documents("movie_changes", {
+        "movie_id": movie_id, "version": {"$lte": after["version"] - MOVIE_CHANGE_RETENTION}
+    })
+    after.pop("_id", None)
+    return after
+
+async def changes_since(movie_id: str, since: int, version: int,
+                        updated_at: Optional[datetime] = None) -> Optional[List[dict]]:
+    """A movie's logged changes after since, oldest first
+
+    None when the log can't bridge since to the movie's version (entries
+    compacted away, a version the movie never had, or one never logged),
+    in which case the client needs a full snapshot. The list stops before
+    any version not yet logged, i.e. a concurrent write between its version
+    bump and its log insert, so clients resume from the last version
+    returned. updated_at is the movie's last write, used to tell the two
+    apart when nothing after since is logged yet.
+    """
+    if since > version:
+        return None
+    if since == version:
+        return []
+
+    entries = await find_documents(
+        "movie_changes", {"movie_id": movie_id, "version": {"$gt": since}},
+        version - since, sort=[("version", 1)], projection={"_id": 0, "movie_id": 0}
+    )
+    if not entries or entries[0]["version"] != since + 1:
+        # Version 1 (creation) is never logged
+        compacted = since < 1 or since + 1 <= version - MOVIE_CHANGE_RETENTION
+        written_at = entries[0].get("changed_at") if entries else updated_at
+        if compacted or written_at is None:
+            return None
+        if datetime.utcnow() - written_at > timedelta(seconds=MOVIE_CHANGE_LOG_GRACE_SECONDS):
+            return None
+        return []
+
+    contiguous = [entries[0]]
+    for entry in entries[1:]:
+        if entry["version"] != contiguous[-1]["version"] + 1:
+            break
+        contiguous.append(entry)
+    return contiguous
+
+async def remove_movie_changes(movie_id: str) -> int:
+    """Drop a deleted movie's change log"""
+    return await delete_documents("movie_changes", {"movie_id": movie_id})
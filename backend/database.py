@@ -3,6 +3,7 @@ from typing import Optional, List, Dict, Any
 import os
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 import logging
 
 logger = logging.getLogger(__name__)
@@ -52,18 +53,66 @@ async def create_indexes():
         await db.movie_configurations.create_index("movie_title")
         await db.movie_configurations.create_index("is_active")
         await db.movie_configurations.create_index([("client_id", 1), ("is_active", 1)])
+        await db.movie_configurations.create_index(
+            [("movie_title", "text"), ("movie_subtitle", "text"), ("director", "text"),
+             ("cast", "text"), ("genre", "text"), ("film_details.logline", "text")],
+            weights={"movie_title": 10, "movie_subtitle": 5, "director": 5, "cast": 3, "genre": 2},
+            name="movie_text"
+        )
+        await db.movie_configurations.create_index([("search_prefixes", 1), ("movie_title", 1)])
+        await db.movie_configurations.create_index("title_key")
+        
+        # Movie change log indexes
+        await db.movie_changes.create_index([("movie_id", 1), ("version", 1)], unique=True)
         
         # Clients indexes
         await db.clients.create_index("email", unique=True)
         await db.clients.create_index("is_active")
+        await db.clients.create_index("id")
         
         # Theater locations indexes
         await db.theater_locations.create_index([("city", 1), ("state", 1)])
         await db.theater_locations.create_index("chain")
+        await db.theater_locations.create_index("id", unique=True)
+        await db.theater_locations.create_index([("movie_id", 1), ("location", "2dsphere")])
+        
+        # Users indexes
+        await db.users.create_index("username")
+        await db.users.create_index("email")
+        
+        # API keys indexes
+        await db.api_keys.create_index("key_hash")
+        await db.api_keys.create_index("client_id")
+        
+        # Revoked access tokens, dropped once the token expires
+        await db.revoked_tokens.create_index("digest", unique=True)
+        await db.revoked_tokens.create_index("expires_at", expireAfterSeconds=0)
         
         # Image assets indexes
         await db.image_assets.create_index("category")
+        await db.image_assets.create_index("client_id")
         await db.image_assets.create_index("uploaded_at")
+        await db.image_assets.create_index("content_hash")
+        await db.image_assets.create_index("url")
+        await db.image_assets.create_index("source_key", unique=True, sparse=True)
+        await db.image_blobs.create_index("sha256", unique=True)
+        
+        # Background jobs indexes
+        await db.jobs.create_index("id", unique=True)
+        await db.jobs.create_index([("status", 1), ("run_at", 1)])
+        await db.jobs.create_index([("status", 1), ("lease_expires_at", 1)])
+        await db.jobs.create_index("expires_at", expireAfterSeconds=0)
+        
+        # Showtime read model indexes
+        await db.showtimes.create_index("id", unique=True)
+        await db.showtimes.create_index([("movie_id", 1), ("starts_at", 1)])
+        await db.showtimes.create_index([("is_active", 1), ("starts_at", 1), ("id", 1)])
+        await db.showtimes.create_index([("is_active", 1), ("city_key", 1), ("starts_at", 1), ("id", 1)])
+        await db.showtimes.create_index([("is_active", 1), ("state", 1), ("starts_at", 1), ("id", 1)])
+        await db.showtimes.create_index([("is_active", 1), ("zip_code", 1), ("starts_at", 1), ("id", 1)])
+        
+        # Periodic task leases
+        await db.task_leases.create_index("id", unique=True)
         
         # Customization presets indexes
         await db.customization_presets.create_index("category")
@@ -94,21 +143,25 @@ async def insert_document(collection: str, document: dict) -> str:
     result = await db[collection].insert_one(document)
     return str(result.inserted_id)
 
-async def find_document(collection: str, filter_dict: dict) -> Optional[dict]:
+async def find_document(collection: str, filter_dict: dict, projection: Optional[dict] = None) -> Optional[dict]:
     """Find a single document"""
     db = database.db
-    document = await db[collection].find_one(filter_dict)
+    document = await db[collection].find_one(filter_dict, projection)
     if document:
         return convert_object_id(document)
     return None
 
-async def find_documents(collection: str, filter_dict: dict = None, limit: int = 100) -> List[dict]:
+async def find_documents(collection: str, filter_dict: dict = None, limit: int = 100,
+                         sort: Optional[list] = None, projection: Optional[dict] = None) -> List[dict]:
     """Find multiple documents"""
     db = database.db
     if filter_dict is None:
         filter_dict = {}
     
-    cursor = db[collection].find(filter_dict).limit(limit)
+    cursor = db[collection].find(filter_dict, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    cursor = cursor.limit(limit)
     documents = await cursor.to_list(length=limit)
     return [convert_object_id(doc) for doc in documents]
 
@@ -119,15 +172,48 @@ async def update_document(collection: str, filter_dict: dict, update_dict: dict)
     result = await db[collection].update_one(filter_dict, {"$set": update_dict})
     return result.modified_count > 0
 
+async def find_one_and_update(collection: str, filter_dict: dict, update, upsert: bool = False,
+                              sort: Optional[list] = None,
+                              return_document: bool = ReturnDocument.AFTER) -> Optional[dict]:
+    """Atomically update a single document and return it after (or before) the update"""
+    db = database.db
+    document = await db[collection].find_one_and_update(
+        filter_dict, update, upsert=upsert, sort=sort, return_document=return_document
+    )
+    if document:
+        return convert_object_id(document)
+    return None
+
 async def delete_document(collection: str, filter_dict: dict) -> bool:
     """Delete a document"""
     db = database.db
     result = await db[collection].delete_one(filter_dict)
     return result.deleted_count > 0
 
+async def delete_documents(collection: str, filter_dict: dict) -> int:
+    """Delete every matching document"""
+    db = database.db
+    result = await db[collection].delete_many(filter_dict)
+    return result.deleted_count
+
+async def bulk_write(collection: str, operations: list) -> int:
+    """Apply a batch of write operations in one round trip"""
+    if not operations:
+        return 0
+    db = database.db
+    result = await db[collection].bulk_write(operations, ordered=False)
+    return result.modified_count + result.upserted_count
+
 async def count_documents(collection: str, filter_dict: dict = None) -> int:
     """Count documents in collection"""
     db = database.db
     if filter_dict is None:
         filter_dict = {}
-    return await db[collection].count_documents(filter_dict)
\ No newline at end of file
+    return await db[collection].count_documents(filter_dict)
+
+async def aggregate(collection: str, pipeline: list, limit: Optional[int] = None) -> List[dict]:
+    """Run an aggregation pipeline and return its results"""
+    db = database.db
+    cursor = db[collection].aggregate(pipeline)
+    documents = await cursor.to_list(length=limit)
+    return [convert_object_id(doc) for doc in documents]
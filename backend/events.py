@@ -0,0 +1,230 @@
+"""
+Live movie events for Movie Booking SDK
+In-process pub/sub of movie change log entries for server-sent event
+streams, fed by a MongoDB change stream or by polling subscribed movies'
+versions so every API process sees writes made by the others
+"""
+
+import os
+import json
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from .database import database, find_documents
+
+logger = logging.getLogger(__name__)
+
+# Event stream configuration
+SSE_HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.environ.get("SSE_QUEUE_SIZE", "100"))  # undelivered events per connection
+SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", "3000"))
+MOVIE_EVENTS_CHANGE_STREAM = os.environ.get("MOVIE_EVENTS_CHANGE_STREAM", "false").lower() == "true"
+MOVIE_EVENTS_POLL_SECONDS = float(os.environ.get("MOVIE_EVENTS_POLL_SECONDS", "5"))  # without a change stream
+MOVIE_EVENTS_POLL_BATCH = 1000  # movies per version query
+
+# (event name, movie version, data)
+Event = Tuple[str, int, dict]
+
+def format_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """One server-sent event frame"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(jsonable_encoder(data), separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+def filter_changes(changes: list, theater_id: Optional[str] = None, category_id: Optional[str] = None,
+                   slot: Optional[str] = None) -> list:
+    """The change operations touching one theater, format or showtime
+
+    Operations on an enclosing theater or format (e.g. its removal) are
+    kept; movie-level updates are not.
+    """
+    if not (theater_id or category_id or slot):
+        return changes
+    return [
+        change for change in changes
+        if change.get("kind") != "movie"
+        and (not theater_id or change.get("theater_id") == theater_id)
+        and (not category_id or change.get("category_id", category_id) == category_id)
+        and (not slot or change.get("slot", slot) == slot)
+    ]
+
+class Subscription:
+    """One connection's queue of undelivered events
+
+    Bounded: a client that stops reading overflows instead of growing
+    the queue, and is expected to catch up from the change log.
+    """
+
+    __slots__ = ("topic", "events", "ready", "overflowed", "max_queued")
+
+    def __init__(self, topic: str, max_queued: int = SSE_QUEUE_SIZE):
+        self.topic = topic
+        self.events: Deque[Event] = deque()
+        self.ready = asyncio.Event()
+        self.overflowed = False
+        self.max_queued = max_queued
+
+    def push(self, event: Event):
+        if len(self.events) >= self.max_queued:
+            self.events.clear()
+            self.overflowed = True
+        else:
+            self.events.append(event)
+        self.ready.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to timeout for events; False on timeout"""
+        if self.events or self.overflowed:
+            return True
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def drain(self) -> Tuple[list, bool]:
+        """Queued events and whether any were dropped since the last drain"""
+        events, overflowed = list(self.events), self.overflowed
+        self.events.clear()
+        self.overflowed = False
+        self.ready.clear()
+        return events, overflowed
+
+class EventBroker:
+    """Fans movie events out to the subscriptions of this process
+
+    Publishing only appends to in-memory queues, so a write never waits
+    on slow readers, and an idle connection costs one small object.
+    With MOVIE_EVENTS_CHANGE_STREAM enabled, events come from a change
+    stream on movie_changes (replica set required) instead of from local
+    writes, so connections see writes made by any API process. Otherwise
+    the versions of every subscribed movie are polled with one query per
+    interval, and a "version" event is published when one moves (or a
+    "deleted" event when the movie is gone); connections catch up on it
+    from the change log.
+    """
+
+    def __init__(self, use_change_stream: bool = MOVIE_EVENTS_CHANGE_STREAM,
+                 poll_seconds: float = MOVIE_EVENTS_POLL_SECONDS):
+        self.use_change_stream = use_change_stream
+        self.poll_seconds = poll_seconds
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._versions: Dict[str, int] = {}  # latest version seen per subscribed movie
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.polls = 0
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(topic)
+        self._subscriptions.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.topic)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.topic]
+                self._versions.pop(subscription.topic, None)
+
+    def publish(self, topic: str, event: Event):
+        """Queue an event for every subscription of a topic"""
+        self.published += 1
+        for subscription in self._subscriptions.get(topic, ()):
+            subscription.push(event)
+
+    def publish_change(self, entry: dict, local: bool = True):
+        """Publish a movie_changes entry; local writes are skipped when a change stream feeds the broker"""
+        if local and self.use_change_stream:
+            return
+        if entry["movie_id"] in self._subscriptions:
+            self._versions[entry["movie_id"]] = max(self._versions.get(entry["movie_id"], 0), entry["version"])
+        self.publish(entry["movie_id"], ("change", entry["version"], {
+            "version": entry["version"],
+            "changed_at": entry.get("changed_at"),
+            "changes": entry.get("changes", [])
+        }))
+
+    async def _watch(self):
+        """Publish every movie_changes insert, from any process"""
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        while True:
+            try:
+                async with database.db.movie_changes.watch(pipeline) as stream:
+                    async for change in stream:
+                        self.publish_change(change["fullDocument"], local=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Movie change stream failed: {e}")
+                await asyncio.sleep(5)
+
+    async def poll_versions(self):
+        """Publish version and deletion events for subscribed movies written elsewhere"""
+        topics: List[str] = list(self._subscriptions)
+        self.polls += 1
+        for start in range(0, len(topics), MOVIE_EVENTS_POLL_BATCH):
+            batch = topics[start:start + MOVIE_EVENTS_POLL_BATCH]
+            movies = await find_documents(
+                "movie_configurations", {"id": {"$in": batch}}, len(batch),
+                projection={"_id": 0, "id": 1, "version": 1, "updated_at": 1}
+            )
+            found = {movie["id"]: movie for movie in movies}
+            for topic in batch:
+                if topic not in self._subscriptions:
+                    continue
+                movie = found.get(topic)
+                if movie is None:
+                    self._versions.pop(topic, None)
+                    self.publish(topic, ("deleted", 0, {"movie_id": topic}))
+                    continue
+                version = movie.get("version", 1)
+                if version != self._versions.get(topic):
+                    self._versions[topic] = version
+                    self.publish(topic, ("version", version, {
+                        "version": version, "updated_at": movie.get("updated_at")
+                    }))
+
+    async def _poll(self):
+        """Poll subscribed movies' versions every poll_seconds"""
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.poll_versions()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Movie version poll failed: {e}")
+
+    def start(self):
+        """Start the change stream watcher, or the version poller without one"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch() if self.use_change_stream else self._poll())
+
+    async def stop(self):
+        """Stop the change stream watcher or version poller"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "topics": len(self._subscriptions),
+            "connections": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+            "published": self.published,
+            "polls": self.polls
+        }
+
+# Global event broker instance
+event_broker = EventBroker()
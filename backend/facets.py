@@ -0,0 +1,266 @@
+"""
+Showtime facet index for Movie Booking SDK
+Per-movie posting lists stored as integer bitsets over a movie's showtimes,
+so multi-select filters and their facet counts are a few AND/OR/popcount
+operations instead of nested loops over every theater
+"""
+
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .cache import LRUCache, SingleFlight
+from .database import find_document, find_documents
+from .showtimes import parse_time, time_bucket, InvalidShowtime, TIME_CATEGORIES
+
+# Facet index configuration
+FACET_CACHE_SIZE = int(os.environ.get("FACET_CACHE_SIZE", "256"))  # movies
+FACET_SUMMARY_TTL_SECONDS = float(os.environ.get("FACET_SUMMARY_TTL_SECONDS", "300"))
+FACET_INDEX_TTL_SECONDS = float(os.environ.get("FACET_INDEX_TTL_SECONDS", "300"))
+
+# Screening category types that get their own facet; formats whose
+# category is unknown are filed under "format"
+CATEGORY_FACETS = ["format", "experience", "special_event"]
+FACETS = CATEGORY_FACETS + ["time", "city", "chain", "amenities"]
+
+# Movie fields a facet index is built from
+FACET_INDEX_PROJECTION = {"_id": 0, "id": 1, "version": 1, "updated_at": 1, "theaters": 1, "screening_categories": 1}
+
+def iter_bits(mask: int):
+    """Indexes of the set bits of a bitset, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def slot_time_category(slot: dict) -> str:
+    """A time slot's bucket, parsing slots stored before showtimes were normalized"""
+    if slot.get("minutes") is not None:
+        return slot.get("category") or time_bucket(slot["minutes"])
+    try:
+        return time_bucket(parse_time(slot.get("time", "")))
+    except InvalidShowtime:
+        return "evening"
+
+class MovieFacetIndex:
+    """Posting lists of one movie's showtimes, keyed by facet and value
+
+    Every time slot of every screening format of every theater is one
+    entry; each (facet, value) maps to a bitset of the entries carrying
+    it. Values within a facet are ORed and facets are ANDed together.
+    """
+
+    def __init__(self, movie: dict, category_types: Dict[str, str]):
+        self.movie_id = movie["id"]
+        self.version = movie.get("updated_at")
+        self.built_at = time.monotonic()
+        self.theaters: List[dict] = movie.get("theaters") or []
+        self.entries: List[Tuple[int, int, dict]] = []  # (theater index, format index, slot)
+        self.postings: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+
+        for theater_index, theater in enumerate(self.theaters):
+            for format_index, format_info in enumerate(theater.get("formats") or []):
+                category_facet = category_types.get(format_info.get("category_id"), "format")
+                if category_facet not in CATEGORY_FACETS:
+                    category_facet = "format"
+
+                for slot in format_info.get("times") or []:
+                    slot = slot if isinstance(slot, dict) else {"time": str(slot)}
+                    bit = 1 << len(self.entries)
+                    self.entries.append((theater_index, format_index, slot))
+
+                    self._post(category_facet, format_info.get("category_name"), bit)
+                    self._post("time", slot_time_category(slot), bit)
+                    self._post("city", theater.get("city"), bit)
+                    self._post("chain", theater.get("chain"), bit)
+                    for amenity in theater.get("amenities") or []:
+                        self._post("amenities", amenity, bit)
+
+        self.all = (1 << len(self.entries)) - 1
+        self.category_types = category_types
+
+    def _post(self, facet: str, value: Optional[str], bit: int):
+        if value:
+            postings = self.postings[facet]
+            postings[value] = postings.get(value, 0) | bit
+
+    def match(self, filters: Dict[str, List[str]], exclude: Optional[str] = None) -> int:
+        """Bitset of entries passing every facet filter except exclude"""
+        mask = self.all
+        for facet, values in filters.items():
+            if facet == exclude or not values:
+                continue
+            selected = 0
+            for value in values:
+                selected |= self.postings.get(facet, {}).get(value, 0)
+            mask &= selected
+        return mask
+
+    def facet_counts(self, filters: Dict[str, List[str]]) -> Dict[str, Dict[str, int]]:
+        """Showtime count per facet value under the other facets' filters
+
+        A facet's own selection is left out of its counts, so multi-select
+        chips show what adding each value would match.
+        """
+        counts = {}
+        for facet in FACETS:
+            others = self.match(filters, exclude=facet)
+            counts[facet] = {
+                value: (bits & others).bit_count()
+                for value, bits in sorted(self.postings[facet].items())
+            }
+        return counts
+
+    def summary(self) -> dict:
+        """Showtime and theater counts per screening category and time bucket"""
+        categories: Dict[Tuple[Optional[str], Optional[str]], dict] = {}
+        for theater_index, format_index, slot in self.entries:
+            format_info = self.theaters[theater_index]["formats"][format_index]
+            key = (format_info.get("category_id"), format_info.get("category_name"))
+            counts = categories.setdefault(key, {"showtimes": 0, "theaters": set()})
+            counts["showtimes"] += 1
+            counts["theaters"].add(theater_index)
+
+        screening_categories = sorted(
+            (
+                {
+                    "category_id": category_id,
+                    "category_name": category_name,
+                    "type": self.category_types.get(category_id),
+                    "showtimes": counts["showtimes"],
+                    "theaters": len(counts["theaters"])
+                }
+                for (category_id, category_name), counts in categories.items()
+            ),
+            key=lambda category: (-category["showtimes"], category["category_name"] or "")
+        )
+
+        buckets = {name: {"showtimes": 0, "theaters": 0} for name in TIME_CATEGORIES}
+        for name, bits in self.postings["time"].items():
+            buckets[name] = {
+                "showtimes": bits.bit_count(),
+                "theaters": len({self.entries[index][0] for index in iter_bits(bits)})
+            }
+
+        return {
+            "screening_categories": screening_categories,
+            "time_categories": [{"value": name, **counts} for name, counts in buckets.items()],
+            "total_showtimes": len(self.entries),
+            "generated_at": datetime.utcnow()
+        }
+
+    def search(self, filters: Dict[str, List[str]]) -> Tuple[List[Tuple[int, int, dict]], Dict[str, Dict[str, int]]]:
+        """Matching entries in theater order, and the facet counts"""
+        mask = self.match(filters)
+        return [self.entries[index] for index in iter_bits(mask)], self.facet_counts(filters)
+
+class FacetIndexCache:
+    """LRU of per-movie facet indexes, rebuilt when the movie changes
+
+    Entries are checked against the movie's updated_at on every lookup,
+    so a theater write made by any API process is picked up; writes made
+    here also invalidate the entry directly. Screening category types
+    don't change updated_at, so entries are also rebuilt after ttl
+    seconds to pick up type changes made by other processes.
+    """
+
+    def __init__(self, max_movies: int = FACET_CACHE_SIZE, ttl: float = FACET_INDEX_TTL_SECONDS):
+        self.max_movies = max_movies
+        self.ttl = ttl
+        self._indexes: "OrderedDict[str, MovieFacetIndex]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def _category_types(self, movie: dict) -> Dict[str, str]:
+        """category_id -> type for the screening categories a movie's theaters use"""
+        types = {
+            category["id"]: category.get("type")
+            for category in movie.get("screening_categories") or []
+            if category.get("id")
+        }
+        missing = {
+            format_info.get("category_id")
+            for theater in movie.get("theaters") or []
+            for format_info in theater.get("formats") or []
+        } - set(types) - {None}
+        if missing:
+            categories = await find_documents(
+                "screening_categories", {"id": {"$in": list(missing)}}, len(missing)
+            )
+            types.update({category["id"]: category.get("type") for category in categories})
+        return types
+
+    def lookup(self, movie_id: str, version) -> Optional[MovieFacetIndex]:
+        """A movie's cached index if it was built from this updated_at and is within ttl"""
+        index = self._indexes.get(movie_id)
+        if index is None or index.version != version or time.monotonic() - index.built_at >= self.ttl:
+            return None
+        self.hits += 1
+        self._indexes.move_to_end(movie_id)
+        return index
+
+    async def get(self, movie: dict) -> MovieFacetIndex:
+        """The facet index for a movie document, building it if stale"""
+        index = self.lookup(movie["id"], movie.get("updated_at"))
+        if index is not None:
+            return index
+
+        self.misses += 1
+        index = MovieFacetIndex(movie, await self._category_types(movie))
+        self._indexes[movie["id"]] = index
+        self._indexes.move_to_end(movie["id"])
+        while len(self._indexes) > self.max_movies:
+            self._indexes.popitem(last=False)
+        return index
+
+    async def load(self, movie_id: str, version) -> Optional[MovieFacetIndex]:
+        """The facet index for a movie at a known updated_at, reading only the
+        fields the index needs when it has to be rebuilt; None if the movie
+        no longer exists
+        """
+        index = self.lookup(movie_id, version)
+        if index is not None:
+            return index
+        movie = await find_document("movie_configurations", {"id": movie_id}, FACET_INDEX_PROJECTION)
+        return await self.get(movie) if movie else None
+
+    def invalidate(self, movie_id: str):
+        """Drop a movie's index after its theaters change"""
+        self._indexes.pop(movie_id, None)
+
+    def clear(self):
+        """Drop every index, e.g. after a screening category changes type"""
+        self._indexes.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"movies": len(self._indexes), "hits": self.hits, "misses": self.misses}
+
+# Global facet index cache
+facet_indexes = FacetIndexCache()
+
+# Facet count summaries per movie, as {"version": updated_at, "summary": ...}
+facet_summaries = LRUCache(max_size=FACET_CACHE_SIZE, ttl=FACET_SUMMARY_TTL_SECONDS)
+facet_summary_flights = SingleFlight()
+
+async def get_facet_summary(movie: dict) -> dict:
+    """A movie's facet counts from cache, rebuilt when its updated_at moves
+
+    Counted from the movie's facet index, so they match what
+    /showtimes/filter returns; concurrent rebuilds of the same version
+    share one load.
+    """
+    cached = facet_summaries.get(movie["id"])
+    if cached is not None and cached["version"] == movie.get("updated_at"):
+        return cached["summary"]
+
+    async def build() -> dict:
+        index = await facet_indexes.load(movie["id"], movie.get("updated_at"))
+        if index is None:
+            raise LookupError(f"Movie {movie['id']} not found")
+        summary = index.summary()
+        facet_summaries.set(movie["id"], {"version": index.version, "summary": summary})
+        return summary
+
+    return await facet_summary_flights.do((movie["id"], movie.get("updated_at")), build)
@@ -0,0 +1,146 @@
+"""
+Theater geolocation for Movie Booking SDK
+Offline ZIP geocoding and a 2dsphere-indexed read model of theater
+locations, so "theaters near me" is one $geoNear query
+"""
+
+import os
+import csv
+import gzip
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReplaceOne
+
+from .database import aggregate, bulk_write, delete_documents
+
+logger = logging.getLogger(__name__)
+
+# ZIP centroid table: zip,latitude,longitude,timezone (gzipped CSV)
+ZIP_CENTROIDS_PATH = Path(os.environ.get(
+    "ZIP_CENTROIDS_PATH", str(Path(__file__).parent / "data" / "zip_centroids.csv.gz")
+))
+
+METERS_PER_MILE = 1609.344
+
+class InvalidLocation(ValueError):
+    """Raised when coordinates or a ZIP code can't be used"""
+
+_zip_centroids: Optional[Dict[str, Tuple[float, float, str]]] = None
+
+def zip_centroids() -> Dict[str, Tuple[float, float, str]]:
+    """ZIP code -> (latitude, longitude, timezone), loaded on first use"""
+    global _zip_centroids
+    if _zip_centroids is None:
+        centroids = {}
+        try:
+            with gzip.open(ZIP_CENTROIDS_PATH, "rt", newline="") as handle:
+                for row in csv.reader(line for line in handle if not line.startswith("#")):
+                    centroids[row[0]] = (float(row[1]), float(row[2]), row[3])
+        except FileNotFoundError:
+            logger.warning(f"ZIP centroid table not found at {ZIP_CENTROIDS_PATH}; ZIP geocoding disabled")
+        _zip_centroids = centroids
+    return _zip_centroids
+
+def geocode_zip(zip_code: Optional[str]) -> Optional[Tuple[float, float, str]]:
+    """(latitude, longitude, timezone) of a US ZIP code's centroid"""
+    if not zip_code:
+        return None
+    return zip_centroids().get(str(zip_code).strip()[:5])
+
+def validate_coordinates(latitude: float, longitude: float):
+    """Reject coordinates outside the valid latitude/longitude ranges"""
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise InvalidLocation(f"Invalid coordinates: {latitude}, {longitude}")
+
+def locate_theater(theater: dict) -> dict:
+    """Fill in a theater's coordinates (and timezone) from its ZIP code when missing"""
+    theater = dict(theater)
+    latitude, longitude = theater.get("latitude"), theater.get("longitude")
+    if (latitude is None) != (longitude is None):
+        raise InvalidLocation("latitude and longitude must be set together")
+
+    centroid = geocode_zip(theater.get("zip_code"))
+    if latitude is None and centroid:
+        theater["latitude"], theater["longitude"] = centroid[0], centroid[1]
+    elif latitude is not None:
+        validate_coordinates(latitude, longitude)
+    if not theater.get("timezone") and centroid and centroid[2]:
+        theater["timezone"] = centroid[2]
+    return theater
+
+def locate_theaters(theaters: Optional[List[dict]]) -> List[dict]:
+    """Geocode a movie's theater list before it is written"""
+    return [locate_theater(theater) for theater in theaters or []]
+
+class TheaterLocator:
+    """Maintains the theater_locations collection, a geo read model of movie theaters
+
+    One document per (movie, theater) with a GeoJSON point under a
+    2dsphere index, so nearest-theater search is a $geoNear that reads
+    only the theaters in range instead of every theater of the movie.
+    """
+
+    async def sync_movie(self, movie: dict) -> int:
+        """Replace a movie's theater locations with those of its current theaters"""
+        locations = []
+        for theater in movie.get("theaters") or []:
+            if theater.get("latitude") is None or theater.get("longitude") is None or not theater.get("id"):
+                continue
+            locations.append({
+                "id": f"{movie['id']}:{theater['id']}",
+                "movie_id": movie["id"],
+                "client_id": movie.get("client_id"),
+                "is_active": movie.get("is_active", True),
+                "theater_id": theater["id"],
+                "location": {"type": "Point", "coordinates": [theater["longitude"], theater["latitude"]]},
+                "theater": theater
+            })
+        await bulk_write("theater_locations", [
+            ReplaceOne({"id": location["id"]}, location, upsert=True) for location in locations
+        ])
+        await delete_documents("theater_locations", {
+            "movie_id": movie["id"],
+            "id": {"$nin": [location["id"] for location in locations]}
+        })
+        return len(locations)
+
+    async def remove_movie(self, movie_id: str) -> int:
+        """Drop a deleted movie's theater locations"""
+        return await delete_documents("theater_locations", {"movie_id": movie_id})
+
+    async def refresh_all(self) -> int:
+        """Re-sync every movie that has theaters"""
+        movies = await aggregate("movie_configurations", [
+            {"$match": {"theaters.0": {"$exists": True}}},
+            {"$project": {"_id": 0, "id": 1, "client_id": 1, "is_active": 1, "theaters": 1}}
+        ])
+        for movie in movies:
+            try:
+                await self.sync_movie(movie)
+            except Exception as e:
+                logger.error(f"Failed to sync theater locations for movie {movie['id']}: {e}")
+        return len(movies)
+
+    async def nearby(self, movie_id: str, latitude: float, longitude: float,
+                     radius_miles: float, limit: int) -> List[dict]:
+        """A movie's theaters within radius, nearest first, with distance in miles"""
+        results = await aggregate("theater_locations", [
+            {"$geoNear": {
+                "near": {"type": "Point", "coordinates": [longitude, latitude]},
+                "distanceField": "distance_meters",
+                "maxDistance": radius_miles * METERS_PER_MILE,
+                "query": {"movie_id": movie_id},
+                "spherical": True
+            }},
+            {"$limit": limit},
+            {"$project": {"_id": 0, "theater": 1, "distance_meters": 1}}
+        ])
+        return [
+            {**result["theater"], "distance": round(result["distance_meters"] / METERS_PER_MILE, 2)}
+            for result in results
+        ]
+
+# Global theater locator instance
+theater_locator = TheaterLocator()
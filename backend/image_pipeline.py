@@ -0,0 +1,249 @@
+"""
+Image processing pipeline for Movie Booking SDK
+Runs Pillow work on a bounded process pool so uploads never block the event loop
+"""
+
+import os
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from .placeholders import compute_placeholders
+
+logger = logging.getLogger(__name__)
+
+# Image pipeline configuration
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+IMAGE_MAX_PENDING = int(os.environ.get("IMAGE_MAX_PENDING", "32"))
+IMAGE_JOB_TIMEOUT_SECONDS = float(os.environ.get("IMAGE_JOB_TIMEOUT_SECONDS", "30"))
+IMAGE_VARIANT_WIDTHS = [
+    int(width) for width in os.environ.get("IMAGE_VARIANT_WIDTHS", "320,640,960,1280,1920").split(",")
+    if width.strip()
+]
+
+# File extensions for master and variant formats
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif"}
+VARIANT_EXTENSIONS = {"AVIF": ".avif", "WEBP": ".webp"}
+
+def _variant_formats() -> List[str]:
+    """Modern formats this Pillow build can encode, best first"""
+    formats = []
+    if features.check("avif"):
+        formats.append("AVIF")
+    formats.append("WEBP")
+    return formats
+
+def _save_atomic(img: Image.Image, path: Path, image_format: str, **params):
+    """Encode to a sibling temp file and rename it into place"""
+    temp_path = path.with_name(path.name + ".tmp")
+    img.save(temp_path, image_format, **params)
+    os.replace(temp_path, path)
+
+def process_image(
+    file_path: str,
+    variant_dir: str,
+    basename: str,
+    widths: List[int],
+    max_width: int = 1920,
+    quality: int = 85
+) -> dict:
+    """Optimize an image in place and render its responsive variants (runs in a worker process)
+
+    The optimized master keeps a format that matches its content: opaque
+    images become JPEG, images with transparency stay PNG (or WebP), and
+    GIFs are left untouched. Returns the master's format and size, the
+    width ladder of variants written to variant_dir and the image's
+    placeholders (blurhash, LQIP, palette).
+    """
+    source = Path(file_path)
+    output_dir = Path(variant_dir)
+    variants = []
+
+    with Image.open(source) as img:
+        source_format = img.format
+        img.load()
+
+    if source_format == "GIF":
+        master = img
+        master_format = "GIF"
+    else:
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if has_alpha:
+            master = img.convert("RGBA")
+            master_format = "WEBP" if source_format == "WEBP" else "PNG"
+        else:
+            master = img.convert("RGB")
+            master_format = "JPEG"
+
+        # Resize if too large
+        if master.width > max_width:
+            ratio = max_width / master.width
+            master = master.resize((max_width, int(master.height * ratio)), Image.Resampling.LANCZOS)
+
+        # Save optimized master over the source file
+        if master_format == "JPEG":
+            _save_atomic(master, source, "JPEG", quality=quality, optimize=True, progressive=True)
+        elif master_format == "PNG":
+            _save_atomic(master, source, "PNG", optimize=True)
+        else:
+            _save_atomic(master, source, "WEBP", quality=quality)
+
+    # Width ladder: every configured width below the master's, plus the master
+    # width (the only variant when no widths are configured)
+    base = master if master.mode in ("RGB", "RGBA") else master.convert("RGBA")
+    ladder = sorted({w for w in widths if w < base.width} | {min(base.width, max(widths, default=base.width))})
+    for variant_format in _variant_formats():
+        extension = VARIANT_EXTENSIONS[variant_format]
+        for width in ladder:
+            height = max(1, round(base.height * width / base.width))
+            resized = base if width == base.width else base.resize((width, height), Image.Resampling.LANCZOS)
+            filename = f"{basename}-{width}w{extension}"
+            _save_atomic(resized, output_dir / filename, variant_format, quality=quality)
+            variants.append({
+                "width": width,
+                "height": height,
+                "format": variant_format.lower(),
+                "filename": filename,
+                "size": (output_dir / filename).stat().st_size
+            })
+
+    return {
+        "format": master_format,
+        "width": master.width,
+        "height": master.height,
+        "variants": variants,
+        "placeholder": compute_placeholders(base)
+    }
+
+def render_resized(
+    source_path: str,
+    dest_path: str,
+    width: int,
+    height: Optional[int],
+    fit: str,
+    image_format: str,
+    quality: int = 82
+) -> None:
+    """Render one on-demand size of an image (runs in a worker process)
+
+    Without a height the image is scaled to the width. With both, "cover"
+    crops to fill the box and "contain" scales to fit inside it.
+    """
+    with Image.open(source_path) as img:
+        img.load()
+
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA" if has_alpha and image_format != "JPEG" else "RGB")
+
+    if height is None:
+        height = max(1, round(img.height * width / img.width))
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+    elif fit == "cover":
+        img = ImageOps.fit(img, (width, height), Image.Resampling.LANCZOS)
+    else:
+        img = ImageOps.contain(img, (width, height), Image.Resampling.LANCZOS)
+
+    if image_format == "PNG":
+        img.save(dest_path, "PNG", optimize=True)
+    else:
+        img.save(dest_path, image_format, quality=quality)
+
+class ImagePipeline:
+    """Bounded process pool for CPU-heavy image jobs
+
+    At most max_workers jobs run at once; once max_pending jobs are queued
+    or running, new jobs are rejected with a 503 so callers back off instead
+    of queueing unbounded work.
+    """
+
+    def __init__(self, max_workers: int = IMAGE_WORKERS, max_pending: int = IMAGE_MAX_PENDING,
+                 timeout: float = IMAGE_JOB_TIMEOUT_SECONDS):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0  # queued + running jobs
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def start(self):
+        """Create the worker pool"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def submit(self, func, *args, timeout: Optional[float] = None):
+        """Run a picklable function on the pool and wait for its result"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Image processing queue is full. Try again shortly.",
+                headers={"Retry-After": "2"}
+            )
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        try:
+            job = self.executor.submit(func, *args)
+            # Counted until the worker is done with the job, not until the
+            # caller stops waiting, so timed-out jobs still hold their slot
+            self.pending += 1
+            job.add_done_callback(lambda _: self._job_done(loop))
+            result = await asyncio.wait_for(asyncio.wrap_future(job), timeout or self.timeout)
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            # A queued job is cancelled; a running one finishes in the
+            # background and holds its slot until then
+            self.timeouts += 1
+            raise HTTPException(status_code=504, detail="Image processing timed out")
+        except UnidentifiedImageError:
+            self.failed += 1
+            raise HTTPException(status_code=400, detail="Invalid image file")
+        except BrokenProcessPool:
+            self.failed += 1
+            logger.error("Image worker pool crashed, restarting")
+            self.shutdown()
+            raise HTTPException(status_code=500, detail="Image processing failed")
+        except Exception:
+            self.failed += 1
+            raise
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop):
+        """Release a job's slot; called from the pool's thread when the job finishes"""
+        def release():
+            self.pending -= 1
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            # The event loop has already closed
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        """Current pool utilisation and queue depth"""
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.pending,
+            "queue_depth": max(0, self.pending - self.max_workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected
+        }
+
+# Global image pipeline instance
+image_pipeline = ImagePipeline()
@@ -0,0 +1,253 @@
+"""
+Background job queue for Movie Booking SDK
+Mongo-backed queue with leased claims, retries with backoff and dead-lettering,
+so slow work (image optimization) runs after the request has returned
+"""
+
+import os
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .database import find_document, find_one_and_update, insert_document
+
+logger = logging.getLogger(__name__)
+
+# Job queue configuration
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "1"))
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", str(24 * 3600)))  # succeeded jobs
+JOB_DEAD_RETENTION_SECONDS = float(os.environ.get("JOB_DEAD_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+# Job states; "dead" jobs exhausted their attempts and are kept for inspection.
+# Finished jobs get an expires_at, which a TTL index prunes
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_DEAD = "dead"
+
+JobHandler = Callable[[dict], Awaitable[Optional[dict]]]
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help; the job is dead-lettered at once"""
+
+class JobQueue:
+    """Durable work queue stored in the jobs collection
+
+    Workers claim a due job with one find_one_and_update that sets a lease;
+    the lease is extended while the handler runs, and a job whose lease
+    expires (its worker died) becomes claimable again. Failed jobs are
+    retried with exponential backoff until max_attempts, then moved to the
+    dead state and handed to the type's on_dead callback.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = JOB_WORKERS,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_base_seconds: float = JOB_RETRY_BASE_SECONDS,
+        poll_seconds: float = JOB_POLL_SECONDS
+    ):
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.handlers: Dict[str, JobHandler] = {}
+        self.dead_handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self.running = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+
+    def register(self, job_type: str, handler: JobHandler, on_dead: Optional[JobHandler] = None):
+        """Set the coroutine that runs jobs of a type, and optionally one for dead jobs"""
+        self.handlers[job_type] = handler
+        if on_dead is not None:
+            self.dead_handlers[job_type] = on_dead
+
+    async def enqueue(self, job_type: str, payload: dict, max_attempts: Optional[int] = None,
+                      job_id: Optional[str] = None) -> str:
+        """Queue a job and return its id"""
+        now = datetime.utcnow()
+        job = {
+            "id": job_id or str(uuid.uuid4()),
+            "type": job_type,
+            "payload": payload,
+            "status": JOB_QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts or self.max_attempts,
+            "run_at": now,
+            "lease_expires_at": None,
+            "worker_id": None,
+            "last_error": None,
+            "result": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        await insert_document("jobs", job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job["id"]
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Current state of a job"""
+        return await find_document("jobs", {"id": job_id})
+
+    async def claim(self) -> Optional[dict]:
+        """Lease the next due job, including jobs whose previous lease expired"""
+        now = datetime.utcnow()
+        return await find_one_and_update(
+            "jobs",
+            {"$or": [
+                {"status": JOB_QUEUED, "run_at": {"$lte": now}},
+                {"status": JOB_RUNNING, "lease_expires_at": {"$lte": now}}
+            ]},
+            {
+                "$set": {
+                    "status": JOB_RUNNING,
+                    "worker_id": self.worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_at", 1)]
+        )
+
+    async def _extend_lease(self, job: dict):
+        """Keep renewing the lease while the job's handler runs"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            now = datetime.utcnow()
+            renewed = await find_one_and_update(
+                "jobs",
+                {"id": job["id"], "status": JOB_RUNNING, "worker_id": self.worker_id},
+                {"$set": {"lease_expires_at": now + timedelta(seconds=self.lease_seconds), "updated_at": now}}
+            )
+            if not renewed:
+                return
+
+    async def _finish(self, job: dict, update: dict) -> Optional[dict]:
+        """Record a job's outcome if this worker still holds its lease"""
+        update["updated_at"] = datetime.utcnow()
+        update["lease_expires_at"] = None
+        return await find_one_and_update(
+            "jobs",
+            {"id": job["id"], "status": JOB_RUNNING, "worker_id": self.worker_id},
+            {"$set": update}
+        )
+
+    async def _dead_letter(self, job: dict, error: str):
+        self.dead += 1
+        logger.error(f"Job {job['id']} ({job['type']}) dead-lettered after {job['attempts']} attempts: {error}")
+        job["last_error"] = error
+        expires_at = datetime.utcnow() + timedelta(seconds=JOB_DEAD_RETENTION_SECONDS)
+        if await self._finish(job, {"status": JOB_DEAD, "last_error": error, "expires_at": expires_at}):
+            on_dead = self.dead_handlers.get(job["type"])
+            if on_dead is not None:
+                try:
+                    await on_dead(job)
+                except Exception as e:
+                    logger.error(f"Dead-letter handler for job {job['id']} failed: {e}")
+
+    async def run_job(self, job: dict):
+        """Execute a claimed job and record success, retry or dead-letter"""
+        handler = self.handlers.get(job["type"])
+        if handler is None:
+            await self._dead_letter(job, f"No handler registered for job type {job['type']}")
+            return
+        if job["attempts"] > job["max_attempts"]:
+            # Its worker kept dying mid-job
+            await self._dead_letter(job, job.get("last_error") or "Lease expired too many times")
+            return
+
+        self.running += 1
+        lease = asyncio.create_task(self._extend_lease(job))
+        try:
+            result = await handler(job)
+        except PermanentJobError as e:
+            await self._dead_letter(job, str(e))
+        except Exception as e:
+            if job["attempts"] >= job["max_attempts"]:
+                await self._dead_letter(job, str(e))
+            else:
+                self.retried += 1
+                delay = self.retry_base_seconds * 2 ** (job["attempts"] - 1)
+                logger.warning(f"Job {job['id']} ({job['type']}) failed, retrying in {delay:.0f}s: {e}")
+                await self._finish(job, {
+                    "status": JOB_QUEUED,
+                    "last_error": str(e),
+                    "run_at": datetime.utcnow() + timedelta(seconds=delay)
+                })
+        else:
+            self.succeeded += 1
+            await self._finish(job, {
+                "status": JOB_SUCCEEDED,
+                "result": result,
+                "last_error": None,
+                "expires_at": datetime.utcnow() + timedelta(seconds=JOB_RETENTION_SECONDS)
+            })
+        finally:
+            lease.cancel()
+            self.running -= 1
+
+    async def _worker(self):
+        """Claim and run jobs until cancelled"""
+        while True:
+            try:
+                job = await self.claim()
+            except Exception as e:
+                logger.error(f"Failed to claim job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.run_job(job)
+
+    def start(self):
+        """Start the worker tasks"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Stop the workers; jobs they were running are reclaimed once their lease expires"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for jobs run by this process"""
+        return {
+            "workers": self.concurrency,
+            "running": self.running,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead": self.dead
+        }
+
+# Global job queue instance
+job_queue = JobQueue()
@@ -38,12 +38,38 @@ class TypographyConfig(BaseModel):
         "bold": 800
     }
 
+class ImageVariant(BaseModel):
+    """A resized rendition of an uploaded image"""
+    width: int
+    height: int
+    format: str  # webp, avif
+    url: str
+    size: int  # bytes
+
+class ImagePlaceholder(BaseModel):
+    """Tiny stand-ins painted while an image loads"""
+    blurhash: Optional[str] = None
+    lqip: Optional[str] = None  # data: URI of a ~16px wide preview
+    dominant_color: Optional[str] = None  # hex
+    palette: List[str] = []  # hex colors, most dominant first
+
 class ImageAsset(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     url: str
     alt_text: str
     category: str  # hero, poster, background, logo, etc.
+    content_hash: Optional[str] = None  # SHA-256 of the uploaded bytes
+    width: Optional[int] = None
+    height: Optional[int] = None
+    variants: List[ImageVariant] = []  # Responsive width ladder
+    srcset: Dict[str, str] = {}  # format -> srcset attribute value
+    blurhash: Optional[str] = None
+    lqip: Optional[str] = None  # data: URI of a ~16px wide preview
+    dominant_color: Optional[str] = None
+    palette: List[str] = []
+    status: str = "ready"  # pending (processing in the background), ready, failed
+    error: Optional[str] = None
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
 
 class ScreeningCategory(BaseModel):
@@ -56,7 +82,10 @@ class ScreeningCategory(BaseModel):
 
 class TimeSlot(BaseModel):
     time: str  # e.g., "7:00 PM"
-    category: str  # "morning", "afternoon", "evening", "late_night"
+    category: Optional[str] = None  # "morning", "afternoon", "evening", "late_night"; derived from time on write
+    minutes: Optional[int] = None  # Minutes since midnight, parsed from time on write
+    date: Optional[str] = None  # Schedule day (YYYY-MM-DD); unset repeats daily
+    starts_at: Optional[datetime] = None  # UTC start of a dated slot, computed on write
     available_seats: Optional[int] = None
     price_modifier: Optional[float] = 1.0  # Price multiplier for this time slot
 
@@ -111,6 +140,9 @@ class TheaterLocation(BaseModel):
     city: str
     state: str
     zip_code: str
+    timezone: Optional[str] = None  # IANA name, e.g. "America/New_York"; DEFAULT_THEATER_TIMEZONE if unset
+    latitude: Optional[float] = None  # Geocoded from zip_code when unset
+    longitude: Optional[float] = None
     distance: Optional[float] = None
     formats: List[ScreeningFormat] = []  # Updated to use new ScreeningFormat
     showtimes: List[str] = []  # Legacy field for backwards compatibility
@@ -178,6 +210,10 @@ class MovieConfiguration(BaseModel):
     logo_image: Optional[str] = None
     background_images: List[str] = []
     
+    # Placeholders for this movie's uploaded images, keyed by image URL
+    # (filled in on read from the image assets)
+    image_placeholders: Dict[str, ImagePlaceholder] = {}
+    
     # Movie Details
     release_date: datetime
     rating: str = "PG-13"
@@ -204,6 +240,14 @@ class MovieConfiguration(BaseModel):
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 1  # Incremented on every write (see GET /movies/{id}/changes)
+
+class ClientUsage(BaseModel):
+    """Counters checked against the client's max_* limits"""
+    movies: int = 0  # active movie configurations
+    images: int = 0
+    theaters: int = 0
+    reconciled_at: Optional[datetime] = None
 
 class Client(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -218,6 +262,7 @@ class Client(BaseModel):
     max_movies: int = 1
     max_images: int = 10
     max_theaters: int = 50
+    usage: ClientUsage = Field(default_factory=ClientUsage)
     
     # Security
     api_keys: List[str] = []  # List of API key IDs
@@ -313,6 +358,9 @@ class TheaterLocationCreate(BaseModel):
     city: str
     state: str
     zip_code: str
+    timezone: Optional[str] = None  # IANA name, e.g. "America/New_York"; DEFAULT_THEATER_TIMEZONE if unset
+    latitude: Optional[float] = None  # Geocoded from zip_code when unset
+    longitude: Optional[float] = None
     distance: Optional[float] = None
     formats: List[ScreeningFormat] = []
     showtimes: List[str] = []
@@ -388,6 +436,39 @@ class ScreeningCategoryUpdate(BaseModel):
     description: Optional[str] = None
     is_active: Optional[bool] = None
 
+class DirectUploadRequest(BaseModel):
+    """Request for presigned direct-to-bucket upload instructions"""
+    client_id: str
+    category: str
+    filename: str
+    content_type: str
+    size: int  # bytes
+
+class DirectUploadTicket(BaseModel):
+    """Presigned instructions for uploading straight to object storage"""
+    key: str
+    method: str  # POST (single request) or MULTIPART (one PUT per part)
+    url: Optional[str] = None
+    fields: Dict[str, str] = {}
+    upload_id: Optional[str] = None
+    part_size: Optional[int] = None
+    part_urls: List[str] = []
+    expires_in: int
+
+class DirectUploadPart(BaseModel):
+    part_number: int
+    etag: str
+
+class DirectUploadComplete(BaseModel):
+    """Registers a directly uploaded object as an image asset"""
+    key: str
+    client_id: str
+    category: str
+    filename: Optional[str] = None
+    alt_text: Optional[str] = None
+    upload_id: Optional[str] = None  # multipart uploads only
+    parts: List[DirectUploadPart] = []
+
 class ImageUploadResponse(BaseModel):
     """Response model for image upload"""
     id: str
@@ -397,4 +478,9 @@ class ImageUploadResponse(BaseModel):
     category: str
     uploaded_at: datetime
     file_size: int
-    file_type: str
\ No newline at end of file
+    file_type: str
+    variants: List[ImageVariant] = []
+    srcset: Dict[str, str] = {}
+    placeholder: Optional[ImagePlaceholder] = None
+    status: str = "ready"
+    message: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""
+Image placeholders for Movie Booking SDK
+Blurhash, tiny inline LQIP and dominant colors computed while an upload is
+decoded, so widgets can paint something before the full image arrives
+"""
+
+import io
+import math
+import base64
+from typing import List, Tuple
+
+from PIL import Image
+
+BLURHASH_COMPONENTS = (4, 3)  # horizontal, vertical
+BLURHASH_SAMPLE_SIZE = 32
+LQIP_WIDTH = 16
+LQIP_QUALITY = 40
+PALETTE_SIZE = 5
+PALETTE_SAMPLE_SIZE = 64
+
+BASE83_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+def _encode83(value: int, length: int) -> str:
+    return "".join(BASE83_CHARS[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+def _srgb_to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+def _linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+def _sign_pow(value: float, exponent: float) -> float:
+    return math.copysign(abs(value) ** exponent, value)
+
+def blurhash(img: Image.Image, components: Tuple[int, int] = BLURHASH_COMPONENTS) -> str:
+    """Encode an RGB image as a blurhash string (https://blurha.sh)"""
+    components_x, components_y = components
+    sample = img.copy()
+    sample.thumbnail((BLURHASH_SAMPLE_SIZE, BLURHASH_SAMPLE_SIZE))
+    width, height = sample.size
+    pixels = [tuple(_srgb_to_linear(channel) for channel in pixel) for pixel in sample.getdata()]
+
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(components_x)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(components_y)]
+
+    factors = []
+    for j in range(components_y):
+        for i in range(components_x):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                basis_y = cos_y[j][y]
+                for x in range(width):
+                    basis = basis_y * cos_x[i][x]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((components_x - 1) + (components_y - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(channel) for factor in ac for channel in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        maximum_value = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        maximum_value = 1
+        result += _encode83(0, 1)
+
+    result += _encode83(
+        (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4
+    )
+    for factor in ac:
+        quantised = [
+            max(0, min(18, int(_sign_pow(channel / maximum_value, 0.5) * 9 + 9.5)))
+            for channel in factor
+        ]
+        result += _encode83(quantised[0] * 19 * 19 + quantised[1] * 19 + quantised[2], 2)
+
+    return result
+
+def lqip(img: Image.Image, width: int = LQIP_WIDTH) -> str:
+    """A tiny blurred-up preview as a data: URI to inline in responses"""
+    height = max(1, round(img.height * width / img.width))
+    preview = img.resize((width, height), Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    preview.save(buffer, "WEBP", quality=LQIP_QUALITY)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+def palette(img: Image.Image, size: int = PALETTE_SIZE) -> List[str]:
+    """Most common colors as hex strings, most dominant first"""
+    sample = img.copy()
+    sample.thumbnail((PALETTE_SAMPLE_SIZE, PALETTE_SAMPLE_SIZE))
+    quantized = sample.quantize(colors=size, method=Image.Quantize.MEDIANCUT)
+    colors = quantized.getpalette()
+    counts = sorted(quantized.getcolors(), reverse=True)
+    return [
+        "#{:02x}{:02x}{:02x}".format(*colors[index * 3:index * 3 + 3])
+        for _, index in counts
+    ]
+
+def compute_placeholders(img: Image.Image) -> dict:
+    """Blurhash, LQIP data URI, dominant color and palette for a decoded image"""
+    if img.mode != "RGB":
+        # Flatten transparency onto white, as most pages render posters on light or solid backgrounds
+        rgba = img.convert("RGBA")
+        flattened = Image.new("RGB", rgba.size, (255, 255, 255))
+        flattened.paste(rgba, mask=rgba.getchannel("A"))
+        img = flattened
+
+    colors = palette(img)
+    return {
+        "blurhash": blurhash(img),
+        "lqip": lqip(img),
+        "dominant_color": colors[0] if colors else None,
+        "palette": colors
+    }
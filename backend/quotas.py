@@ -0,0 +1,150 @@
+"""
+Per-client quota accounting for Movie Booking SDK
+Keeps movie, image and theater counters on each client document so quota
+checks are a single conditional $inc instead of counting collections
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+from .database import aggregate, count_documents, find_one_and_update
+
+logger = logging.getLogger(__name__)
+
+# Quota accounting configuration
+QUOTA_RECONCILE_INTERVAL_SECONDS = float(os.environ.get("QUOTA_RECONCILE_SECONDS", "3600"))
+
+# Counted resources: usage field -> (client limit field, default limit, label)
+QUOTA_RESOURCES = {
+    "movies": ("max_movies", 1, "Movie"),
+    "images": ("max_images", 10, "Image"),
+    "theaters": ("max_theaters", 50, "Theater"),
+}
+
+async def count_usage(client_id: str) -> Dict[str, int]:
+    """Count a client's resources from the source collections"""
+    theaters = await aggregate("movie_configurations", [
+        {"$match": {"client_id": client_id}},
+        {"$group": {"_id": None, "count": {"$sum": {"$size": {"$ifNull": ["$theaters", []]}}}}}
+    ])
+    return {
+        "movies": await count_documents("movie_configurations", {"client_id": client_id, "is_active": True}),
+        "images": await count_documents("image_assets", {"client_id": client_id}),
+        "theaters": theaters[0]["count"] if theaters else 0,
+    }
+
+class QuotaManager:
+    """Atomic per-client usage counters
+
+    Counters live in the client document's ``usage`` field. reserve() only
+    increments when the result stays within the client's limit, so
+    concurrent requests cannot overshoot a quota; release() gives capacity
+    back. A background task periodically recounts every client to correct
+    drift from writes that bypass the API (scripts, manual fixes, crashes
+    between a reservation and its rollback).
+    """
+
+    def __init__(self, reconcile_interval: float = QUOTA_RECONCILE_INTERVAL_SECONDS):
+        self.reconcile_interval = reconcile_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def reserve(self, client: dict, resource: str, amount: int = 1):
+        """Claim amount units of a resource or raise 400 when over the limit"""
+        if amount <= 0:
+            return
+
+        limit_field, default_limit, label = QUOTA_RESOURCES[resource]
+        limit = client.get(limit_field, default_limit)
+        if resource not in client.get("usage", {}):
+            # Clients created before usage tracking are counted once on first use
+            await self.reconcile_client(client["id"])
+
+        updated = await find_one_and_update(
+            "clients",
+            {"id": client["id"], f"usage.{resource}": {"$lte": limit - amount}},
+            {"$inc": {f"usage.{resource}": amount}}
+        )
+        if not updated:
+            raise HTTPException(status_code=400, detail=f"{label} limit reached for this subscription tier")
+
+    async def release(self, client_id: str, resource: str, amount: int = 1):
+        """Return amount units of a resource to the client's quota"""
+        if amount <= 0:
+            return
+
+        # Clamped at 0; counters not initialised yet are left for reconciliation
+        counter = f"usage.{resource}"
+        before = await find_one_and_update(
+            "clients",
+            {"id": client_id, counter: {"$exists": True}},
+            [{"$set": {counter: {"$max": [0, {"$subtract": [f"${counter}", amount]}]}}}],
+            return_document=ReturnDocument.BEFORE
+        )
+        if before is not None and before["usage"][resource] < amount:
+            logger.warning(
+                f"Released {amount} {resource} for client {client_id} with only "
+                f"{before['usage'][resource]} in use; counter clamped at 0"
+            )
+
+    async def usage(self, client: dict) -> Dict[str, int]:
+        """Current counters for a client document"""
+        usage = client.get("usage", {})
+        if any(resource not in usage for resource in QUOTA_RESOURCES):
+            usage = await self.reconcile_client(client["id"])
+        return {resource: usage.get(resource, 0) for resource in QUOTA_RESOURCES}
+
+    async def reconcile_client(self, client_id: str) -> Dict[str, int]:
+        """Recount a client's resources and overwrite its counters"""
+        usage = await count_usage(client_id)
+        await find_one_and_update(
+            "clients",
+            {"id": client_id},
+            {"$set": {
+                **{f"usage.{resource}": count for resource, count in usage.items()},
+                "usage.reconciled_at": datetime.utcnow()
+            }}
+        )
+        return usage
+
+    async def reconcile_all(self) -> int:
+        """Recount every client"""
+        clients = await aggregate("clients", [{"$project": {"_id": 0, "id": 1}}])
+        for client in clients:
+            try:
+                await self.reconcile_client(client["id"])
+            except Exception as e:
+                logger.error(f"Failed to reconcile usage for client {client['id']}: {e}")
+        return len(clients)
+
+    async def _run(self):
+        """Periodically reconcile all counters"""
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile_all()
+            except Exception as e:
+                logger.error(f"Usage reconciliation failed: {e}")
+
+    def start(self):
+        """Start the background reconcile task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background reconcile task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global quota manager instance
+quota_manager = QuotaManager()
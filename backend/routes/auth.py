@@ -4,6 +4,7 @@ Handles JWT authentication, API key management, and user management
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.security import HTTPAuthorizationCredentials
 from typing import List, Optional
 from datetime import datetime, timedelta
 import hashlib
@@ -14,16 +15,25 @@ from ..models import (
 )
 from ..database import (
     insert_document, find_document, find_documents, 
-    update_document, delete_document
+    update_document, delete_document, find_one_and_update
 )
 from ..security import (
     SecurityManager, get_current_user, get_admin_user,
     validate_string_input, validate_email_format,
-    rate_limit_middleware
+    rate_limit_middleware, security
 )
+from ..cache import LRUCache
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+# Account lockout policy
+MAX_FAILED_LOGIN_ATTEMPTS = 5
+LOCKOUT_MINUTES = 30
+
+# Short-lived cache of user records for the login path, refreshed from the
+# documents returned by each login write
+user_cache = LRUCache(max_size=4096, ttl=30)
+
 @router.post("/register", response_model=TokenResponse)
 async def register_user(user_data: UserCreate, request: Request):
     """Register a new user (admin only in production)"""
@@ -44,7 +54,7 @@ async def register_user(user_data: UserCreate, request: Request):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password and create user
-    password_hash = SecurityManager.hash_password(user_data.password)
+    password_hash = await SecurityManager.hash_password_async(user_data.password)
     
     user = User(
         username=user_data.username,
@@ -72,39 +82,74 @@ async def login_user(user_credentials: UserLogin, request: Request):
     user_credentials.username = validate_string_input(user_credentials.username, 50, 3)
     user_credentials.password = validate_string_input(user_credentials.password, 128, 1)
     
-    # Find user
-    user_doc = await find_document("users", {"username": user_credentials.username})
-    if not user_doc:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+    # Find user (served from the short-lived user cache when possible)
+    user_doc = user_cache.get(user_credentials.username)
+    if user_doc is None:
+        user_doc = await find_document("users", {"username": user_credentials.username})
+        if not user_doc:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        user_cache.set(user_credentials.username, user_doc)
     
     user = User(**user_doc)
     
     # Check if account is locked
-    if user.locked_until and user.locked_until > datetime.utcnow():
+    now = datetime.utcnow()
+    if user.locked_until and user.locked_until > now:
         raise HTTPException(
             status_code=423, 
             detail=f"Account locked until {user.locked_until}"
         )
     
     # Verify password
-    if not SecurityManager.verify_password(user_credentials.password, user.password_hash):
-        # Increment failed login attempts
-        failed_attempts = user.failed_login_attempts + 1
-        update_data = {"failed_login_attempts": failed_attempts}
-        
-        # Lock account after 5 failed attempts
-        if failed_attempts >= 5:
-            update_data["locked_until"] = datetime.utcnow() + timedelta(minutes=30)
-        
-        await update_document("users", {"id": user.id}, update_data)
+    password_valid, new_password_hash = await SecurityManager.verify_and_update_password(
+        user_credentials.password, user.password_hash
+    )
+    if not password_valid:
+        # Increment failed login attempts and lock the account after
+        # MAX_FAILED_LOGIN_ATTEMPTS in a single atomic round trip
+        updated_doc = await find_one_and_update("users", {"id": user.id}, [
+            {"$set": {
+                "failed_login_attempts": {"$add": [{"$ifNull": ["$failed_login_attempts", 0]}, 1]},
+                "updated_at": now
+            }},
+            {"$set": {
+                "locked_until": {"$cond": [
+                    {"$gte": ["$failed_login_attempts", MAX_FAILED_LOGIN_ATTEMPTS]},
+                    now + timedelta(minutes=LOCKOUT_MINUTES),
+                    "$locked_until"
+                ]}
+            }}
+        ])
+        if updated_doc:
+            user_cache.set(user.username, updated_doc)
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Reset failed login attempts and update last login
-    await update_document("users", {"id": user.id}, {
-        "failed_login_attempts": 0,
-        "locked_until": None,
-        "last_login_at": datetime.utcnow()
-    })
+    # Record the login and clear the failure counters from their stored
+    # values (not the cached copy, which may predate another worker's update)
+    update_data = {
+        "last_login_at": now,
+        "updated_at": now,
+        "failed_login_attempts": {"$cond": [
+            {"$gt": [{"$ifNull": ["$failed_login_attempts", 0]}, 0]}, 0, "$failed_login_attempts"
+        ]},
+        "locked_until": {"$cond": [{"$ifNull": ["$locked_until", False]}, None, "$locked_until"]}
+    }
+    
+    # Transparently upgrade hashes created with a different bcrypt cost
+    # ($literal, since bcrypt hashes start with "$")
+    if new_password_hash:
+        update_data["password_hash"] = {"$literal": new_password_hash}
+    
+    # The filter re-checks the lock so a stale cache entry can't bypass it
+    updated_doc = await find_one_and_update(
+        "users",
+        {"id": user.id, "$or": [{"locked_until": None}, {"locked_until": {"$lte": now}}]},
+        [{"$set": update_data}]
+    )
+    if not updated_doc:
+        user_cache.delete(user.username)
+        raise HTTPException(status_code=423, detail="Account locked")
+    user_cache.set(user.username, updated_doc)
     
     # Create access token
     access_token = SecurityManager.create_access_token(
@@ -250,4 +295,13 @@ async def refresh_token(current_user: dict = Depends(get_current_user)):
         }
     )
     
-    return TokenResponse(access_token=access_token)
\ No newline at end of file
+    return TokenResponse(access_token=access_token)
+
+@router.post("/logout")
+async def logout(
+    current_user: dict = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Revoke the current access token"""
+    await SecurityManager.revoke_token(credentials.credentials)
+    return {"message": "Logged out successfully"}
\ No newline at end of file
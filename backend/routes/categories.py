@@ -11,6 +11,7 @@ from ..database import (
     get_database, insert_document, find_document, find_documents,
     update_document, delete_document, count_documents
 )
+from ..facets import facet_indexes, facet_summaries
 
 router = APIRouter(prefix="/categories", tags=["screening-categories"])
 
@@ -90,6 +91,10 @@ async def update_screening_category(category_id: str, category_update: Screening
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update screening category")
         
+        # Facets are filed by category type
+        facet_indexes.clear()
+        facet_summaries.clear()
+        
         # Return updated category
         updated_category = await find_document("screening_categories", {"id": category_id})
         return ScreeningCategory(**updated_category)
@@ -111,6 +116,9 @@ async def delete_screening_category(category_id: str):
         if not success:
             raise HTTPException(status_code=404, detail="Screening category not found")
         
+        facet_indexes.clear()
+        facet_summaries.clear()
+        
         return {"message": "Screening category deleted successfully"}
         
     except HTTPException:
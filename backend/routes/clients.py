@@ -7,6 +7,7 @@ from ..database import (
     get_database, insert_document, find_document, find_documents,
     update_document, delete_document, count_documents
 )
+from ..quotas import quota_manager
 from ..security import get_admin_user, validate_string_input, validate_email_format
 
 router = APIRouter(prefix="/clients", tags=["clients"])
@@ -153,23 +154,21 @@ async def get_client_statistics(client_id: str):
         if not client:
             raise HTTPException(status_code=404, detail="Client not found")
         
-        # Count active movies
-        active_movies = await count_documents("movie_configurations", 
-                                            {"client_id": client_id, "is_active": True})
+        # Active movies, images and theaters come from the usage counters
+        usage = await quota_manager.usage(client)
+        active_movies = usage["movies"]
+        total_images = usage["images"]
         
         # Count total movies
         total_movies = await count_documents("movie_configurations", 
                                            {"client_id": client_id})
         
-        # Count images
-        total_images = await count_documents("image_assets", 
-                                           {"client_id": client_id})
-        
         return {
             "client_id": client_id,
             "active_movies": active_movies,
             "total_movies": total_movies,
             "total_images": total_images,
+            "total_theaters": usage["theaters"],
             "limits": {
                 "max_movies": client.get("max_movies", 1),
                 "max_images": client.get("max_images", 10),
@@ -177,11 +176,28 @@ async def get_client_statistics(client_id: str):
             },
             "usage_percentage": {
                 "movies": (active_movies / client.get("max_movies", 1)) * 100,
-                "images": (total_images / client.get("max_images", 10)) * 100
+                "images": (total_images / client.get("max_images", 10)) * 100,
+                "theaters": (usage["theaters"] / client.get("max_theaters", 50)) * 100
             }
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to retrieve statistics: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve statistics: {str(e)}")
+
+@router.post("/{client_id}/usage/reconcile", dependencies=[Depends(get_admin_user)])
+async def reconcile_client_usage(client_id: str):
+    """Recount a client's movies, images and theaters (admin only)"""
+    try:
+        client = await find_document("clients", {"id": client_id})
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        
+        usage = await quota_manager.reconcile_client(client_id)
+        return {"client_id": client_id, "usage": usage}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to reconcile usage: {str(e)}")
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
-from datetime import datetime, time
+from datetime import datetime, time, timedelta, timezone
 import uuid
+import msgpack
 
 from ..models import (
     MovieConfiguration, MovieConfigurationCreate, MovieConfigurationUpdate,
@@ -10,42 +12,126 @@ from ..models import (
 )
 from ..database import (
     get_database, insert_document, find_document, find_documents,
-    update_document, delete_document, count_documents
+    delete_document, count_documents, aggregate
 )
+from ..quotas import quota_manager
+from ..showtimes import (
+    InvalidShowtime, normalize_theaters, normalize_theater, parse_time, time_bucket,
+    get_timezone, showtime_index, utc_range, screening_response, TIME_CATEGORIES
+)
+from ..geo import InvalidLocation, locate_theaters, locate_theater, geocode_zip, validate_coordinates, theater_locator
+from ..facets import facet_indexes, facet_summaries, get_facet_summary, slot_time_category
+from ..changes import update_movie, changes_since, remove_movie_changes
+from ..events import event_broker, filter_changes, format_event, SSE_HEARTBEAT_SECONDS, SSE_RETRY_MS
+from ..search import PREFIX_FIELDS, SEARCH_MODES, search_fields, autocomplete, text_search
 
 router = APIRouter(prefix="/movies", tags=["movies"])
 
+# Encodings of the categorized showtimes listing
+RESPONSE_FORMATS = ["nested", "columnar"]
+
+# What change polling and event streams read of a movie
+VERSION_PROJECTION = {"_id": 0, "version": 1, "updated_at": 1}
+
+def movie_image_urls(movie: dict) -> List[str]:
+    """Every image URL a movie configuration references"""
+    assets = movie.get("film_assets") or {}
+    urls = [movie.get("hero_image"), movie.get("poster_image"), movie.get("logo_image"),
+            assets.get("poster_image"), assets.get("backdrop_image")]
+    urls += movie.get("background_images") or []
+    urls += assets.get("gallery_images") or []
+    urls += assets.get("badge_images") or []
+    return [url for url in urls if url]
+
+async def attach_image_placeholders(movies: List[dict]) -> List[dict]:
+    """Inline the blurhash/LQIP/palette of each movie's images
+    
+    One lookup covers every movie in the response, so widgets can paint
+    placeholders without a request per image.
+    """
+    urls = {url for movie in movies for url in movie_image_urls(movie)}
+    if not urls:
+        return movies
+    
+    # Deduplicated uploads share one URL across many assets, so one row per URL
+    assets = await aggregate("image_assets", [
+        {"$match": {"url": {"$in": list(urls)}, "dominant_color": {"$ne": None}}},
+        {"$group": {
+            "_id": "$url",
+            "blurhash": {"$first": "$blurhash"},
+            "lqip": {"$first": "$lqip"},
+            "dominant_color": {"$first": "$dominant_color"},
+            "palette": {"$first": "$palette"}
+        }}
+    ])
+    placeholders = {
+        asset["_id"]: {
+            "blurhash": asset.get("blurhash"),
+            "lqip": asset.get("lqip"),
+            "dominant_color": asset.get("dominant_color"),
+            "palette": asset.get("palette") or []
+        }
+        for asset in assets
+    }
+    for movie in movies:
+        movie["image_placeholders"] = {
+            url: placeholders[url] for url in movie_image_urls(movie) if url in placeholders
+        }
+    return movies
+
+async def sync_theater_read_models(movie: dict):
+    """Bring the read models derived from a movie's theaters up to date"""
+    facet_indexes.invalidate(movie["id"])
+    facet_summaries.delete(movie["id"])
+    await showtime_index.sync_movie(movie)
+    await theater_locator.sync_movie(movie)
+
+async def remove_theater_read_models(movie_id: str):
+    """Drop the read models of a deleted movie"""
+    facet_indexes.invalidate(movie_id)
+    facet_summaries.delete(movie_id)
+    await showtime_index.remove_movie(movie_id)
+    await theater_locator.remove_movie(movie_id)
+
+def theater_identity(theater: dict) -> tuple:
+    return (theater.get("name"), theater.get("address"), theater.get("zip_code"))
+
+def keep_theater_ids(theaters: List[TheaterLocation], stored: List[dict]) -> List[dict]:
+    """Serialize a replacement theater list, keeping the ids of theaters already stored
+    
+    Theaters sent without an id take the id of the stored theater with the
+    same name, address and ZIP code, so showtimes, locations and the change
+    log see the same theater rather than a new one on every PUT.
+    """
+    stored_ids = {}
+    for theater in stored:
+        if theater.get("id"):
+            stored_ids.setdefault(theater_identity(theater), []).append(theater["id"])
+    sent_ids = {theater.id for theater in theaters if "id" in theater.dict(exclude_unset=True)}
+    
+    result = []
+    for theater in theaters:
+        theater_dict = theater.dict()
+        if "id" not in theater.dict(exclude_unset=True):
+            candidates = [
+                theater_id for theater_id in stored_ids.get(theater_identity(theater_dict), [])
+                if theater_id not in sent_ids
+            ]
+            if candidates:
+                theater_dict["id"] = candidates[0]
+                sent_ids.add(candidates[0])
+        result.append(theater_dict)
+    return result
+
 def categorize_time(time_str: str) -> str:
-    """Automatically categorize a time string into morning, afternoon, evening, or late_night"""
+    """Categorize a time string into morning, afternoon, evening, or late_night
+    
+    Only needed for slots stored before showtimes were parsed on write
+    (see scripts/backfill_movies.py).
+    """
     try:
-        # Parse various time formats
-        time_str = time_str.strip().upper()
-        
-        # Handle common formats
-        if 'PM' in time_str or 'AM' in time_str:
-            # 12-hour format
-            time_part = time_str.replace('AM', '').replace('PM', '').strip()
-            hour = int(time_part.split(':')[0])
-            
-            if 'PM' in time_str and hour != 12:
-                hour += 12
-            elif 'AM' in time_str and hour == 12:
-                hour = 0
-        else:
-            # 24-hour format or just hour
-            hour = int(time_str.split(':')[0])
-        
-        # Categorize based on hour
-        if 6 <= hour < 12:
-            return "morning"
-        elif 12 <= hour < 17:
-            return "afternoon"
-        elif 17 <= hour < 22:
-            return "evening"
-        else:
-            return "late_night"
-            
-    except (ValueError, IndexError):
+        return time_bucket(parse_time(time_str))
+    except InvalidShowtime:
         # Default to evening if parsing fails
         return "evening"
 
@@ -58,18 +144,31 @@ async def create_movie_configuration(movie_config: MovieConfigurationCreate):
         if not client:
             raise HTTPException(status_code=404, detail="Client not found")
         
-        # Check subscription limits
-        existing_movies = await count_documents("movie_configurations", 
-                                               {"client_id": movie_config.client_id, "is_active": True})
-        if existing_movies >= client.get("max_movies", 1):
-            raise HTTPException(status_code=400, detail="Movie limit reached for this subscription tier")
-        
         # Create movie configuration
         movie_dict = movie_config.dict()
         movie_obj = MovieConfiguration(**movie_dict)
         
-        await insert_document("movie_configurations", movie_obj.dict())
-        return movie_obj
+        # Check subscription limits
+        movie_count = 1 if movie_obj.is_active else 0
+        await quota_manager.reserve(client, "movies", movie_count)
+        try:
+            await quota_manager.reserve(client, "theaters", len(movie_obj.theaters))
+        except HTTPException:
+            await quota_manager.release(client["id"], "movies", movie_count)
+            raise
+        
+        movie_doc = movie_obj.dict(exclude={"image_placeholders"})
+        movie_doc.update(search_fields(movie_doc))
+        try:
+            await insert_document("movie_configurations", movie_doc)
+        except Exception:
+            await quota_manager.release(client["id"], "movies", movie_count)
+            await quota_manager.release(client["id"], "theaters", len(movie_obj.theaters))
+            raise
+        
+        movie = movie_obj.dict()
+        await attach_image_placeholders([movie])
+        return MovieConfiguration(**movie)
         
     except HTTPException:
         raise
@@ -91,11 +190,44 @@ async def get_movie_configurations(
             filter_dict["is_active"] = is_active
         
         movies = await find_documents("movie_configurations", filter_dict, limit)
+        await attach_image_placeholders(movies)
         return [MovieConfiguration(**movie) for movie in movies]
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve movie configurations: {str(e)}")
 
+@router.get("/search")
+async def search_movies(
+    q: str = Query(..., min_length=1, max_length=200),
+    mode: str = Query("text", description="text: ranked full-text search; autocomplete: type-ahead on word prefixes"),
+    client_id: Optional[str] = Query(None),
+    is_active: Optional[bool] = Query(None),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Search movies by title, subtitle, director, cast, genre and logline"""
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {', '.join(SEARCH_MODES)}")
+    try:
+        if mode == "autocomplete":
+            results = await autocomplete(q, client_id, is_active, limit)
+            page, total = 1, len(results)
+        else:
+            found = await text_search(q, client_id, is_active, page, limit)
+            results, total = found["results"], found["total"]
+        
+        return {
+            "query": q,
+            "mode": mode,
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "results": results
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search movies: {str(e)}")
+
 @router.get("/{movie_id}", response_model=MovieConfiguration)
 async def get_movie_configuration(movie_id: str):
     """Get a specific movie configuration"""
@@ -104,6 +236,7 @@ async def get_movie_configuration(movie_id: str):
         if not movie:
             raise HTTPException(status_code=404, detail="Movie configuration not found")
         
+        await attach_image_placeholders([movie])
         return MovieConfiguration(**movie)
         
     except HTTPException:
@@ -111,6 +244,170 @@ async def get_movie_configuration(movie_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve movie configuration: {str(e)}")
 
+@router.get("/{movie_id}/changes")
+async def get_movie_changes(movie_id: str, since: int = Query(..., ge=0, description="Version the client already has")):
+    """Changes to a movie's configuration since a version
+    
+    Returns the added, modified and removed theaters, formats and time
+    slots of each later version, or a full snapshot (snapshot: true) when
+    the change log no longer reaches back to since. Clients store the
+    returned version and pass it as since on the next poll.
+    """
+    try:
+        current = await find_document("movie_configurations", {"id": movie_id}, VERSION_PROJECTION)
+        if not current:
+            raise HTTPException(status_code=404, detail="Movie configuration not found")
+        
+        version = current.get("version", 1)
+        changes = await changes_since(movie_id, since, version, current.get("updated_at"))
+        if changes is None:
+            movie = await find_document("movie_configurations", {"id": movie_id})
+            if not movie:
+                raise HTTPException(status_code=404, detail="Movie configuration not found")
+            version = movie.get("version", 1)
+            await attach_image_placeholders([movie])
+            return {
+                "movie_id": movie_id,
+                "since": since,
+                "version": version,
+                "snapshot": True,
+                "movie": MovieConfiguration(**movie),
+                "changes": []
+            }
+        
+        return {
+            "movie_id": movie_id,
+            "since": since,
+            "version": changes[-1]["version"] if changes else since,
+            "snapshot": False,
+            "changes": changes
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve movie changes: {str(e)}")
+
+async def movie_event_stream(movie_id: str, resume: Optional[int], filters: dict):
+    """Server-sent event frames for one movie connection, until it closes or the movie is deleted"""
+    subscription = event_broker.subscribe(movie_id)
+    last = None
+    target = 0  # latest version known to exist
+
+    async def catch_up(version: int, updated_at: Optional[datetime] = None):
+        """Frames for the logged changes after last, or a resync when the log can't bridge the gap"""
+        nonlocal last, target
+        target = max(target, version)
+        entries = await changes_since(movie_id, last, target, updated_at)
+        if entries is None:
+            last = target
+            return [format_event("resync", {"version": target}, target)]
+        frames = []
+        for entry in entries:
+            changes = filter_changes(entry["changes"], **filters)
+            if changes:
+                frames.append(format_event("change", {**entry, "changes": changes}, entry["version"]))
+            last = entry["version"]
+        return frames
+
+    try:
+        # Subscribed before reading the version, so no write falls in between
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        movie = await find_document("movie_configurations", {"id": movie_id}, VERSION_PROJECTION)
+        if not movie:
+            yield format_event("deleted", {"movie_id": movie_id})
+            return
+        version = movie.get("version", 1)
+        if resume is None:
+            last = target = version
+            yield format_event("ready", {"version": version}, version)
+        else:
+            last = resume
+            for frame in await catch_up(version, movie.get("updated_at")):
+                yield frame
+
+        while True:
+            if not await subscription.wait(SSE_HEARTBEAT_SECONDS):
+                # Writes by other processes arrive as events from the broker
+                frames = await catch_up(target) if last < target else []
+                for frame in frames:
+                    yield frame
+                if not frames:
+                    yield ": keepalive\n\n"
+                continue
+
+            events, overflowed = subscription.drain()
+
+            if overflowed:
+                # Dropped events for a slow reader are read back from the change log
+                movie = await find_document("movie_configurations", {"id": movie_id}, VERSION_PROJECTION)
+                if not movie:
+                    yield format_event("deleted", {"movie_id": movie_id})
+                    return
+                for frame in await catch_up(movie.get("version", 1), movie.get("updated_at")):
+                    yield frame
+
+            for event, version, data in events:
+                if event == "deleted":
+                    yield format_event("deleted", data)
+                    return
+                if version <= last:
+                    continue
+                if event == "version":
+                    # Polled by the broker: written by another process
+                    for frame in await catch_up(version, data.get("updated_at")):
+                        yield frame
+                    continue
+                if version > last + 1:
+                    # Written by another process, or after a version not logged yet
+                    for frame in await catch_up(version):
+                        yield frame
+                    continue
+                changes = filter_changes(data["changes"], **filters)
+                if changes:
+                    yield format_event(event, {**data, "changes": changes}, version)
+                last = version
+
+            if last < target:
+                # Versions that were waiting on an earlier one to be logged
+                for frame in await catch_up(target):
+                    yield frame
+    finally:
+        event_broker.unsubscribe(subscription)
+
+@router.get("/{movie_id}/events")
+async def stream_movie_events(
+    request: Request,
+    movie_id: str,
+    theater_id: Optional[str] = Query(None, description="Only changes to this theater"),
+    category_id: Optional[str] = Query(None, description="Only changes to this screening category's formats"),
+    slot: Optional[str] = Query(None, description="Only changes to this showtime, by its change log slot key (e.g. 2026-11-01@1140)"),
+    since: Optional[int] = Query(None, ge=0, description="Version to resume from; the Last-Event-ID header takes precedence")
+):
+    """Server-sent events of a movie's schedule and seat availability changes
+    
+    Each change event carries the version's entry from the change log
+    (see GET /movies/{id}/changes) and has the version as its id, so
+    EventSource reconnects resume with Last-Event-ID. A resync event means
+    the changes could not be replayed and the configuration should be
+    fetched again. Comment lines are sent as a heartbeat.
+    """
+    movie = await find_document("movie_configurations", {"id": movie_id}, {"_id": 0, "id": 1})
+    if not movie:
+        raise HTTPException(status_code=404, detail="Movie configuration not found")
+    
+    resume = since
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        resume = int(last_event_id)
+    
+    filters = {"theater_id": theater_id, "category_id": category_id, "slot": slot}
+    return StreamingResponse(
+        movie_event_stream(movie_id, resume, filters),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.put("/{movie_id}", response_model=MovieConfiguration)
 async def update_movie_configuration(movie_id: str, movie_update: MovieConfigurationUpdate):
     """Update a movie configuration"""
@@ -123,16 +420,49 @@ async def update_movie_configuration(movie_id: str, movie_update: MovieConfigura
         # Update only provided fields
         update_dict = movie_update.dict(exclude_unset=True)
         
-        success = await update_document("movie_configurations", {"id": movie_id}, update_dict)
-        if not success:
+        # Quota changes from activating the movie or resizing its theater list
+        client_id = existing_movie["client_id"]
+        was_active = existing_movie.get("is_active", True)
+        movie_delta = 0
+        if "is_active" in update_dict and update_dict["is_active"] != was_active:
+            movie_delta = 1 if update_dict["is_active"] else -1
+        theater_delta = 0
+        if update_dict.get("theaters") is not None:
+            theaters = keep_theater_ids(movie_update.theaters, existing_movie.get("theaters") or [])
+            update_dict["theaters"] = normalize_theaters(locate_theaters(theaters))
+            theater_delta = len(update_dict["theaters"]) - len(existing_movie.get("theaters", []))
+        if any(field in update_dict for field in PREFIX_FIELDS):
+            update_dict.update(search_fields({**existing_movie, **update_dict}))
+        
+        if movie_delta > 0 or theater_delta > 0:
+            client = await find_document("clients", {"id": client_id})
+            if not client:
+                raise HTTPException(status_code=404, detail="Client not found")
+            await quota_manager.reserve(client, "movies", movie_delta)
+            try:
+                await quota_manager.reserve(client, "theaters", theater_delta)
+            except HTTPException:
+                await quota_manager.release(client_id, "movies", movie_delta)
+                raise
+        
+        updated_movie = await update_movie(movie_id, update_dict)
+        if not updated_movie:
+            await quota_manager.release(client_id, "movies", movie_delta)
+            await quota_manager.release(client_id, "theaters", theater_delta)
             raise HTTPException(status_code=500, detail="Failed to update movie configuration")
         
+        await quota_manager.release(client_id, "movies", -movie_delta)
+        await quota_manager.release(client_id, "theaters", -theater_delta)
+        
         # Return updated movie
-        updated_movie = await find_document("movie_configurations", {"id": movie_id})
+        await sync_theater_read_models(updated_movie)
+        await attach_image_placeholders([updated_movie])
         return MovieConfiguration(**updated_movie)
         
     except HTTPException:
         raise
+    except (InvalidShowtime, InvalidLocation) as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update movie configuration: {str(e)}")
 
@@ -140,10 +470,20 @@ async def update_movie_configuration(movie_id: str, movie_update: MovieConfigura
 async def delete_movie_configuration(movie_id: str):
     """Delete a movie configuration"""
     try:
-        success = await delete_document("movie_configurations", {"id": movie_id})
+        movie = await find_document("movie_configurations", {"id": movie_id})
+        success = movie is not None and await delete_document("movie_configurations", {"id": movie_id})
         if not success:
             raise HTTPException(status_code=404, detail="Movie configuration not found")
         
+        await remove_theater_read_models(movie_id)
+        await remove_movie_changes(movie_id)
+        event_broker.publish(movie_id, ("deleted", movie.get("version", 1), {"movie_id": movie_id}))
+        
+        # Return the movie's share of the client's quotas
+        if movie.get("is_active", True):
+            await quota_manager.release(movie["client_id"], "movies")
+        await quota_manager.release(movie["client_id"], "theaters", len(movie.get("theaters", [])))
+        
         return {"message": "Movie configuration deleted successfully"}
         
     except HTTPException:
@@ -160,21 +500,31 @@ async def add_theater_to_movie(movie_id: str, theater: TheaterLocationCreate):
         if not movie:
             raise HTTPException(status_code=404, detail="Movie configuration not found")
         
-        # Create theater object
-        theater_obj = TheaterLocation(**theater.dict())
+        # Create theater object with its showtimes parsed
+        theater_obj = TheaterLocation(**normalize_theater(locate_theater(theater.dict())))
+        
+        # Check subscription limits
+        client = await find_document("clients", {"id": movie["client_id"]})
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        await quota_manager.reserve(client, "theaters")
         
         # Add theater to movie's theaters list
         movie["theaters"].append(theater_obj.dict())
         
-        success = await update_document("movie_configurations", {"id": movie_id}, 
-                                      {"theaters": movie["theaters"]})
-        if not success:
+        updated_movie = await update_movie(movie_id, {"theaters": movie["theaters"]})
+        if not updated_movie:
+            await quota_manager.release(client["id"], "theaters")
             raise HTTPException(status_code=500, detail="Failed to add theater")
         
+        await sync_theater_read_models(updated_movie)
+        
         return theater_obj
         
     except HTTPException:
         raise
+    except (InvalidShowtime, InvalidLocation) as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to add theater: {str(e)}")
 
@@ -194,6 +544,60 @@ async def get_movie_theaters(movie_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve theaters: {str(e)}")
 
+@router.get("/{movie_id}/theaters/nearby")
+async def get_nearby_theaters(
+    movie_id: str,
+    lat: Optional[float] = Query(None, description="Latitude of the viewer"),
+    lng: Optional[float] = Query(None, description="Longitude of the viewer"),
+    zip_code: Optional[str] = Query(None, alias="zip", description="US ZIP code, used when lat/lng are not given"),
+    radius: float = Query(25, gt=0, le=500, description="Search radius in miles"),
+    limit: int = Query(20, ge=1, le=100),
+    showtimes: int = Query(3, ge=0, le=20, description="Upcoming showtimes to include per theater")
+):
+    """A movie's theaters nearest a point, with distance in miles and their next showtimes"""
+    if lat is not None and lng is not None:
+        try:
+            validate_coordinates(lat, lng)
+        except InvalidLocation as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    elif zip_code:
+        centroid = geocode_zip(zip_code)
+        if not centroid:
+            raise HTTPException(status_code=422, detail=f"Unknown ZIP code: {zip_code}")
+        lat, lng = centroid[0], centroid[1]
+    else:
+        raise HTTPException(status_code=422, detail="lat and lng, or zip, are required")
+    
+    try:
+        movie = await find_document("movie_configurations", {"id": movie_id})
+        if not movie:
+            raise HTTPException(status_code=404, detail="Movie configuration not found")
+        
+        theaters = await theater_locator.nearby(movie_id, lat, lng, radius, limit)
+        upcoming = {}
+        if showtimes:
+            upcoming = await showtime_index.next_for_theaters(
+                movie_id, [theater["id"] for theater in theaters], datetime.utcnow(), showtimes
+            )
+        for theater in theaters:
+            theater["next_showtimes"] = [
+                {**screening, "starts_at": screening["starts_at"].replace(tzinfo=timezone.utc)}
+                for screening in upcoming.get(theater["id"], [])
+            ]
+        
+        return {
+            "movie_id": movie_id,
+            "origin": {"lat": lat, "lng": lng},
+            "radius_miles": radius,
+            "total": len(theaters),
+            "theaters": theaters
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find nearby theaters: {str(e)}")
+
 @router.get("/public/{movie_id}", response_model=MovieConfiguration)
 async def get_public_movie_configuration(movie_id: str):
     """Get a movie configuration for public viewing (frontend)"""
@@ -202,6 +606,7 @@ async def get_public_movie_configuration(movie_id: str):
         if not movie:
             raise HTTPException(status_code=404, detail="Movie not found or inactive")
         
+        await attach_image_placeholders([movie])
         return MovieConfiguration(**movie)
         
     except HTTPException:
@@ -246,8 +651,7 @@ async def add_screening_category_to_movie(movie_id: str, category_id: str):
         category_obj = ScreeningCategory(**category)
         movie_categories.append(category_obj.dict())
         
-        success = await update_document("movie_configurations", {"id": movie_id}, 
-                                      {"screening_categories": movie_categories})
+        success = await update_movie(movie_id, {"screening_categories": movie_categories})
         if not success:
             raise HTTPException(status_code=500, detail="Failed to add category to movie")
         
@@ -274,8 +678,7 @@ async def remove_screening_category_from_movie(movie_id: str, category_id: str):
         if len(updated_categories) == len(movie_categories):
             raise HTTPException(status_code=404, detail="Category not found in movie")
         
-        success = await update_document("movie_configurations", {"id": movie_id}, 
-                                      {"screening_categories": updated_categories})
+        success = await update_movie(movie_id, {"screening_categories": updated_categories})
         if not success:
             raise HTTPException(status_code=500, detail="Failed to remove category from movie")
         
@@ -302,13 +705,222 @@ async def get_movie_screening_categories(movie_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve movie categories: {str(e)}")
 
+@router.get("/{movie_id}/showtimes")
+async def get_movie_showtimes(
+    movie_id: str,
+    start: Optional[datetime] = Query(None, alias="from", description="Range start (default now)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Range end (default 24 hours after from)"),
+    tz: Optional[str] = Query(None, description="IANA timezone for naive from/to and local times (default each theater's)"),
+    theater_id: Optional[str] = Query(None),
+    time_category: Optional[str] = Query(None, description="Filter by time category: morning, afternoon, evening, late_night"),
+    limit: int = Query(500, le=2000)
+):
+    """Screenings of a movie starting in [from, to), earliest first
+    
+    Reads the showtimes read model with a range scan on (movie_id, starts_at).
+    """
+    if time_category and time_category not in TIME_CATEGORIES:
+        raise HTTPException(status_code=422, detail=f"time_category must be one of {', '.join(TIME_CATEGORIES)}")
+    try:
+        zone = get_timezone(tz) if tz else None
+        range_start, range_end = utc_range(start, end, zone)
+    except InvalidShowtime as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        movie = await find_document("movie_configurations", {"id": movie_id})
+        if not movie:
+            raise HTTPException(status_code=404, detail="Movie configuration not found")
+        
+        screenings = await showtime_index.query(movie_id, range_start, range_end, theater_id, time_category, limit)
+        showtimes = [screening_response(screening, zone) for screening in screenings]
+        
+        return {
+            "movie_id": movie_id,
+            "from": range_start.replace(tzinfo=timezone.utc),
+            "to": range_end.replace(tzinfo=timezone.utc),
+            "total": len(showtimes),
+            "showtimes": showtimes
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve showtimes: {str(e)}")
+
+@router.get("/{movie_id}/showtimes/facets")
+async def get_showtime_facets(movie_id: str):
+    """Showtime and theater counts per screening category and time bucket, for filter chips
+    
+    Cached per movie and rebuilt when the movie's theaters change.
+    """
+    try:
+        movie = await find_document("movie_configurations", {"id": movie_id}, {"_id": 0, "id": 1, "updated_at": 1})
+        if not movie:
+            raise HTTPException(status_code=404, detail="Movie configuration not found")
+        
+        return {"movie_id": movie_id, **await get_facet_summary(movie)}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve showtime facets: {str(e)}")
+
+@router.get("/{movie_id}/showtimes/filter")
+async def filter_showtimes(
+    movie_id: str,
+    formats: Optional[List[str]] = Query(None, alias="format", description="Screening formats, e.g. IMAX (any of)"),
+    experience: Optional[List[str]] = Query(None, description="Experience categories (any of)"),
+    special_event: Optional[List[str]] = Query(None, description="Special event categories (any of)"),
+    times: Optional[List[str]] = Query(None, alias="time", description="Time categories: morning, afternoon, evening, late_night (any of)"),
+    city: Optional[List[str]] = Query(None),
+    chain: Optional[List[str]] = Query(None),
+    amenities: Optional[List[str]] = Query(None, description="Theater amenities (any of)")
+):
+    """Showtimes matching every selected facet, plus per-value counts for the filter UI
+    
+    Values within a facet are alternatives; different facets must all
+    match. Each facet's counts ignore its own selection, so they show
+    what selecting another value would add.
+    """
+    filters = {
+        "format": formats, "experience": experience, "special_event": special_event, "time": times,
+        "city": city, "chain": chain, "amenities": amenities
+    }
+    filters = {facet: values for facet, values in filters.items() if values}
+    
+    try:
+        # Only the version is read while the cached index is current
+        movie = await find_document("movie_configurations", {"id": movie_id}, VERSION_PROJECTION)
+        index = await facet_indexes.load(movie_id, movie.get("updated_at")) if movie else None
+        if index is None:
+            raise HTTPException(status_code=404, detail="Movie configuration not found")
+        
+        entries, facet_counts = index.search(filters)
+        
+        theaters = []
+        by_format = {}
+        for theater_index, format_index, slot in entries:
+            if (theater_index, format_index) not in by_format:
+                theater = index.theaters[theater_index]
+                format_info = theater["formats"][format_index]
+                if not theaters or theaters[-1]["theater_index"] != theater_index:
+                    theaters.append({
+                        "theater_index": theater_index,
+                        "theater_id": theater.get("id"),
+                        "theater_name": theater.get("name"),
+                        "theater_address": theater.get("address"),
+                        "city": theater.get("city"),
+                        "chain": theater.get("chain"),
+                        "screening_formats": []
+                    })
+                by_format[(theater_index, format_index)] = {
+                    "category_name": format_info.get("category_name", "Unknown"),
+                    "category_id": format_info.get("category_id"),
+                    "times": []
+                }
+                theaters[-1]["screening_formats"].append(by_format[(theater_index, format_index)])
+            
+            by_format[(theater_index, format_index)]["times"].append({
+                "time": slot.get("time"),
+                "minutes": slot.get("minutes"),
+                "category": slot_time_category(slot),
+                "date": slot.get("date"),
+                "available_seats": slot.get("available_seats"),
+                "price_modifier": slot.get("price_modifier", 1.0)
+            })
+        
+        for theater in theaters:
+            del theater["theater_index"]
+        
+        return {
+            "movie_id": movie_id,
+            "total_showtimes": len(entries),
+            "total_theaters": len(theaters),
+            "theaters": theaters,
+            "facets": facet_counts,
+            "filters_applied": filters
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to filter showtimes: {str(e)}")
+
+class ColumnarShowtimes:
+    """Categorized showtimes as parallel arrays, one entry per time slot
+
+    Theaters, screening categories and show times are dictionary-encoded:
+    each distinct value is sent once and slots refer to it by index. Slots
+    keep theater, then format, then time order, so clients can rebuild the
+    nested listing in one pass.
+    """
+
+    def __init__(self):
+        self.theaters = {"id": [], "name": [], "address": []}
+        self.screening_categories = {"id": [], "name": []}
+        self.times: List[str] = []
+        self.showtimes = {
+            "theater": [], "screening_category": [], "time_category": [], "time": [],
+            "minutes": [], "available_seats": [], "price_modifier": []
+        }
+        self._codes = {"theater": {}, "screening_category": {}, "time": {}}
+
+    def _code(self, kind: str, key, add):
+        codes = self._codes[kind]
+        if key not in codes:
+            codes[key] = len(codes)
+            add()
+        return codes[key]
+
+    def add_theater(self, theater_index: int, theater: dict) -> int:
+        """Code of a theater, by its position (legacy theaters may have no id)"""
+        def add():
+            self.theaters["id"].append(theater.get("id"))
+            self.theaters["name"].append(theater.get("name"))
+            self.theaters["address"].append(theater.get("address"))
+        return self._code("theater", theater_index, add)
+
+    def add_screening_category(self, category_id: Optional[str], category_name: str) -> int:
+        def add():
+            self.screening_categories["id"].append(category_id)
+            self.screening_categories["name"].append(category_name)
+        return self._code("screening_category", (category_id, category_name), add)
+
+    def add_slot(self, theater_code: int, category_code: int, time_cat: str, slot: dict):
+        time_str = slot.get("time")
+        columns = self.showtimes
+        columns["theater"].append(theater_code)
+        columns["screening_category"].append(category_code)
+        columns["time_category"].append(TIME_CATEGORIES.index(time_cat))
+        columns["time"].append(self._code("time", time_str, lambda: self.times.append(time_str)))
+        columns["minutes"].append(slot.get("minutes"))
+        columns["available_seats"].append(slot.get("available_seats"))
+        columns["price_modifier"].append(slot.get("price_modifier", 1.0))
+
+    def payload(self) -> dict:
+        return {
+            "format": "columnar",
+            "total_theaters": len(self.theaters["id"]),
+            "total_showtimes": len(self.showtimes["theater"]),
+            "theaters": self.theaters,
+            "screening_categories": self.screening_categories,
+            "time_categories": TIME_CATEGORIES,
+            "times": self.times,
+            "showtimes": self.showtimes
+        }
+
 @router.get("/{movie_id}/showtimes/categorized")
 async def get_categorized_showtimes(
+    request: Request,
     movie_id: str,
     time_category: Optional[str] = Query(None, description="Filter by time category: morning, afternoon, evening, late_night"),
-    screening_category: Optional[str] = Query(None, description="Filter by screening category name")
+    screening_category: Optional[str] = Query(None, description="Filter by screening category name"),
+    response_format: str = Query("nested", alias="format", description="nested, or columnar for parallel arrays (MessagePack with Accept: application/msgpack)")
 ):
     """Get categorized showtimes for a movie with filtering options"""
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(RESPONSE_FORMATS)}")
     try:
         movie = await find_document("movie_configurations", {"id": movie_id})
         if not movie:
@@ -316,8 +928,9 @@ async def get_categorized_showtimes(
         
         theaters = movie.get("theaters", [])
         categorized_data = []
+        columnar = ColumnarShowtimes() if response_format == "columnar" else None
         
-        for theater in theaters:
+        for theater_index, theater in enumerate(theaters):
             theater_data = {
                 "theater_id": theater.get("id"),
                 "theater_name": theater.get("name"),
@@ -343,18 +956,30 @@ async def get_categorized_showtimes(
                 
                 # Categorize times
                 for time_slot in format_info.get("times", []):
-                    time_str = time_slot.get("time") if isinstance(time_slot, dict) else str(time_slot)
-                    time_cat = categorize_time(time_str)
+                    slot = time_slot if isinstance(time_slot, dict) else {"time": str(time_slot)}
+                    if slot.get("minutes") is not None:
+                        time_cat = slot["category"]
+                    else:
+                        time_cat = categorize_time(slot.get("time", ""))
                     
                     # Filter by time category if specified
                     if time_category and time_cat != time_category:
                         continue
                     
+                    if columnar:
+                        columnar.add_slot(
+                            columnar.add_theater(theater_index, theater),
+                            columnar.add_screening_category(format_data["category_id"], format_data["category_name"]),
+                            time_cat, slot
+                        )
+                        continue
+                    
                     time_info = {
-                        "time": time_str,
+                        "time": slot.get("time"),
+                        "minutes": slot.get("minutes"),
                         "category": time_cat,
-                        "available_seats": time_slot.get("available_seats") if isinstance(time_slot, dict) else None,
-                        "price_modifier": time_slot.get("price_modifier", 1.0) if isinstance(time_slot, dict) else 1.0
+                        "available_seats": slot.get("available_seats"),
+                        "price_modifier": slot.get("price_modifier", 1.0)
                     }
                     
                     format_data["times_by_category"][time_cat].append(time_info)
@@ -367,18 +992,32 @@ async def get_categorized_showtimes(
             if theater_data["screening_formats"]:
                 categorized_data.append(theater_data)
         
+        filters_applied = {
+            "time_category": time_category,
+            "screening_category": screening_category
+        }
+        
+        if columnar:
+            payload = {
+                "movie_id": movie_id,
+                "movie_title": movie.get("movie_title"),
+                **columnar.payload(),
+                "filters_applied": filters_applied
+            }
+            # The same URL serves JSON or MessagePack, so caches must key on Accept
+            if "application/msgpack" in request.headers.get("accept", ""):
+                return Response(msgpack.packb(payload), media_type="application/msgpack", headers={"Vary": "Accept"})
+            return JSONResponse(payload, headers={"Vary": "Accept"})
+        
         return {
             "movie_id": movie_id,
             "movie_title": movie.get("movie_title"),
             "total_theaters": len(categorized_data),
             "theaters": categorized_data,
-            "filters_applied": {
-                "time_category": time_category,
-                "screening_category": screening_category
-            }
+            "filters_applied": filters_applied
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to retrieve categorized showtimes: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve categorized showtimes: {str(e)}")
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from datetime import datetime, timezone
+import base64
+
+from ..showtimes import InvalidShowtime, get_timezone, showtime_index, utc_range, screening_response
+
+router = APIRouter(prefix="/showtimes", tags=["showtimes"])
+
+def encode_cursor(screening: dict) -> str:
+    """Opaque page token for the screening a page ended on"""
+    token = f"{screening['starts_at'].isoformat()}|{screening['id']}"
+    return base64.urlsafe_b64encode(token.encode()).decode()
+
+def decode_cursor(cursor: str):
+    """(starts_at, id) from a page token"""
+    try:
+        starts_at, screening_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(starts_at), screening_id
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+@router.get("/search")
+async def search_showtimes(
+    city: Optional[str] = Query(None),
+    state: Optional[str] = Query(None, description="Two-letter state code"),
+    zip_code: Optional[str] = Query(None, alias="zip"),
+    start: Optional[datetime] = Query(None, alias="from", description="Range start (default now)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Range end (default 24 hours after from)"),
+    tz: Optional[str] = Query(None, description="IANA timezone for naive from/to and local times (default each theater's)"),
+    formats: Optional[List[str]] = Query(None, alias="format", description="Screening formats, e.g. IMAX (any of)"),
+    chains: Optional[List[str]] = Query(None, alias="chain", description="Theater chains (any of)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=200)
+):
+    """Showtimes of every active movie, e.g. what's playing in Los Angeles tonight in IMAX
+
+    Reads the showtimes read model, kept in sync as movie configurations
+    change. Results are ordered by start time and paginated with next_cursor.
+    """
+    try:
+        zone = get_timezone(tz) if tz else None
+        range_start, range_end = utc_range(start, end, zone)
+    except InvalidShowtime as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    after = decode_cursor(cursor) if cursor else None
+
+    try:
+        screenings = await showtime_index.search(
+            range_start, range_end, city, state, zip_code, formats, chains, after, limit + 1
+        )
+        page = screenings[:limit]
+
+        results = []
+        for screening in page:
+            results.append({
+                "movie_id": screening["movie_id"],
+                "movie_title": screening.get("movie_title"),
+                "city": screening.get("city"),
+                "state": screening.get("state"),
+                "zip_code": screening.get("zip_code"),
+                "chain": screening.get("chain"),
+                **screening_response(screening, zone)
+            })
+
+        return {
+            "from": range_start.replace(tzinfo=timezone.utc),
+            "to": range_end.replace(tzinfo=timezone.utc),
+            "count": len(results),
+            "showtimes": results,
+            "next_cursor": encode_cursor(page[-1]) if len(screenings) > limit else None
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search showtimes: {str(e)}")
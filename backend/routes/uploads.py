@@ -1,70 +1,448 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
-from typing import List, Optional
-import os
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from fastapi.responses import FileResponse
+from typing import Dict, List, Optional
+import asyncio
+import mimetypes
 import uuid
+import os
 from datetime import datetime
-import shutil
 from pathlib import Path
-from PIL import Image
 import logging
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from PIL import features
 
-from ..models import ImageAsset, ImageUploadResponse
-from ..database import insert_document, find_document, find_documents, delete_document
+from ..models import (
+    ImageAsset, ImageUploadResponse, ImageVariant, ImagePlaceholder,
+    DirectUploadRequest, DirectUploadTicket, DirectUploadComplete
+)
+from ..database import (
+    insert_document, find_document, find_documents, delete_document,
+    find_one_and_update
+)
 from ..security import get_admin_user
+from ..quotas import quota_manager
+from ..jobs import job_queue, PermanentJobError
+from ..image_pipeline import (
+    image_pipeline, process_image, render_resized, IMAGE_VARIANT_WIDTHS, FORMAT_EXTENSIONS
+)
+from ..cache import DiskLRUCache, SingleFlight
+from ..upload_ingest import IngestedFile, ingest_multipart
+from ..storage import storage, LOCAL_STORAGE_DIR, DirectUploadNotSupported, PRESIGN_EXPIRES_SECONDS
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
-# Create uploads directory if it doesn't exist
-UPLOAD_DIR = Path("/app/uploads")
+# Create uploads directory if it doesn't exist; images are processed here
+# before being published to the storage backend (in place for local storage)
+UPLOAD_DIR = LOCAL_STORAGE_DIR
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# In-progress uploads are streamed here, on the same filesystem as UPLOAD_DIR
+# so the final rename is atomic
+INCOMING_DIR = UPLOAD_DIR / ".incoming"
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILES_PER_UPLOAD = 10
+
+# Image asset states while background processing runs
+IMAGE_PENDING = "pending"
+IMAGE_READY = "ready"
+IMAGE_FAILED = "failed"
+PROCESS_UPLOAD_JOB = "process_image_upload"
+
+# Raw uploads wait here in storage until their processing job has run
+PENDING_PREFIX = "incoming/pending/"
+
+# Unprocessed uploads (direct uploads, pending and in-progress files) that
+# the /uploads mount must not serve
+PRIVATE_UPLOAD_PREFIXES = ("incoming/", f"{INCOMING_DIR.name}/")
+
+# On-demand resize configuration; only whitelisted sizes are rendered so
+# the cache can't be flooded with one-off dimensions
+RESIZE_SIZES = {64, 96, 128, 160, 240, 320, 480, 640, 800, 960, 1280, 1600, 1920}
+RESIZE_FITS = {"cover", "contain"}
+RESIZE_FORMATS = {
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+    "png": ("PNG", "image/png", ".png"),
+}
+if features.check("avif"):
+    RESIZE_FORMATS["avif"] = ("AVIF", "image/avif", ".avif")
+
+RESIZE_CACHE_DIR = Path(os.environ.get("RESIZE_CACHE_DIR", "/app/cache/resized"))
+RESIZE_CACHE_MAX_BYTES = int(os.environ.get("RESIZE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+resize_cache = DiskLRUCache(RESIZE_CACHE_DIR, RESIZE_CACHE_MAX_BYTES)
+resize_flights = SingleFlight()
+
+def multipart_body_schema(file_field: str, multiple: bool, optional_fields: List[str]) -> dict:
+    """OpenAPI request body for endpoints that stream multipart uploads"""
+    file_schema = {"type": "string", "format": "binary"}
+    properties = {
+        file_field: {"type": "array", "items": file_schema} if multiple else file_schema,
+        "category": {"type": "string"},
+        "client_id": {"type": "string"},
+    }
+    for field in optional_fields:
+        properties[field] = {"type": "string"}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"multipart/form-data": {"schema": {
+                "type": "object",
+                "properties": properties,
+                "required": [file_field, "category", "client_id"]
+            }}}
+        }
+    }
 
-def validate_image(file: UploadFile) -> bool:
-    """Validate uploaded image file"""
+def validate_image(file: IngestedFile) -> bool:
+    """Validate an ingested image file"""
     file_extension = Path(file.filename).suffix.lower()
     
     if file_extension not in ALLOWED_EXTENSIONS:
         return False
     
-    if file.size > MAX_FILE_SIZE:
+    if file.error or file.image_type is None:
         return False
     
     return True
 
-def optimize_image(file_path: Path, max_width: int = 1920, quality: int = 85) -> None:
-    """Optimize image size and quality"""
+def require_fields(fields: dict, *names: str):
+    """Ensure required form fields were sent"""
+    missing = [name for name in names if not fields.get(name)]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing form fields: {', '.join(missing)}")
+
+async def take_blob_reference(sha256: str, job_id: str) -> Optional[dict]:
+    """Count a job's reference to an existing blob, at most once per job"""
+    blob = await find_one_and_update(
+        "image_blobs",
+        {"sha256": sha256, "acquiring_jobs": {"$ne": job_id}},
+        {"$inc": {"refcount": 1}, "$push": {"acquiring_jobs": job_id}}
+    )
+    if blob:
+        return blob
+    # Already taken by an earlier attempt of the same job
+    return await find_document("image_blobs", {"sha256": sha256, "acquiring_jobs": job_id})
+
+async def acquire_blob(file: IngestedFile, job_id: str) -> dict:
+    """Get the stored blob for an upload's content, creating it if needed
+    
+    Blobs are keyed by the SHA-256 of the uploaded bytes and refcounted by
+    the image assets that point at them, so a repeated upload only bumps
+    the refcount and skips optimization and the disk write entirely. The
+    job taking the reference is listed in acquiring_jobs until its asset
+    holds it, so a retried job doesn't count its reference twice.
+    """
+    blob = await take_blob_reference(file.sha256, job_id)
+    if blob:
+        return blob
+    
+    # New content: optimize the streamed temp file and render its variants in
+    # the worker pool, then publish it under its content-addressed name
+    processed = await image_pipeline.submit(
+        process_image, str(file.temp_path), str(UPLOAD_DIR), file.sha256, IMAGE_VARIANT_WIDTHS
+    )
+    
+    # The extension follows the optimized content, not the uploaded filename
+    file_extension = FORMAT_EXTENSIONS[processed["format"]]
+    filename = f"{file.sha256}{file_extension}"
+    file_path = UPLOAD_DIR / filename
+    file.commit(file_path)
+    file_size = file_path.stat().st_size
+    content_type = f"image/{processed['format'].lower()}"
+    
+    # Publish the master and its variants to storage concurrently
+    await asyncio.gather(
+        storage.put_file(filename, file_path, content_type),
+        *(
+            storage.put_file(variant["filename"], UPLOAD_DIR / variant["filename"], f"image/{variant['format']}")
+            for variant in processed["variants"]
+        )
+    )
+    
+    variants = [
+        ImageVariant(
+            width=variant["width"],
+            height=variant["height"],
+            format=variant["format"],
+            url=storage.url_for(variant["filename"]),
+            size=variant["size"]
+        ).dict()
+        for variant in processed["variants"]
+    ]
+    
+    blob = {
+        "sha256": file.sha256,
+        "url": storage.url_for(filename),
+        "size": file_size,
+        "content_type": content_type,
+        "width": processed["width"],
+        "height": processed["height"],
+        "variants": variants,
+        **processed["placeholder"],
+        "refcount": 1,
+        "acquiring_jobs": [job_id],
+        "created_at": datetime.utcnow()
+    }
     try:
-        with Image.open(file_path) as img:
-            # Convert to RGB if necessary
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            
-            # Resize if too large
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_height = int(img.height * ratio)
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Save optimized image
-            img.save(file_path, "JPEG", quality=quality, optimize=True)
-            
-    except Exception as e:
-        logger.error(f"Failed to optimize image {file_path}: {e}")
-
-@router.post("/image", response_model=ImageUploadResponse)
-async def upload_image(
-    file: UploadFile = File(...),
-    category: str = Form(...),
-    alt_text: str = Form(""),
-    client_id: str = Form(...)
-):
-    """Upload and optimize an image"""
+        await insert_document("image_blobs", blob)
+    except DuplicateKeyError:
+        # A concurrent upload of the same content won the race; share its blob
+        blob = await take_blob_reference(file.sha256, job_id)
+        if blob["url"] != storage.url_for(filename):
+            await storage.delete(filename)
+    return blob
+
+async def release_blob(image: dict):
+    """Drop an image asset's reference to its blob, unlinking the last copy"""
+    if not image.get("content_hash"):
+        # Assets uploaded before content addressing own their file outright
+        await storage.delete(Path(image["url"]).name)
+        return
+    
+    blob = await find_one_and_update("image_blobs", {"sha256": image["content_hash"]}, {"$inc": {"refcount": -1}})
+    if blob and blob["refcount"] <= 0:
+        deleted = await delete_document("image_blobs", {"sha256": blob["sha256"], "refcount": {"$lte": 0}})
+        if deleted:
+            urls = [blob["url"]] + [variant["url"] for variant in blob.get("variants", [])]
+            await asyncio.gather(*(storage.delete(Path(url).name) for url in urls))
+
+def build_srcset(variants: List[dict]) -> Dict[str, str]:
+    """srcset attribute values per variant format, narrowest first"""
+    srcset: Dict[str, List[str]] = {}
+    for variant in sorted(variants, key=lambda v: v["width"]):
+        srcset.setdefault(variant["format"], []).append(f"{variant['url']} {variant['width']}w")
+    return {image_format: ", ".join(entries) for image_format, entries in srcset.items()}
+
+def blob_image_fields(blob: dict) -> dict:
+    """Image asset fields copied from the blob holding its content"""
+    return {
+        "url": blob["url"],
+        "width": blob.get("width"),
+        "height": blob.get("height"),
+        "variants": blob.get("variants", []),
+        "srcset": build_srcset(blob.get("variants", [])),
+        # Blobs stored before placeholders were computed have none
+        **{field: blob.get(field) for field in ("blurhash", "lqip", "dominant_color")},
+        "palette": blob.get("palette", [])
+    }
+
+async def store_upload(file: IngestedFile, category: str, alt_text: str, client_id: str) -> ImageUploadResponse:
+    """Record a streamed upload as an image asset
+    
+    Content that is already stored is linked immediately. New content is
+    stashed in storage as-is and the asset is returned as pending while a
+    background job optimizes it, so the response time doesn't depend on
+    the image size.
+    """
+    # Known content only bumps the blob refcount
+    blob = await find_one_and_update("image_blobs", {"sha256": file.sha256}, {"$inc": {"refcount": 1}})
+    if blob is None:
+        image_asset = ImageAsset(
+            name=file.filename,
+            url="",
+            alt_text=alt_text or file.filename,
+            category=category,
+            content_hash=file.sha256,
+            status=IMAGE_PENDING
+        )
+        key = f"{PENDING_PREFIX}{image_asset.id}{Path(file.filename).suffix.lower()}"
+        await storage.put_file(key, file.temp_path, f"image/{file.image_type}")
+        await enqueue_processing(image_asset, client_id, key)
+        return upload_response(image_asset, file.size, f"image/{file.image_type}", "Uploaded, processing")
+    
+    # Create image asset record
+    image_asset = ImageAsset(
+        name=file.filename,
+        alt_text=alt_text or file.filename,
+        category=category,
+        content_hash=file.sha256,
+        **blob_image_fields(blob)
+    )
+    
+    # Add client_id to the asset record
+    asset_dict = image_asset.dict()
+    asset_dict["client_id"] = client_id
+    
+    await insert_document("image_assets", asset_dict)
+    
+    return upload_response(image_asset, blob["size"], blob["content_type"], "Uploaded successfully")
+
+async def enqueue_processing(image_asset: ImageAsset, client_id: str, key: str):
+    """Save a pending asset and queue the job that optimizes its stored upload"""
+    asset_dict = image_asset.dict()
+    asset_dict["client_id"] = client_id
+    asset_dict["upload_key"] = key
+    asset_dict["job_id"] = str(uuid.uuid4())
+    
+    await insert_document("image_assets", asset_dict)
     try:
+        await job_queue.enqueue(
+            PROCESS_UPLOAD_JOB, {"image_id": image_asset.id, "key": key}, job_id=asset_dict["job_id"]
+        )
+    except Exception:
+        await delete_document("image_assets", {"id": image_asset.id})
+        await storage.delete(key)
+        raise
+
+async def claim_direct_upload(image_asset: ImageAsset, client_id: str, key: str, job_id: str) -> Optional[dict]:
+    """Save the pending asset for a directly uploaded object, once per object
+    
+    Returns the asset already registered for the object, or None when this
+    call registered it. source_key is unique, so concurrent completions
+    can't both insert.
+    """
+    asset_dict = image_asset.dict()
+    asset_dict.update(client_id=client_id, upload_key=key, source_key=key, job_id=job_id)
+    try:
+        return await find_one_and_update(
+            "image_assets", {"source_key": key}, {"$setOnInsert": asset_dict},
+            upsert=True, return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        registered = await find_document("image_assets", {"source_key": key})
+        if not registered:
+            raise HTTPException(status_code=409, detail="Upload is being registered, retry")
+        return registered
+
+def upload_response(image_asset: ImageAsset, file_size: int, file_type: str, message: str) -> ImageUploadResponse:
+    """Response entry for a stored or pending upload"""
+    return ImageUploadResponse(
+        id=image_asset.id,
+        name=image_asset.name,
+        url=image_asset.url,
+        alt_text=image_asset.alt_text,
+        category=image_asset.category,
+        uploaded_at=image_asset.uploaded_at,
+        file_size=file_size,
+        file_type=file_type,
+        variants=image_asset.variants,
+        srcset=image_asset.srcset,
+        placeholder=image_placeholder(image_asset.dict()),
+        status=image_asset.status,
+        message=message
+    )
+
+def image_placeholder(image: dict) -> Optional[ImagePlaceholder]:
+    """An asset's placeholders, if it has any yet"""
+    if not (image.get("blurhash") or image.get("lqip") or image.get("dominant_color")):
+        return None
+    return ImagePlaceholder(
+        blurhash=image.get("blurhash"),
+        lqip=image.get("lqip"),
+        dominant_color=image.get("dominant_color"),
+        palette=image.get("palette") or []
+    )
+
+async def process_upload_job(job: dict) -> dict:
+    """Optimize a pending upload and publish it as a blob (runs on the job queue)"""
+    payload = job["payload"]
+    image = await find_document("image_assets", {"id": payload["image_id"]})
+    if not image or image.get("status") != IMAGE_PENDING:
+        # Deleted (or already processed) before the job ran
+        await storage.delete(payload["key"])
+        return {"skipped": True}
+    
+    # Read the stored upload back through the ingest checks, which also hash it
+    INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    file = IngestedFile(filename=image["name"], content_type="", temp_dir=INCOMING_DIR)
+    try:
+        try:
+            async for chunk in storage.iter_chunks(payload["key"]):
+                file.write(chunk, MAX_FILE_SIZE)
+                if file.error:
+                    break
+            file.finish()
+        except FileNotFoundError:
+            raise PermanentJobError("Uploaded file is missing")
+        if file.error:
+            raise PermanentJobError(file.error.detail)
+        
+        try:
+            blob = await acquire_blob(file, job["id"])
+        except HTTPException as e:
+            if e.status_code != 400:
+                raise
+            # Retrying won't make the image decodable
+            raise PermanentJobError(e.detail)
+    finally:
+        file.discard()
+    
+    updated = await find_one_and_update(
+        "image_assets",
+        {"id": image["id"], "status": IMAGE_PENDING},
+        {
+            "$set": {
+                "status": IMAGE_READY,
+                "content_hash": file.sha256,
+                **blob_image_fields(blob),
+                "processed_at": datetime.utcnow()
+            },
+            "$unset": {"upload_key": ""}
+        }
+    )
+    if not updated:
+        # The asset was deleted while it was being processed
+        await release_blob({"content_hash": file.sha256, "url": blob["url"]})
+    await find_one_and_update("image_blobs", {"sha256": file.sha256}, {"$pull": {"acquiring_jobs": job["id"]}})
+    
+    await storage.delete(payload["key"])
+    return {"url": blob["url"]}
+
+async def fail_upload_job(job: dict):
+    """Mark an upload that could not be processed as failed"""
+    payload = job["payload"]
+    await find_one_and_update(
+        "image_assets",
+        {"id": payload["image_id"], "status": IMAGE_PENDING},
+        {"$set": {"status": IMAGE_FAILED, "error": job.get("last_error")}, "$unset": {"upload_key": ""}}
+    )
+    await storage.delete(payload["key"])
+
+job_queue.register(PROCESS_UPLOAD_JOB, process_upload_job, on_dead=fail_upload_job)
+
+def upload_failure(file: IngestedFile, category: str, message: str) -> ImageUploadResponse:
+    """Response entry for a file that was not stored"""
+    return ImageUploadResponse(
+        id="",
+        name=file.filename,
+        url="",
+        alt_text="",
+        category=category,
+        uploaded_at=datetime.utcnow(),
+        file_size=0,
+        file_type=file.content_type,
+        message=message
+    )
+
+@router.post(
+    "/image",
+    response_model=ImageUploadResponse,
+    openapi_extra=multipart_body_schema("file", multiple=False, optional_fields=["alt_text"])
+)
+async def upload_image(request: Request):
+    """Upload and optimize an image
+    
+    The multipart body (file, category, client_id, alt_text) is streamed to
+    disk in chunks; oversized or non-image files are rejected as soon as the
+    limit is crossed or the first bytes are seen.
+    """
+    files: List[IngestedFile] = []
+    try:
+        fields, files = await ingest_multipart(request, INCOMING_DIR, MAX_FILE_SIZE, max_files=1)
+        require_fields(fields, "category", "client_id")
+        if not files:
+            raise HTTPException(status_code=422, detail="Missing form fields: file")
+        
+        file = files[0]
+        category = fields["category"]
+        client_id = fields["client_id"]
+        
         # Validate file
         if not validate_image(file):
             raise HTTPException(
@@ -78,50 +456,76 @@ async def upload_image(
             raise HTTPException(status_code=404, detail="Client not found")
         
         # Check image limits
-        existing_images = len(await find_documents("image_assets", {"client_id": client_id}))
-        if existing_images >= client.get("max_images", 10):
-            raise HTTPException(status_code=400, detail="Image limit reached for this subscription tier")
-        
-        # Generate unique filename
-        file_id = str(uuid.uuid4())
-        file_extension = Path(file.filename).suffix.lower()
-        filename = f"{file_id}{file_extension}"
-        file_path = UPLOAD_DIR / filename
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Optimize image
-        optimize_image(file_path)
-        
-        # Create image asset record
-        image_asset = ImageAsset(
-            id=file_id,
-            name=file.filename,
-            url=f"/uploads/{filename}",
-            alt_text=alt_text or file.filename,
-            category=category
-        )
-        
-        # Add client_id to the asset record
-        asset_dict = image_asset.dict()
-        asset_dict["client_id"] = client_id
-        
-        await insert_document("image_assets", asset_dict)
-        
-        return ImageUploadResponse(
-            id=file_id,
-            name=file.filename,
-            url=f"/uploads/{filename}",
-            message="Image uploaded successfully"
-        )
+        await quota_manager.reserve(client, "images")
+        try:
+            return await store_upload(file, category, fields.get("alt_text", ""), client_id)
+        except BaseException:
+            await quota_manager.release(client_id, "images")
+            raise
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    finally:
+        for file in files:
+            file.discard()
+
+@router.get("/resize/{image_id}")
+async def resize_image(
+    image_id: str,
+    w: int = Query(..., description="Target width; one of RESIZE_SIZES"),
+    h: Optional[int] = Query(None, description="Target height; one of RESIZE_SIZES"),
+    fit: str = Query("contain", description="cover or contain (when h is given)"),
+    fmt: str = Query("webp", description="Output format: webp, jpeg, png (avif when supported)")
+):
+    """Serve an image at an arbitrary whitelisted size
+    
+    Renders happen in the image worker pool and are kept in a byte-bounded
+    disk LRU; concurrent requests for the same rendition share one render.
+    Cache hits only check that the image still exists, so a deleted image
+    stops being served by workers whose cache it is still in.
+    """
+    if w not in RESIZE_SIZES or (h is not None and h not in RESIZE_SIZES):
+        raise HTTPException(status_code=400, detail=f"Sizes must be one of {sorted(RESIZE_SIZES)}")
+    if fit not in RESIZE_FITS:
+        raise HTTPException(status_code=400, detail=f"fit must be one of {sorted(RESIZE_FITS)}")
+    if fmt not in RESIZE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"fmt must be one of {sorted(RESIZE_FORMATS)}")
+    if not image_id.replace("-", "").isalnum():
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    pil_format, media_type, extension = RESIZE_FORMATS[fmt]
+    key = f"{image_id}-{w}x{h or 0}-{fit if h else 'scale'}{extension}"
+    headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+    
+    cached = resize_cache.get(key)
+    if cached:
+        if not await find_document("image_assets", {"id": image_id}, {"_id": 1}):
+            resize_cache.purge(f"{image_id}-")
+            raise HTTPException(status_code=404, detail="Image not found")
+        return FileResponse(cached, media_type=media_type, headers=headers)
+    
+    async def render() -> Path:
+        image = await find_document("image_assets", {"id": image_id})
+        if not image:
+            raise HTTPException(status_code=404, detail="Image not found")
+        if image.get("status", IMAGE_READY) != IMAGE_READY:
+            raise HTTPException(status_code=409, detail=f"Image is {image['status']}")
+        
+        temp_path = resize_cache.temp_path_for(key)
+        try:
+            async with storage.local_copy(Path(image["url"]).name) as source:
+                await image_pipeline.submit(render_resized, str(source), str(temp_path), w, h, fit, pil_format)
+            return resize_cache.put(key, temp_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Image file not found")
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    path = await resize_flights.do(key, render)
+    return FileResponse(path, media_type=media_type, headers=headers)
 
 @router.get("/images", response_model=List[ImageAsset])
 async def get_images(
@@ -158,6 +562,37 @@ async def get_image(image_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve image: {str(e)}")
 
+@router.get("/images/{image_id}/status")
+async def get_image_status(image_id: str):
+    """Poll the processing state of an uploaded image
+    
+    status is pending until the background job has optimized the upload,
+    then ready (url and variants are set) or failed (error explains why).
+    """
+    try:
+        image = await find_document("image_assets", {"id": image_id})
+        if not image:
+            raise HTTPException(status_code=404, detail="Image not found")
+        
+        status = {
+            "id": image_id,
+            "status": image.get("status", IMAGE_READY),
+            "url": image.get("url", ""),
+            "placeholder": image_placeholder(image),
+            "error": image.get("error")
+        }
+        if status["status"] == IMAGE_PENDING and image.get("job_id"):
+            job = await job_queue.get(image["job_id"])
+            if job:
+                status["attempts"] = job["attempts"]
+                status["last_error"] = job["last_error"]
+        return status
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve image status: {str(e)}")
+
 @router.delete("/images/{image_id}")
 async def delete_image(image_id: str):
     """Delete an image"""
@@ -167,18 +602,31 @@ async def delete_image(image_id: str):
         if not image:
             raise HTTPException(status_code=404, detail="Image not found")
         
-        # Delete file from filesystem
-        filename = Path(image["url"]).name
-        file_path = UPLOAD_DIR / filename
-        
-        if file_path.exists():
-            file_path.unlink()
-        
-        # Delete from database
-        success = await delete_document("image_assets", {"id": image_id})
+        # Delete from database; a pending asset is only deleted while still
+        # pending, otherwise its job finished first and it now holds a blob
+        status = image.get("status", IMAGE_READY)
+        filter_dict = {"id": image_id}
+        if status != IMAGE_READY:
+            filter_dict["status"] = status
+        success = await delete_document("image_assets", filter_dict)
+        if not success and status != IMAGE_READY:
+            image = await find_document("image_assets", {"id": image_id})
+            status = IMAGE_READY
+            success = image is not None and await delete_document("image_assets", {"id": image_id})
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete image record")
         
+        if image.get("client_id"):
+            await quota_manager.release(image["client_id"], "images")
+        
+        resize_cache.purge(f"{image_id}-")
+        if status == IMAGE_READY:
+            # Delete the file once no other asset references it
+            await release_blob(image)
+        elif image.get("upload_key"):
+            # Not processed yet; its job skips deleted assets
+            await storage.delete(image["upload_key"])
+        
         return {"message": "Image deleted successfully"}
         
     except HTTPException:
@@ -186,86 +634,152 @@ async def delete_image(image_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete image: {str(e)}")
 
-@router.post("/multiple", response_model=List[ImageUploadResponse])
-async def upload_multiple_images(
-    files: List[UploadFile] = File(...),
-    category: str = Form(...),
-    client_id: str = Form(...)
-):
+@router.post(
+    "/multiple",
+    response_model=List[ImageUploadResponse],
+    openapi_extra=multipart_body_schema("files", multiple=True, optional_fields=[])
+)
+async def upload_multiple_images(request: Request):
     """Upload multiple images at once"""
+    files: List[IngestedFile] = []
     try:
-        if len(files) > 10:
-            raise HTTPException(status_code=400, detail="Maximum 10 files allowed per upload")
+        fields, files = await ingest_multipart(
+            request, INCOMING_DIR, MAX_FILE_SIZE, max_files=MAX_FILES_PER_UPLOAD, strict=False
+        )
+        require_fields(fields, "category", "client_id")
+        category = fields["category"]
+        client_id = fields["client_id"]
         
         # Check client exists and limits
         client = await find_document("clients", {"id": client_id})
         if not client:
             raise HTTPException(status_code=404, detail="Client not found")
         
-        existing_images = len(await find_documents("image_assets", {"client_id": client_id}))
-        if existing_images + len(files) > client.get("max_images", 10):
-            raise HTTPException(status_code=400, detail="Image limit would be exceeded")
+        await quota_manager.reserve(client, "images", len(files))
+        
+        async def process_file(file: IngestedFile) -> ImageUploadResponse:
+            # Validate file
+            if not validate_image(file):
+                return upload_failure(file, category, "Skipped: Invalid file format or size")
+            
+            try:
+                return await store_upload(file, category, file.filename, client_id)
+            except HTTPException as e:
+                return upload_failure(file, category, f"Failed: {e.detail}")
+            except Exception as e:
+                return upload_failure(file, category, f"Failed: {str(e)}")
+        
+        # Files are optimized in parallel across the worker pool
+        try:
+            results = await asyncio.gather(*(process_file(file) for file in files))
+        except BaseException:
+            await quota_manager.release(client_id, "images", len(files))
+            raise
         
-        results = []
+        # Give back the quota reserved for files that were not stored
+        await quota_manager.release(client_id, "images", sum(1 for result in results if not result.id))
         
+        return list(results)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk upload failed: {str(e)}")
+    finally:
         for file in files:
-            try:
-                # Validate file
-                if not validate_image(file):
-                    results.append(ImageUploadResponse(
-                        id="",
-                        name=file.filename,
-                        url="",
-                        message=f"Skipped: Invalid file format or size"
-                    ))
-                    continue
-                
-                # Generate unique filename
-                file_id = str(uuid.uuid4())
-                file_extension = Path(file.filename).suffix.lower()
-                filename = f"{file_id}{file_extension}"
-                file_path = UPLOAD_DIR / filename
-                
-                # Save file
-                with open(file_path, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                
-                # Optimize image
-                optimize_image(file_path)
-                
-                # Create image asset record
-                image_asset = ImageAsset(
-                    id=file_id,
-                    name=file.filename,
-                    url=f"/uploads/{filename}",
-                    alt_text=file.filename,
-                    category=category
+            file.discard()
+
+@router.post("/direct", response_model=DirectUploadTicket)
+async def create_direct_upload(upload: DirectUploadRequest):
+    """Get presigned instructions for uploading an image straight to the bucket
+    
+    Files up to the storage part size get one presigned POST; larger files
+    get a multipart upload with a presigned PUT URL per part, which the
+    client can send in parallel. Register the object afterwards with
+    POST /uploads/direct/complete.
+    """
+    file_extension = Path(upload.filename).suffix.lower()
+    if file_extension not in ALLOWED_EXTENSIONS or not upload.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="Only JPG, PNG, WebP, and GIF files are allowed.")
+    if not 0 < upload.size <= MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {MAX_FILE_SIZE // (1024 * 1024)}MB upload limit")
+    
+    client = await find_document("clients", {"id": upload.client_id})
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    
+    key = f"incoming/{upload.client_id}/{uuid.uuid4()}{file_extension}"
+    try:
+        ticket = await storage.presign_upload(key, upload.content_type, upload.size)
+    except DirectUploadNotSupported as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    return DirectUploadTicket(key=key, expires_in=PRESIGN_EXPIRES_SECONDS, **ticket)
+
+@router.post("/direct/complete", response_model=ImageUploadResponse)
+async def complete_direct_upload(upload: DirectUploadComplete):
+    """Register an image that was uploaded straight to the bucket
+    
+    The asset is returned as pending; the processing job reads the object
+    back through the same size, type and content-hash checks as a streamed
+    upload before publishing it. Poll GET /uploads/images/{id}/status.
+    Completing the same key again returns the asset it registered.
+    """
+    if not upload.key.startswith(f"incoming/{upload.client_id}/") or ".." in upload.key:
+        raise HTTPException(status_code=400, detail="Invalid upload key")
+    
+    client = await find_document("clients", {"id": upload.client_id})
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    
+    try:
+        filename = upload.filename or Path(upload.key).name
+        file_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        image_asset = ImageAsset(
+            name=filename,
+            url="",
+            alt_text=upload.alt_text or filename,
+            category=upload.category,
+            status=IMAGE_PENDING
+        )
+        job_id = str(uuid.uuid4())
+        
+        # A retried or concurrent completion gets the asset registered first
+        registered = await claim_direct_upload(image_asset, upload.client_id, upload.key, job_id)
+        if registered:
+            return upload_response(ImageAsset(**registered), 0, file_type, "Already registered")
+        
+        try:
+            # Check image limits
+            await quota_manager.reserve(client, "images")
+        except BaseException:
+            await delete_document("image_assets", {"id": image_asset.id})
+            raise
+        try:
+            if upload.upload_id and not await storage.exists(upload.key):
+                if not upload.parts:
+                    raise HTTPException(status_code=422, detail="parts are required to complete a multipart upload")
+                await storage.complete_multipart_upload(
+                    upload.key, upload.upload_id, [part.dict() for part in upload.parts]
                 )
-                
-                # Add client_id to the asset record
-                asset_dict = image_asset.dict()
-                asset_dict["client_id"] = client_id
-                
-                await insert_document("image_assets", asset_dict)
-                
-                results.append(ImageUploadResponse(
-                    id=file_id,
-                    name=file.filename,
-                    url=f"/uploads/{filename}",
-                    message="Uploaded successfully"
-                ))
-                
-            except Exception as e:
-                results.append(ImageUploadResponse(
-                    id="",
-                    name=file.filename,
-                    url="",
-                    message=f"Failed: {str(e)}"
-                ))
+            if not await storage.exists(upload.key):
+                raise HTTPException(status_code=404, detail="Uploaded object not found")
+            
+            await job_queue.enqueue(
+                PROCESS_UPLOAD_JOB, {"image_id": image_asset.id, "key": upload.key}, job_id=job_id
+            )
+        except BaseException:
+            # Release the claim so the client can retry
+            await delete_document("image_assets", {"id": image_asset.id, "status": IMAGE_PENDING})
+            await quota_manager.release(upload.client_id, "images")
+            raise
         
-        return results
+        return upload_response(image_asset, 0, file_type, "Registered, processing")
         
     except HTTPException:
         raise
+    except DirectUploadNotSupported as e:
+        raise HTTPException(status_code=501, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Bulk upload failed: {str(e)}")
\ No newline at end of file
+        logger.error(f"Direct upload registration failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
@@ -0,0 +1,156 @@
+"""
+Movie search for Movie Booking SDK
+Ranked full-text search over a weighted text index, and type-ahead
+autocomplete over a normalized title and edge n-grams stored on each
+movie document
+"""
+
+import os
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from .database import aggregate, find_documents
+
+# Autocomplete configuration
+AUTOCOMPLETE_MAX_PREFIX = int(os.environ.get("AUTOCOMPLETE_MAX_PREFIX", "15"))  # characters
+AUTOCOMPLETE_CANDIDATES = int(os.environ.get("AUTOCOMPLETE_CANDIDATES", "200"))  # movies ranked per query
+
+SEARCH_MODES = ["text", "autocomplete"]
+
+# Fields whose words can be typed ahead
+PREFIX_FIELDS = ["movie_title", "movie_subtitle", "director", "cast"]
+
+# What a search result carries instead of the whole configuration
+SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "client_id": 1, "movie_title": 1, "movie_subtitle": 1, "director": 1,
+    "cast": 1, "genre": 1, "release_date": 1, "poster_image": 1, "is_active": 1
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def search_tokens(text: Optional[str]) -> List[str]:
+    """Lowercase, accent-free words of a string"""
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return TOKEN_PATTERN.findall(folded)
+
+def field_tokens(movie: dict, field: str) -> List[str]:
+    """Words of a movie field holding a string or a list of strings"""
+    values = movie.get(field)
+    return [token for value in (values if isinstance(values, list) else [values]) for token in search_tokens(value)]
+
+def search_prefixes(movie: dict) -> List[str]:
+    """Edge n-grams of every word of a movie's title, subtitle, director and cast
+
+    Stored on the movie under a multikey index, so a type-ahead prefix is
+    an index equality match instead of an unanchored regex scan.
+    """
+    prefixes = set()
+    for field in PREFIX_FIELDS:
+        for token in field_tokens(movie, field):
+            for length in range(1, min(len(token), AUTOCOMPLETE_MAX_PREFIX) + 1):
+                prefixes.add(token[:length])
+    return sorted(prefixes)
+
+def title_key(movie: dict) -> str:
+    """A movie's title as lowercase, accent-free words, for anchored prefix ranges"""
+    return " ".join(field_tokens(movie, "movie_title"))
+
+def search_fields(movie: dict) -> dict:
+    """The derived fields autocomplete reads, stored on every movie write"""
+    return {"search_prefixes": search_prefixes(movie), "title_key": title_key(movie)}
+
+def prefix_range(prefix: str) -> dict:
+    """Filter for strings starting with a non-empty prefix, as an index range"""
+    return {"$gte": prefix, "$lt": prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+
+def base_filter(client_id: Optional[str], is_active: Optional[bool]) -> dict:
+    filter_dict = {}
+    if client_id:
+        filter_dict["client_id"] = client_id
+    if is_active is not None:
+        filter_dict["is_active"] = is_active
+    return filter_dict
+
+def autocomplete_rank(movie: dict, query: str, tokens: List[str]) -> Tuple[int, str]:
+    """Sort key: title starts with the query, then a title word does, then anything else"""
+    words = field_tokens(movie, "movie_title")
+    title = " ".join(words)
+    if title.startswith(query):
+        tier = 0
+    elif all(any(word.startswith(token) for word in words) for token in tokens):
+        tier = 1
+    else:
+        tier = 2
+    return tier, title
+
+async def autocomplete(query: str, client_id: Optional[str] = None, is_active: Optional[bool] = None,
+                       limit: int = 10) -> List[dict]:
+    """Movies with a word starting with each word of the query, best title matches first
+
+    Titles starting with the query are read first from the title_key
+    index, so they can't be crowded out of the ranked candidates; the
+    rest of the page is filled from the prefix index.
+    """
+    tokens = search_tokens(query)
+    if not tokens:
+        return []
+
+    normalized = " ".join(tokens)
+    filter_dict = base_filter(client_id, is_active)
+    matches = await find_documents(
+        "movie_configurations", {**filter_dict, "title_key": prefix_range(normalized)}, limit,
+        sort=[("title_key", 1)], projection=SUMMARY_PROJECTION
+    )
+    if len(matches) >= limit:
+        return matches
+
+    filter_dict["search_prefixes"] = {"$all": [token[:AUTOCOMPLETE_MAX_PREFIX] for token in tokens]}
+    if matches:
+        filter_dict["id"] = {"$nin": [movie["id"] for movie in matches]}
+    candidates = await find_documents(
+        "movie_configurations", filter_dict, AUTOCOMPLETE_CANDIDATES,
+        sort=[("movie_title", 1)], projection=SUMMARY_PROJECTION
+    )
+    # Prefixes are capped, so longer words are checked here
+    long_tokens = [token for token in tokens if len(token) > AUTOCOMPLETE_MAX_PREFIX]
+    if long_tokens:
+        candidates = [
+            movie for movie in candidates
+            if all(
+                any(word.startswith(token) for field in PREFIX_FIELDS for word in field_tokens(movie, field))
+                for token in long_tokens
+            )
+        ]
+
+    candidates.sort(key=lambda movie: autocomplete_rank(movie, normalized, tokens))
+    return matches + candidates[:limit - len(matches)]
+
+async def text_search(query: str, client_id: Optional[str] = None, is_active: Optional[bool] = None,
+                      page: int = 1, limit: int = 20) -> Dict[str, object]:
+    """A page of movies matching the query, by text relevance, with the total match count
+
+    Uses the movie_text index (title, subtitle, director, cast, genre and
+    logline, weighted in that order).
+    """
+    filter_dict = base_filter(client_id, is_active)
+    filter_dict["$text"] = {"$search": query}
+    results = await aggregate("movie_configurations", [
+        {"$match": filter_dict},
+        {"$project": {**SUMMARY_PROJECTION, "score": {"$meta": "textScore"}}},
+        {"$facet": {
+            "results": [
+                {"$sort": {"score": -1, "movie_title": 1}},
+                {"$skip": (page - 1) * limit},
+                {"$limit": limit}
+            ],
+            "total": [{"$count": "count"}]
+        }}
+    ])
+    facets = results[0] if results else {"results": [], "total": []}
+    return {
+        "results": facets["results"],
+        "total": facets["total"][0]["count"] if facets["total"] else 0
+    }
@@ -7,30 +7,58 @@ import os
 import jwt
 import hashlib
 import secrets
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Tuple
 from fastapi import HTTPException, Request, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
 import time
+import threading
 from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
 
+from pymongo.errors import DuplicateKeyError
+
+from .cache import LRUCache
+from .database import find_document, find_one_and_update
+
 # Security configuration
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", secrets.token_urlsafe(32))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 API_KEY_EXPIRE_DAYS = 365
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing configuration
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "32"))
+
+# Password hashing (hashes with a different cost are flagged for rehash)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # JWT Security
 security = HTTPBearer()
 
+# Decoded token cache (keyed by token digest, entries live until the token's exp)
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "1024"))
+token_cache = LRUCache(max_size=TOKEN_CACHE_SIZE)
+
+# How long a process trusts that a token is not revoked before asking the
+# shared store again, i.e. how late a logout elsewhere can take effect
+TOKEN_REVOCATION_REFRESH_SECONDS = float(os.environ.get("TOKEN_REVOCATION_REFRESH_SECONDS", "10"))
+
 # Rate limiting storage (in production, use Redis)
 rate_limit_storage = defaultdict(lambda: deque())
 
+# Rate limit tiers and per-minute limits
+RATE_LIMIT_TIER_EXEMPT = "exempt"
+RATE_LIMIT_TIER_ADMIN = "admin"
+RATE_LIMIT_TIER_PUBLIC = "public"
+RATE_LIMIT_PUBLIC = int(os.environ.get("RATE_LIMIT_PUBLIC", "60"))
+RATE_LIMIT_AUTHENTICATED = int(os.environ.get("RATE_LIMIT_AUTHENTICATED", "200"))
+RATE_LIMIT_ADMIN = int(os.environ.get("RATE_LIMIT_ADMIN", "500"))
+
 class RateLimiter:
     """Rate limiting implementation with sliding window"""
     
@@ -67,6 +95,175 @@ class RateLimiter:
 # Global rate limiter instance
 rate_limiter = RateLimiter()
 
+class RouteTierTrie:
+    """Prefix trie of URL path segments to rate limit tiers
+    
+    Tiers are registered once per route prefix when routers are included, so
+    resolving a request path costs one dict lookup per path segment.
+    """
+    
+    def __init__(self, default_tier: str = RATE_LIMIT_TIER_PUBLIC):
+        self.root = self._new_node()
+        self.root["tier"] = default_tier
+    
+    @staticmethod
+    def _new_node() -> dict:
+        return {"children": {}, "tier": None, "exact_tier": None}
+    
+    @staticmethod
+    def _segments(path: str) -> list:
+        return [segment for segment in path.split("/") if segment]
+    
+    def register(self, prefix: str, tier: str, exact: bool = False):
+        """Assign a tier to a path prefix, or to the exact path only"""
+        node = self.root
+        for segment in self._segments(prefix):
+            node = node["children"].setdefault(segment, self._new_node())
+        
+        if exact:
+            node["exact_tier"] = tier
+        else:
+            node["tier"] = tier
+    
+    def resolve(self, path: str) -> str:
+        """Return the tier of the longest registered prefix of path"""
+        node = self.root
+        tier = node["tier"]
+        for segment in self._segments(path):
+            node = node["children"].get(segment)
+            if node is None:
+                return tier
+            if node["tier"] is not None:
+                tier = node["tier"]
+        
+        return node["exact_tier"] or tier
+
+# Global route tier registry, populated as routers are included
+rate_limit_tiers = RouteTierTrie()
+
+class TokenRevocationList:
+    """Revoked token digests, kept until the token would have expired anyway
+    
+    Revocations are stored in the revoked_tokens collection, whose TTL index
+    on expires_at drops them, so a logout holds in every process. Each
+    process reads through an in-memory cache: digests known to be revoked,
+    and digests found unrevoked, rechecked after refresh_seconds.
+    """
+    
+    def __init__(self, refresh_seconds: float = TOKEN_REVOCATION_REFRESH_SECONDS,
+                 max_size: int = TOKEN_CACHE_SIZE):
+        self.revoked: Dict[str, float] = {}
+        self.unrevoked = LRUCache(max_size=max_size, ttl=refresh_seconds)
+    
+    async def revoke(self, digest: str, expires_at: float):
+        """Mark a token digest as revoked"""
+        self.revoked[digest] = expires_at
+        self.unrevoked.delete(digest)
+        self.prune()
+        try:
+            await find_one_and_update(
+                "revoked_tokens",
+                {"digest": digest},
+                {"$set": {"expires_at": datetime.utcfromtimestamp(expires_at)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Revoked concurrently by another request
+            pass
+    
+    async def is_revoked(self, digest: str) -> bool:
+        """Check if a token digest has been revoked, by this or any process"""
+        if digest in self.revoked:
+            return True
+        if self.unrevoked.get(digest):
+            return False
+        
+        entry = await find_document("revoked_tokens", {"digest": digest})
+        if entry:
+            self.revoked[digest] = entry["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+            self.prune()
+            return True
+        self.unrevoked.set(digest, True)
+        return False
+    
+    def prune(self):
+        """Drop entries for tokens that have expired"""
+        now = time.time()
+        for digest in [d for d, exp in self.revoked.items() if exp <= now]:
+            del self.revoked[digest]
+
+# Global revocation list instance
+revoked_tokens = TokenRevocationList()
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated bounded thread pool off the event loop"""
+    
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self.pending = 0  # queued + running jobs
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+    
+    def _call(self, func, *args):
+        """Execute a hashing function on a worker thread"""
+        with self._lock:
+            self.running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+    
+    async def run(self, func, *args):
+        """Run a hashing function, rejecting work once the queue is full"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication service busy. Try again shortly.",
+                headers={"Retry-After": "1"}
+            )
+        
+        loop = asyncio.get_running_loop()
+        job = self.executor.submit(self._call, func, *args)
+        # Counted until the worker is done with the job, not until the
+        # caller stops waiting, so a cancelled request still holds its slot
+        self.pending += 1
+        job.add_done_callback(lambda _: self._job_done(loop))
+        return await asyncio.wrap_future(job)
+    
+    def _job_done(self, loop: asyncio.AbstractEventLoop):
+        """Release a job's slot; called from the worker thread when the job finishes"""
+        def release():
+            self.pending -= 1
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            # The event loop has already closed
+            pass
+    
+    def stats(self) -> Dict[str, int]:
+        """Current pool utilisation and queue depth"""
+        return {
+            "workers": self.max_workers,
+            "running": self.running,
+            "queue_depth": max(0, self.pending - self.running),
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+    
+    def shutdown(self):
+        """Stop the worker threads"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
+
 class SecurityManager:
     """Central security manager for authentication and authorization"""
     
@@ -88,6 +285,20 @@ class SecurityManager:
         """Verify a password against its hash"""
         return pwd_context.verify(plain_password, hashed_password)
     
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """Hash a password on the password hashing pool"""
+        return await password_hasher.run(pwd_context.hash, password)
+    
+    @staticmethod
+    async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password on the password hashing pool
+        
+        Returns (valid, new_hash); new_hash is set when the stored hash was
+        created with a different bcrypt cost and should be replaced.
+        """
+        return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+    
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create a JWT access token"""
@@ -101,26 +312,61 @@ class SecurityManager:
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
     
+    @staticmethod
+    def token_digest(token: str) -> str:
+        """Digest used to key cached and revoked tokens"""
+        return hashlib.sha256(token.encode()).hexdigest()
+    
     @staticmethod
     def verify_token(token: str) -> Dict[str, Any]:
-        """Verify and decode a JWT token"""
+        """Verify and decode a JWT token
+        
+        Decoded claims are cached until the token's exp, so repeated requests
+        with the same token skip signature verification. Revocation is
+        checked separately, by get_current_user.
+        """
+        digest = SecurityManager.token_digest(token)
+        cached = token_cache.get(digest)
+        if cached is not None:
+            return dict(cached)
+        
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token has expired")
         except jwt.JWTError:
             raise HTTPException(status_code=401, detail="Invalid token")
+        
+        if payload.get("exp"):
+            token_cache.set(digest, payload, expires_at=float(payload["exp"]))
+        return dict(payload)
+    
+    @staticmethod
+    async def revoke_token(token: str):
+        """Revoke a token before its expiry"""
+        digest = SecurityManager.token_digest(token)
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+            expires_at = float(payload.get("exp", time.time()))
+        except jwt.PyJWTError:
+            return
+        
+        await revoked_tokens.revoke(digest, expires_at)
+        token_cache.delete(digest)
 
 # Security dependencies for FastAPI
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Extract and validate JWT token from Authorization header"""
     try:
         payload = SecurityManager.verify_token(credentials.credentials)
+        if await revoked_tokens.is_revoked(SecurityManager.token_digest(credentials.credentials)):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token payload")
         return payload
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
 
@@ -148,32 +394,35 @@ async def validate_api_key(request: Request):
     # For now, return basic client info
     return {
         "api_key": api_key,
+        "key_hash": hashlib.sha256(api_key.encode()).hexdigest(),
         "client_id": "extracted_from_key",
-        "rate_limit": 200  # authenticated user limit
+        "rate_limit": RATE_LIMIT_AUTHENTICATED
     }
 
-def get_rate_limit_key(request: Request, api_key_info: Optional[dict] = None) -> tuple:
+def get_rate_limit_key(request: Request, api_key_info: Optional[dict] = None, tier: Optional[str] = None) -> tuple:
     """Generate rate limit key and determine limits based on request type"""
     client_ip = request.client.host
     
     # Determine if this is an admin, authenticated, or public request
     auth_header = request.headers.get("Authorization")
-    is_admin_endpoint = any(path in str(request.url) for path in ["/clients", "/uploads", "/initialize"])
+    if tier is None:
+        tier = rate_limit_tiers.resolve(request.scope["path"])
     
-    if auth_header and is_admin_endpoint:
+    if auth_header and tier == RATE_LIMIT_TIER_ADMIN:
         # Admin endpoint with JWT
-        return f"admin:{client_ip}", 500
+        return f"admin:{client_ip}", RATE_LIMIT_ADMIN
     elif api_key_info:
         # Authenticated with API key
         return f"api_key:{api_key_info['api_key']}", api_key_info['rate_limit']
     else:
         # Public endpoint
-        return f"public:{client_ip}", 60
+        return f"public:{client_ip}", RATE_LIMIT_PUBLIC
 
 async def rate_limit_middleware(request: Request):
     """Rate limiting middleware"""
-    # Skip rate limiting for health checks and static files
-    if str(request.url.path) in ["/api/health", "/api/"]:
+    # Skip rate limiting for exempt routes such as health checks
+    tier = rate_limit_tiers.resolve(request.scope["path"])
+    if tier == RATE_LIMIT_TIER_EXEMPT:
         return
     
     # Get API key info if present
@@ -182,9 +431,10 @@ async def rate_limit_middleware(request: Request):
         api_key_info = await validate_api_key(request)
     except:
         pass  # No API key or invalid - will use public limits
+    request.state.api_key_info = api_key_info
     
     # Determine rate limit key and limits
-    rate_key, limit = get_rate_limit_key(request, api_key_info)
+    rate_key, limit = get_rate_limit_key(request, api_key_info, tier)
     
     # Check rate limit
     if not rate_limiter.is_allowed(rate_key, limit):
@@ -237,16 +487,16 @@ def validate_email_format(email: str) -> str:
     return email.lower().strip()
 
 # Security headers middleware
-def add_security_headers(response):
-    """Add security headers to response"""
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
+# Headers added to every response
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    "Permissions-Policy": "geolocation=(), microphone=(), camera=()",
     
     # Content Security Policy
-    csp = (
+    "Content-Security-Policy": (
         "default-src 'self'; "
         "script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
         "style-src 'self' 'unsafe-inline'; "
@@ -255,6 +505,11 @@ def add_security_headers(response):
         "connect-src 'self' https:; "
         "frame-ancestors 'none';"
     )
-    response.headers["Content-Security-Policy"] = csp
+}
+
+def add_security_headers(response):
+    """Add security headers to response"""
+    for key, value in SECURITY_HEADERS.items():
+        response.headers[key] = value
     
     return response
\ No newline at end of file
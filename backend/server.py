@@ -1,7 +1,8 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from dotenv import load_dotenv
 import os
 import logging
@@ -13,9 +14,20 @@ from datetime import datetime
 
 # Import our custom modules
 from .database import connect_to_mongo, close_mongo_connection
-from .routes import movies, clients, uploads, categories, auth
+from .routes import movies, clients, uploads, categories, auth, showtimes
 from .models import CustomizationPreset, GradientConfig, ButtonStyle, TypographyConfig
-from .security import rate_limit_middleware, add_security_headers
+from .security import (
+    rate_limit_middleware, SECURITY_HEADERS, password_hasher,
+    rate_limit_tiers, RATE_LIMIT_TIER_ADMIN, RATE_LIMIT_TIER_EXEMPT
+)
+from .usage import usage_accumulator
+from .quotas import quota_manager
+from .showtimes import showtime_index
+from .events import event_broker
+from .image_pipeline import image_pipeline
+from .jobs import job_queue
+from .static_files import UploadFiles
+from .storage import LOCAL_STORAGE_DIR
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -28,31 +40,56 @@ app = FastAPI(
 )
 
 # Security Middleware
-class SecurityMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class SecurityMiddleware:
+    """Rate limiting, API key usage and security headers as plain ASGI middleware
+
+    Unlike BaseHTTPMiddleware this never relays the response body through
+    an extra task, so file responses keep streaming straight to the server
+    (including pathsend / zero-copy sends for /uploads).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+
         # Apply rate limiting
         try:
             await rate_limit_middleware(request)
         except HTTPException as e:
-            from fastapi.responses import JSONResponse
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=e.status_code,
                 content={"detail": e.detail},
                 headers=getattr(e, 'headers', {})
             )
+            await response(scope, receive, send)
+            return
         
-        # Process request
-        response = await call_next(request)
-        
-        # Add security headers
-        response = add_security_headers(response)
+        # Count API key usage (flushed to the database in batches)
+        api_key_info = getattr(request.state, 'api_key_info', None)
+        if api_key_info:
+            usage_accumulator.record(api_key_info['key_hash'])
         
-        # Add rate limit headers if available
-        if hasattr(request.state, 'rate_limit_headers'):
-            for key, value in request.state.rate_limit_headers.items():
-                response.headers[key] = value
+        rate_limit_headers = getattr(request.state, 'rate_limit_headers', {})
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                # Add security headers
+                for key, value in SECURITY_HEADERS.items():
+                    headers[key] = value
+                # Add rate limit headers if available
+                for key, value in rate_limit_headers.items():
+                    headers[key] = value
+            await send(message)
         
-        return response
+        # Process request
+        await self.app(scope, receive, send_with_headers)
 
 app.add_middleware(SecurityMiddleware)
 
@@ -91,6 +128,15 @@ async def health_check():
         "services": {
             "database": "connected",
             "file_storage": "available"
+        },
+        "workers": {
+            "password_hashing": password_hasher.stats(),
+            "image_processing": image_pipeline.stats(),
+            "jobs": job_queue.stats(),
+            "movie_events": event_broker.stats()
+        },
+        "caches": {
+            "image_resize": uploads.resize_cache.stats()
         }
     }
 
@@ -301,6 +347,7 @@ app.include_router(movies.router, prefix="/api")
 app.include_router(clients.router, prefix="/api")
 app.include_router(uploads.router, prefix="/api")
 app.include_router(categories.router, prefix="/api")
+app.include_router(showtimes.router, prefix="/api")
 app.include_router(auth.router, prefix="/api")
 
 # Import and include tickets router
@@ -308,9 +355,22 @@ from .routes import tickets
 app.include_router(tickets.router, prefix="/api")
 
 # Mount static files for uploads
-uploads_dir = Path("/app/uploads")
+uploads_dir = LOCAL_STORAGE_DIR
 uploads_dir.mkdir(exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
+app.mount(
+    "/uploads",
+    UploadFiles(directory=str(uploads_dir), private_prefixes=uploads.PRIVATE_UPLOAD_PREFIXES),
+    name="uploads"
+)
+
+# Rate limit tiers by route prefix (resolved per request in O(path segments))
+rate_limit_tiers.register("/api", RATE_LIMIT_TIER_EXEMPT, exact=True)
+rate_limit_tiers.register("/api/health", RATE_LIMIT_TIER_EXEMPT, exact=True)
+rate_limit_tiers.register(f"/api{clients.router.prefix}", RATE_LIMIT_TIER_ADMIN)
+rate_limit_tiers.register(f"/api{uploads.router.prefix}", RATE_LIMIT_TIER_ADMIN)
+rate_limit_tiers.register("/api/initialize-presets", RATE_LIMIT_TIER_ADMIN)
+rate_limit_tiers.register(f"/api{categories.router.prefix}/initialize-defaults", RATE_LIMIT_TIER_ADMIN)
+rate_limit_tiers.register("/uploads", RATE_LIMIT_TIER_ADMIN)
 
 # CORS middleware - Enhanced security configuration
 app.add_middleware(
@@ -338,10 +398,23 @@ logger = logging.getLogger(__name__)
 async def startup_db_client():
     """Initialize database connection and create indexes"""
     await connect_to_mongo()
+    usage_accumulator.start()
+    quota_manager.start()
+    showtime_index.start()
+    event_broker.start()
+    image_pipeline.start()
+    job_queue.start()
     logger.info("Movie Ticket Booking SaaS API started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    """Close database connection"""
+    """Flush pending usage and close database connection"""
+    await usage_accumulator.stop()
+    await quota_manager.stop()
+    await showtime_index.stop()
+    await event_broker.stop()
+    password_hasher.shutdown()
+    await job_queue.stop()
+    image_pipeline.shutdown()
     await close_mongo_connection()
     logger.info("Movie Ticket Booking SaaS API shutdown complete")
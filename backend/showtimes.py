@@ -0,0 +1,418 @@
+"""
+Showtime normalization for Movie Booking SDK
+Parses showtime strings like "7:00 PM" once, when a movie is written, into
+minutes since midnight, a derived time-of-day bucket and (for dated slots)
+a UTC start time, and keeps the showtimes collection in sync so range
+queries are index scans
+"""
+
+import os
+import re
+import socket
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+from .database import aggregate, bulk_write, delete_documents, find_documents, find_one_and_update
+
+logger = logging.getLogger(__name__)
+
+# Showtime configuration
+DEFAULT_THEATER_TIMEZONE = os.environ.get("DEFAULT_THEATER_TIMEZONE", "UTC")
+SHOWTIME_HORIZON_DAYS = int(os.environ.get("SHOWTIME_HORIZON_DAYS", "14"))
+SHOWTIME_REFRESH_SECONDS = float(os.environ.get("SHOWTIME_REFRESH_SECONDS", "3600"))
+SHOWTIME_REFRESH_CHECK_SECONDS = 60  # how often each process checks whether a refresh is due
+
+# The task_leases entry that elects one process per refresh
+SHOWTIME_REFRESH_LEASE = "showtime_refresh"
+
+# Time-of-day buckets as [start, end) minutes since midnight; anything
+# outside them (10 PM to 6 AM) is late_night
+TIME_BUCKETS = [
+    ("morning", 6 * 60, 12 * 60),
+    ("afternoon", 12 * 60, 17 * 60),
+    ("evening", 17 * 60, 22 * 60),
+]
+LATE_NIGHT = "late_night"
+TIME_CATEGORIES = [name for name, _, _ in TIME_BUCKETS] + [LATE_NIGHT]
+
+# A schedule day runs from 6 AM to 6 AM: a "12:30 AM" slot listed for
+# Friday is the late show that starts early Saturday
+BUSINESS_DAY_START_MINUTES = 6 * 60
+
+# "7:00 PM", "7 pm", "7:00p.m.", "19:00", "19"
+TIME_PATTERN = re.compile(r"^(\d{1,2})(?:[:.](\d{2}))?\s*(?:([AaPp])\.?\s*[Mm]?\.?)?$")
+
+class InvalidShowtime(ValueError):
+    """Raised when a showtime, date or timezone can't be parsed"""
+
+def parse_time(time_str: str) -> int:
+    """Minutes since midnight for a 12- or 24-hour showtime string"""
+    match = TIME_PATTERN.match(str(time_str).strip())
+    if not match:
+        raise InvalidShowtime(f"Invalid showtime: {time_str!r}")
+
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if minute > 59:
+        raise InvalidShowtime(f"Invalid showtime: {time_str!r}")
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise InvalidShowtime(f"Invalid showtime: {time_str!r}")
+        hour = hour % 12 + (12 if meridiem.upper() == "P" else 0)
+    elif hour > 23:
+        raise InvalidShowtime(f"Invalid showtime: {time_str!r}")
+    return hour * 60 + minute
+
+def parse_date(value) -> date:
+    """A schedule date from a date, datetime or ISO string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        raise InvalidShowtime(f"Invalid showtime date: {value!r}")
+
+def get_timezone(name: Optional[str]) -> ZoneInfo:
+    """The IANA timezone for a theater (the default when unset)"""
+    try:
+        return ZoneInfo(name or DEFAULT_THEATER_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise InvalidShowtime(f"Unknown timezone: {name!r}")
+
+def time_bucket(minutes: int) -> str:
+    """morning, afternoon, evening or late_night for a minute of the day"""
+    for name, start, end in TIME_BUCKETS:
+        if start <= minutes < end:
+            return name
+    return LATE_NIGHT
+
+def screening_start(business_date: date, minutes: int, tz: ZoneInfo) -> datetime:
+    """UTC start (naive, like every stored datetime) of a slot on a day's schedule"""
+    day = business_date + timedelta(days=1) if minutes < BUSINESS_DAY_START_MINUTES else business_date
+    local = datetime.combine(day, time(minutes // 60, minutes % 60), tzinfo=tz)
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+def utc_range(start: Optional[datetime], end: Optional[datetime],
+              zone: Optional[ZoneInfo] = None) -> Tuple[datetime, datetime]:
+    """Naive UTC bounds for a query range; naive inputs are read in zone (UTC if unset)
+
+    Defaults to the 24 hours from now.
+    """
+    def to_utc(value: datetime) -> datetime:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=zone or timezone.utc)
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    range_start = to_utc(start) if start else datetime.utcnow()
+    range_end = to_utc(end) if end else range_start + timedelta(days=1)
+    if range_end <= range_start:
+        raise InvalidShowtime("to must be after from")
+    return range_start, range_end
+
+def screening_response(screening: dict, zone: Optional[ZoneInfo] = None) -> dict:
+    """API form of a showtimes document, with its start in UTC and local time"""
+    starts_at = screening["starts_at"].replace(tzinfo=timezone.utc)
+    local_zone = zone or get_timezone(screening["timezone"])
+    return {
+        "id": screening["id"],
+        "theater_id": screening["theater_id"],
+        "theater_name": screening["theater_name"],
+        "category_id": screening["category_id"],
+        "category_name": screening["category_name"],
+        "time": screening["time"],
+        "time_category": screening["time_category"],
+        "business_date": screening["business_date"],
+        "starts_at": starts_at,
+        "local_start": starts_at.astimezone(local_zone),
+        "timezone": local_zone.key,
+        "available_seats": screening.get("available_seats"),
+        "price_modifier": screening.get("price_modifier", 1.0)
+    }
+
+def normalize_time_slot(slot, tz: Optional[ZoneInfo] = None) -> dict:
+    """A time slot with its parsed minutes, derived category and UTC start
+
+    Accepts the stored dict form or a bare time string (legacy data).
+    The category is always derived from the time, so it can't disagree.
+    Slots without a date repeat daily and have no starts_at of their own.
+    """
+    slot = dict(slot) if isinstance(slot, dict) else {"time": str(slot)}
+    minutes = parse_time(slot.get("time", ""))
+    slot["minutes"] = minutes
+    slot["category"] = time_bucket(minutes)
+    slot.pop("time_category", None)
+
+    if slot.get("date"):
+        business_date = parse_date(slot["date"])
+        slot["date"] = business_date.isoformat()
+        slot["starts_at"] = screening_start(business_date, minutes, tz or get_timezone(None))
+    else:
+        slot["date"] = None
+        slot["starts_at"] = None
+    return slot
+
+def normalize_theater(theater: dict, strict: bool = True) -> dict:
+    """Normalize every time slot of every screening format of a theater
+
+    With strict=False unparseable slots are kept as they are instead of
+    raising InvalidShowtime (for backfilling existing data).
+    """
+    theater = dict(theater)
+    tz = get_timezone(theater.get("timezone"))
+    theater["timezone"] = tz.key
+    formats = []
+    for format_info in theater.get("formats") or []:
+        format_info = dict(format_info)
+        times = []
+        for slot in format_info.get("times") or []:
+            try:
+                times.append(normalize_time_slot(slot, tz))
+            except InvalidShowtime:
+                if strict:
+                    raise
+                times.append(slot)
+        format_info["times"] = times
+        formats.append(format_info)
+    theater["formats"] = formats
+    return theater
+
+def normalize_theaters(theaters: Optional[List[dict]], strict: bool = True) -> List[dict]:
+    """Normalize a movie's theater list before it is written"""
+    return [normalize_theater(theater, strict) for theater in theaters or []]
+
+def movie_screenings(movie: dict, horizon_days: int = SHOWTIME_HORIZON_DAYS) -> List[dict]:
+    """Concrete screenings of a movie, one showtimes document each
+
+    Dated slots give one screening; daily slots are expanded from
+    yesterday (whose late shows may still be running) or the release date,
+    whichever is later, through the horizon.
+    """
+    release = movie.get("release_date")
+    release_date = parse_date(release) if release else None
+    screenings = {}
+
+    for theater in movie.get("theaters") or []:
+        try:
+            tz = get_timezone(theater.get("timezone"))
+        except InvalidShowtime:
+            continue
+        first_day = datetime.now(tz).date() - timedelta(days=1)
+        if release_date and release_date > first_day:
+            first_day = release_date
+        daily = [first_day + timedelta(days=offset) for offset in range(horizon_days + 1)]
+
+        for format_info in theater.get("formats") or []:
+            for slot in format_info.get("times") or []:
+                if not isinstance(slot, dict) or slot.get("minutes") is None:
+                    continue  # Not normalized yet
+                minutes = slot["minutes"]
+                days = [parse_date(slot["date"])] if slot.get("date") else daily
+
+                for business_date in days:
+                    starts_at = screening_start(business_date, minutes, tz)
+                    screening_id = (
+                        f"{movie['id']}:{theater.get('id')}:{format_info.get('category_id')}:"
+                        f"{starts_at:%Y%m%dT%H%M}"
+                    )
+                    screenings[screening_id] = {
+                        "id": screening_id,
+                        "movie_id": movie["id"],
+                        "client_id": movie.get("client_id"),
+                        "is_active": movie.get("is_active", True),
+                        "theater_id": theater.get("id"),
+                        "theater_name": theater.get("name"),
+                        "theater_address": theater.get("address"),
+                        "city": theater.get("city"),
+                        "city_key": (theater.get("city") or "").strip().lower(),
+                        "state": (theater.get("state") or "").strip().upper(),
+                        "zip_code": theater.get("zip_code"),
+                        "chain": theater.get("chain"),
+                        "chain_key": (theater.get("chain") or "").strip().lower(),
+                        "movie_title": movie.get("movie_title"),
+                        "timezone": tz.key,
+                        "category_id": format_info.get("category_id"),
+                        "category_name": format_info.get("category_name"),
+                        "format_key": (format_info.get("category_name") or "").strip().lower(),
+                        "time": slot.get("time"),
+                        "minutes": minutes,
+                        "time_category": slot.get("category") or time_bucket(minutes),
+                        "business_date": business_date.isoformat(),
+                        "starts_at": starts_at,
+                        "available_seats": slot.get("available_seats"),
+                        "price_modifier": slot.get("price_modifier", 1.0)
+                    }
+    return list(screenings.values())
+
+class ShowtimeIndex:
+    """Maintains the showtimes collection, a read model of movie theaters
+
+    Each document is one screening with its UTC start, so "showtimes in
+    the next 3 hours" is a range scan on (movie_id, starts_at) instead of
+    a parse of every slot of every theater. Movies are re-synced when
+    written, and periodically so daily slots roll forward.
+    """
+
+    def __init__(self, horizon_days: int = SHOWTIME_HORIZON_DAYS,
+                 refresh_interval: float = SHOWTIME_REFRESH_SECONDS):
+        self.horizon_days = horizon_days
+        self.refresh_interval = refresh_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def sync_movie(self, movie: dict) -> int:
+        """Bring a movie's screenings in line with its current theaters
+
+        Only screenings that are new or whose fields changed are written,
+        and only those no longer scheduled are deleted, so a write that
+        doesn't touch theaters or the denormalized fields costs one read.
+        """
+        screenings = movie_screenings(movie, self.horizon_days)
+        existing = {
+            screening["id"]: screening
+            for screening in await aggregate("showtimes", [
+                {"$match": {"movie_id": movie["id"]}},
+                {"$project": {"_id": 0}}
+            ])
+        }
+        await bulk_write("showtimes", [
+            ReplaceOne({"id": screening["id"]}, screening, upsert=True)
+            for screening in screenings if existing.get(screening["id"]) != screening
+        ])
+        scheduled = {screening["id"] for screening in screenings}
+        removed = [screening_id for screening_id in existing if screening_id not in scheduled]
+        if removed:
+            await delete_documents("showtimes", {"movie_id": movie["id"], "id": {"$in": removed}})
+        return len(screenings)
+
+    async def remove_movie(self, movie_id: str) -> int:
+        """Drop a deleted movie's screenings"""
+        return await delete_documents("showtimes", {"movie_id": movie_id})
+
+    async def query(self, movie_id: str, start: datetime, end: datetime, theater_id: Optional[str] = None,
+                    time_category: Optional[str] = None, limit: int = 500) -> List[dict]:
+        """Screenings starting in [start, end) (naive UTC), earliest first"""
+        filter_dict = {"movie_id": movie_id, "starts_at": {"$gte": start, "$lt": end}}
+        if theater_id:
+            filter_dict["theater_id"] = theater_id
+        if time_category:
+            filter_dict["time_category"] = time_category
+        return await find_documents("showtimes", filter_dict, limit, sort=[("starts_at", 1)])
+
+    async def search(self, start: datetime, end: datetime, city: Optional[str] = None,
+                     state: Optional[str] = None, zip_code: Optional[str] = None,
+                     formats: Optional[List[str]] = None, chains: Optional[List[str]] = None,
+                     after: Optional[Tuple[datetime, str]] = None, limit: int = 50) -> List[dict]:
+        """Screenings of every active movie starting in [start, end), earliest first
+
+        Filters match case-insensitively; after is the (starts_at, id) of
+        the last screening of the previous page.
+        """
+        filter_dict = {"is_active": True, "starts_at": {"$gte": start, "$lt": end}}
+        if city:
+            filter_dict["city_key"] = city.strip().lower()
+        if state:
+            filter_dict["state"] = state.strip().upper()
+        if zip_code:
+            filter_dict["zip_code"] = zip_code.strip()
+        if formats:
+            filter_dict["format_key"] = {"$in": [value.strip().lower() for value in formats]}
+        if chains:
+            filter_dict["chain_key"] = {"$in": [value.strip().lower() for value in chains]}
+        if after:
+            filter_dict["$or"] = [
+                {"starts_at": {"$gt": after[0]}},
+                {"starts_at": after[0], "id": {"$gt": after[1]}}
+            ]
+        return await find_documents("showtimes", filter_dict, limit, sort=[("starts_at", 1), ("id", 1)])
+
+    async def next_for_theaters(self, movie_id: str, theater_ids: List[str], after: datetime,
+                                per_theater: int = 3) -> dict:
+        """theater_id -> its next few screenings starting at or after a time"""
+        if not theater_ids:
+            return {}
+        groups = await aggregate("showtimes", [
+            {"$match": {"movie_id": movie_id, "theater_id": {"$in": theater_ids}, "starts_at": {"$gte": after}}},
+            {"$sort": {"starts_at": 1}},
+            {"$group": {"_id": "$theater_id", "screenings": {"$push": {
+                "id": "$id",
+                "category_id": "$category_id",
+                "category_name": "$category_name",
+                "time": "$time",
+                "time_category": "$time_category",
+                "business_date": "$business_date",
+                "starts_at": "$starts_at"
+            }}}},
+            {"$project": {"screenings": {"$slice": ["$screenings", per_theater]}}}
+        ])
+        return {group["_id"]: group["screenings"] for group in groups}
+
+    async def refresh_all(self) -> int:
+        """Re-sync every movie that has theaters"""
+        movies = await aggregate("movie_configurations", [
+            {"$match": {"theaters.0": {"$exists": True}}},
+            {"$project": {
+                "_id": 0, "id": 1, "client_id": 1, "is_active": 1, "release_date": 1, "movie_title": 1, "theaters": 1
+            }}
+        ])
+        for movie in movies:
+            try:
+                await self.sync_movie(movie)
+            except Exception as e:
+                logger.error(f"Failed to sync showtimes for movie {movie['id']}: {e}")
+        return len(movies)
+
+    async def claim_refresh(self) -> bool:
+        """Whether this process should run the refresh that is due now
+
+        The lease's next_run_at moves forward on every claim, so across
+        all workers one process claims each refresh interval.
+        """
+        now = datetime.utcnow()
+        try:
+            return await find_one_and_update(
+                "task_leases",
+                {"id": SHOWTIME_REFRESH_LEASE, "next_run_at": {"$lte": now}},
+                {"$set": {
+                    "next_run_at": now + timedelta(seconds=self.refresh_interval),
+                    "holder": f"{socket.gethostname()}:{os.getpid()}",
+                    "claimed_at": now
+                }},
+                upsert=True
+            ) is not None
+        except DuplicateKeyError:
+            # Not due yet: the lease exists and didn't match
+            return False
+
+    async def _run(self):
+        """Periodically roll daily showtimes forward, in one process at a time"""
+        while True:
+            try:
+                if await self.claim_refresh():
+                    await self.refresh_all()
+            except Exception as e:
+                logger.error(f"Showtime refresh failed: {e}")
+            await asyncio.sleep(min(self.refresh_interval, SHOWTIME_REFRESH_CHECK_SECONDS))
+
+    def start(self):
+        """Start the background refresh task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refresh task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global showtime index instance
+showtime_index = ShowtimeIndex()
@@ -0,0 +1,183 @@
+"""
+Static file serving for Movie Booking SDK uploads
+Immutable caching, single byte-range requests and zero-copy sends for /uploads
+"""
+
+import os
+from typing import Optional, Sequence, Tuple, Union
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# Upload filenames are UUIDs / content hashes, so a URL never changes content
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range Range header into an inclusive (start, end)
+
+    Returns None when the header should be ignored (malformed or a
+    multi-range request, which is answered with the full file). Raises
+    ValueError when the range cannot be satisfied for a file of this size.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    if first == "":
+        # Suffix range: the last N bytes
+        if not last.isdigit():
+            return None
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - suffix), size - 1
+
+    if not first.isdigit() or (last and not last.isdigit()):
+        return None
+    start = int(first)
+    end = int(last) if last else size - 1
+
+    if start >= size:
+        raise ValueError("Range starts past the end of the file")
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+class RangeFileResponse(FileResponse):
+    """FileResponse that can send a byte range and prefers zero-copy sends
+
+    When the server advertises the http.response.zerocopysend extension
+    the file descriptor is handed over for sendfile(); full-file bodies use
+    http.response.pathsend when available. Otherwise the file is streamed
+    in large chunks from the requested offset.
+    """
+
+    chunk_size = 1024 * 1024
+
+    def __init__(self, path, byte_range: Optional[Tuple[int, int]] = None, **kwargs):
+        super().__init__(path, **kwargs)
+        self.byte_range = byte_range
+        size = int(self.headers["content-length"])
+        if byte_range is not None:
+            start, end = byte_range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        if self.byte_range is None and "http.response.zerocopysend" not in extensions:
+            # Full body without zero-copy support: Starlette handles pathsend and chunking
+            await super().__call__(scope, receive, send)
+            return
+
+        start, end = self.byte_range or (0, int(self.headers["content-length"]) - 1)
+        count = end - start + 1
+
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": start,
+                    "count": count,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                remaining = count
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    })
+                if remaining > 0:
+                    # File shrank underneath us; end the body cleanly
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        if self.background is not None:
+            await self.background()
+
+class UploadFiles(StaticFiles):
+    """StaticFiles for uploaded assets
+
+    Every response is marked immutable for a year and advertises byte-range
+    support; Range (and If-Range) requests are answered with 206 Partial
+    Content, which lets browsers seek within trailers and resume downloads.
+    Paths under private_prefixes (uploads not yet processed) are never served.
+    """
+
+    def __init__(self, *args, private_prefixes: Sequence[str] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.private_prefixes = tuple(private_prefixes)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if path.replace(os.sep, "/").startswith(self.private_prefixes):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path: Union[str, "os.PathLike[str]"],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+            "Accept-Ranges": "bytes",
+        }
+
+        response = RangeFileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        range_header = request_headers.get("range")
+        if not range_header or status_code != 200:
+            return response
+
+        # A stale If-Range validator means the client must get the whole file
+        if_range = request_headers.get("if-range")
+        if if_range and if_range not in (response.headers["etag"], response.headers["last-modified"]):
+            return response
+
+        try:
+            byte_range = parse_byte_range(range_header, stat_result.st_size)
+        except ValueError:
+            return PlainTextResponse(
+                "Requested Range Not Satisfiable",
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{stat_result.st_size}"}
+            )
+        if byte_range is None:
+            return response
+
+        return RangeFileResponse(
+            full_path,
+            stat_result=stat_result,
+            headers=headers,
+            byte_range=byte_range
+        )
@@ -0,0 +1,324 @@
+"""
+Object storage for Movie Booking SDK uploads
+Local-filesystem and S3-compatible backends behind one interface, so API
+nodes can share uploaded assets through a bucket
+"""
+
+import os
+import math
+import asyncio
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# Storage configuration
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")  # local or s3
+LOCAL_STORAGE_DIR = Path(os.environ.get("LOCAL_STORAGE_DIR", "/app/uploads"))
+S3_BUCKET = os.environ.get("S3_BUCKET", "")
+S3_PREFIX = os.environ.get("S3_PREFIX", "uploads/")
+S3_REGION = os.environ.get("S3_REGION", os.environ.get("AWS_REGION", "us-east-1"))
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL") or None  # MinIO, R2, moto server, ...
+STORAGE_PUBLIC_URL = os.environ.get("STORAGE_PUBLIC_URL", "")  # CDN in front of the bucket
+S3_PART_SIZE = int(os.environ.get("S3_PART_SIZE_MB", "8")) * 1024 * 1024
+S3_MAX_CONCURRENCY = int(os.environ.get("S3_MAX_CONCURRENCY", "8"))
+PRESIGN_EXPIRES_SECONDS = int(os.environ.get("PRESIGN_EXPIRES_SECONDS", "900"))
+
+# S3 rejects multipart parts smaller than this (except the last one)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+
+class StorageError(Exception):
+    """Raised when a storage backend cannot complete an operation"""
+
+class DirectUploadNotSupported(StorageError):
+    """Raised when a backend cannot accept uploads that bypass the API"""
+
+class LocalStorage:
+    """Uploads kept in a directory and served by the /uploads static mount"""
+
+    supports_direct_upload = False
+
+    def __init__(self, root: Path = LOCAL_STORAGE_DIR, base_url: str = "/uploads"):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise StorageError(f"Invalid storage key: {key}")
+        return path
+
+    def url_for(self, key: str) -> str:
+        """Public URL of a stored object"""
+        return f"{self.base_url}/{key}"
+
+    async def put_file(self, key: str, source: Path, content_type: str):
+        """Move a local file into storage"""
+        path = self._path(key)
+        if Path(source).resolve() != path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, path)
+
+    async def delete(self, key: str):
+        """Remove an object if it exists"""
+        self._path(key).unlink(missing_ok=True)
+
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under key"""
+        return self._path(key).is_file()
+
+    async def iter_chunks(self, key: str, chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Stream an object's bytes"""
+        path = self._path(key)
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        with open(path, "rb") as handle:
+            while True:
+                chunk = await asyncio.to_thread(handle.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[Path]:
+        """A filesystem path holding the object's bytes (the object itself here)"""
+        path = self._path(key)
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        yield path
+
+    async def presign_upload(self, key: str, content_type: str, size: int,
+                             expires_in: int = PRESIGN_EXPIRES_SECONDS) -> dict:
+        raise DirectUploadNotSupported("Direct uploads require the S3 storage backend")
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: List[dict]):
+        raise DirectUploadNotSupported("Direct uploads require the S3 storage backend")
+
+    async def abort_multipart_upload(self, key: str, upload_id: str):
+        raise DirectUploadNotSupported("Direct uploads require the S3 storage backend")
+
+class S3Storage:
+    """Uploads kept in an S3-compatible bucket
+
+    Server-side writes go through boto3's managed transfer, which splits
+    files larger than the part size into a multipart upload and sends up
+    to max_concurrency parts at once. Clients can also upload straight to
+    the bucket with presigned requests, so large files never pass through
+    the API.
+    """
+
+    supports_direct_upload = True
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        prefix: str = S3_PREFIX,
+        region: str = S3_REGION,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        public_url: str = STORAGE_PUBLIC_URL,
+        part_size: int = S3_PART_SIZE,
+        max_concurrency: int = S3_MAX_CONCURRENCY
+    ):
+        if not bucket:
+            raise StorageError("S3_BUCKET must be set for the s3 storage backend")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.part_size = max(part_size, S3_MIN_PART_SIZE)
+        self.public_url = public_url.rstrip("/")
+        self.client = boto3.client(
+            "s3",
+            region_name=region,
+            endpoint_url=endpoint_url,
+            config=Config(max_pool_connections=max(10, max_concurrency * 2), signature_version="s3v4")
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.part_size,
+            multipart_chunksize=self.part_size,
+            max_concurrency=max_concurrency,
+            use_threads=True
+        )
+
+    def object_key(self, key: str) -> str:
+        """Bucket key for a storage key"""
+        return f"{self.prefix}{key}"
+
+    def url_for(self, key: str) -> str:
+        """Public URL of a stored object"""
+        if self.public_url:
+            return f"{self.public_url}/{key}"
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{self.object_key(key)}"
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{self.object_key(key)}"
+
+    async def put_file(self, key: str, source: Path, content_type: str):
+        """Upload a local file (multipart with concurrent parts when large) and remove it"""
+        await asyncio.to_thread(
+            self.client.upload_file,
+            str(source),
+            self.bucket,
+            self.object_key(key),
+            ExtraArgs={
+                "ContentType": content_type,
+                # Keys are content-addressed, so objects never change
+                "CacheControl": "public, max-age=31536000, immutable"
+            },
+            Config=self.transfer_config
+        )
+        Path(source).unlink(missing_ok=True)
+
+    async def delete(self, key: str):
+        """Remove an object if it exists"""
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self.object_key(key))
+
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under key"""
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self.object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def iter_chunks(self, key: str, chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Stream an object's bytes"""
+        try:
+            response = await asyncio.to_thread(
+                self.client.get_object, Bucket=self.bucket, Key=self.object_key(key)
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(key)
+            raise
+
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[Path]:
+        """Download an object to a temporary file for the duration of the block"""
+        handle, temp_name = tempfile.mkstemp(suffix=Path(key).suffix)
+        os.close(handle)
+        try:
+            try:
+                await asyncio.to_thread(
+                    self.client.download_file, self.bucket, self.object_key(key), temp_name,
+                    Config=self.transfer_config
+                )
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                    raise FileNotFoundError(key)
+                raise
+            yield Path(temp_name)
+        finally:
+            os.unlink(temp_name)
+
+    async def presign_upload(self, key: str, content_type: str, size: int,
+                             expires_in: int = PRESIGN_EXPIRES_SECONDS) -> dict:
+        """Presigned request(s) for uploading size bytes straight to the bucket
+
+        Files up to the part size get a single presigned POST whose policy
+        pins the key, content type and exact length. Larger files get a
+        multipart upload with one presigned PUT URL per part; the client
+        uploads the parts in parallel and reports their ETags back.
+        """
+        object_key = self.object_key(key)
+
+        if size <= self.part_size:
+            post = await asyncio.to_thread(
+                self.client.generate_presigned_post,
+                Bucket=self.bucket,
+                Key=object_key,
+                Fields={"Content-Type": content_type},
+                Conditions=[
+                    {"Content-Type": content_type},
+                    ["content-length-range", size, size]
+                ],
+                ExpiresIn=expires_in
+            )
+            return {"method": "POST", "url": post["url"], "fields": post["fields"]}
+
+        upload = await asyncio.to_thread(
+            self.client.create_multipart_upload,
+            Bucket=self.bucket,
+            Key=object_key,
+            ContentType=content_type
+        )
+        upload_id = upload["UploadId"]
+        part_count = math.ceil(size / self.part_size)
+        part_urls = [
+            await asyncio.to_thread(
+                self.client.generate_presigned_url,
+                "upload_part",
+                Params={
+                    "Bucket": self.bucket,
+                    "Key": object_key,
+                    "UploadId": upload_id,
+                    "PartNumber": part_number
+                },
+                ExpiresIn=expires_in
+            )
+            for part_number in range(1, part_count + 1)
+        ]
+        return {
+            "method": "MULTIPART",
+            "upload_id": upload_id,
+            "part_size": self.part_size,
+            "part_urls": part_urls
+        }
+
+    async def complete_multipart_upload(self, key: str, upload_id: str, parts: List[dict]):
+        """Assemble the parts of a direct multipart upload
+
+        parts holds {"part_number", "etag"} entries as reported by the client.
+        """
+        await asyncio.to_thread(
+            self.client.complete_multipart_upload,
+            Bucket=self.bucket,
+            Key=self.object_key(key),
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [
+                {"PartNumber": part["part_number"], "ETag": part["etag"]}
+                for part in sorted(parts, key=lambda part: part["part_number"])
+            ]}
+        )
+
+    async def abort_multipart_upload(self, key: str, upload_id: str):
+        """Discard the parts of an abandoned multipart upload"""
+        await asyncio.to_thread(
+            self.client.abort_multipart_upload,
+            Bucket=self.bucket,
+            Key=self.object_key(key),
+            UploadId=upload_id
+        )
+
+def create_storage(backend: str = STORAGE_BACKEND):
+    """Build the configured storage backend"""
+    if backend == "local":
+        return LocalStorage()
+    if backend == "s3":
+        return S3Storage()
+    raise StorageError(f"Unknown storage backend: {backend}")
+
+# Global storage instance
+storage = create_storage()
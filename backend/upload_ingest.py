@@ -0,0 +1,221 @@
+"""
+Streaming multipart ingestion for Movie Booking SDK uploads
+Reads request bodies chunk by chunk so size limits and file type checks apply
+before an upload has been fully received
+"""
+
+import os
+import uuid
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes needed to identify every supported image type
+SNIFF_BYTES = 12
+MAX_FIELD_SIZE = 64 * 1024  # text form fields
+MULTIPART_OVERHEAD = 64 * 1024  # boundaries, part headers and text fields
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Identify an image type from its magic bytes"""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+class IngestedFile:
+    """A file part streamed to a temporary file next to its final location"""
+
+    def __init__(self, filename: str, content_type: str, temp_dir: Path):
+        self.filename = filename
+        self.content_type = content_type
+        self.temp_path = temp_dir / f"{uuid.uuid4()}.part"
+        self.size = 0
+        self.image_type: Optional[str] = None
+        self.error: Optional[HTTPException] = None
+        self._hash = hashlib.sha256()
+        self._header = b""
+        self._handle = open(self.temp_path, "wb")
+
+    @property
+    def sha256(self) -> str:
+        """Hex SHA-256 of the received bytes"""
+        return self._hash.hexdigest()
+
+    def write(self, data: bytes, max_size: int):
+        """Append a chunk, enforcing the size limit and sniffing the type"""
+        if self.error:
+            return
+
+        self.size += len(data)
+        if self.size > max_size:
+            self.reject(HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {max_size // (1024 * 1024)}MB upload limit"
+            ))
+            return
+
+        if self.image_type is None and len(self._header) < SNIFF_BYTES:
+            self._header += data[:SNIFF_BYTES - len(self._header)]
+            if len(self._header) >= SNIFF_BYTES:
+                self._sniff()
+                if self.error:
+                    return
+
+        self._hash.update(data)
+        self._handle.write(data)
+
+    def _sniff(self):
+        self.image_type = sniff_image_type(self._header)
+        if self.image_type is None:
+            self.reject(HTTPException(status_code=415, detail="File content is not a supported image"))
+
+    def finish(self):
+        """Close the temp file once the part has been fully received"""
+        if not self.error and self.image_type is None:
+            self._sniff()
+        if not self._handle.closed:
+            self._handle.close()
+
+    def reject(self, error: HTTPException):
+        """Stop accepting data for this part and drop what was written"""
+        self.error = error
+        self.discard()
+
+    def commit(self, destination: Path):
+        """Atomically move the received file into place"""
+        os.replace(self.temp_path, destination)
+
+    def discard(self):
+        """Remove the temporary file"""
+        if not self._handle.closed:
+            self._handle.close()
+        self.temp_path.unlink(missing_ok=True)
+
+async def ingest_multipart(
+    request: Request,
+    temp_dir: Path,
+    max_file_size: int,
+    max_files: int = 1,
+    strict: bool = True
+) -> Tuple[Dict[str, str], List[IngestedFile]]:
+    """Stream a multipart/form-data body into temp files
+
+    Memory use is bounded by the size of the chunks the server hands us.
+    With strict=True the first invalid file aborts the request; otherwise
+    the invalid file is marked with an error and skipped so the remaining
+    files can still be stored.
+    """
+    content_type, params = parse_options_header(request.headers.get("Content-Type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    # Reject bodies that announce themselves as too large before reading them
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_files * max_file_size + MULTIPART_OVERHEAD:
+            raise HTTPException(status_code=413, detail="Request body too large")
+
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    fields: Dict[str, str] = {}
+    files: List[IngestedFile] = []
+    events: list = []
+    state = {"header_field": b"", "header_value": b"", "headers": {}}
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data: bytes, start: int, end: int):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        events.append(("begin", dict(state["headers"])))
+
+    def on_part_data(data: bytes, start: int, end: int):
+        events.append(("data", data[start:end]))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    current_file: Optional[IngestedFile] = None
+    current_field: Optional[str] = None
+    field_value = b""
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event, payload in events:
+                if event == "begin":
+                    _, disposition = parse_options_header(payload.get(b"content-disposition", b""))
+                    name = disposition.get(b"name", b"").decode("latin-1")
+                    filename = disposition.get(b"filename")
+                    if filename is not None:
+                        if len(files) >= max_files:
+                            raise HTTPException(
+                                status_code=400,
+                                detail=f"Maximum {max_files} files allowed per upload"
+                            )
+                        current_file = IngestedFile(
+                            filename=filename.decode("utf-8", "replace"),
+                            content_type=payload.get(b"content-type", b"").decode("latin-1"),
+                            temp_dir=temp_dir
+                        )
+                        files.append(current_file)
+                    else:
+                        current_field = name
+                        field_value = b""
+                elif event == "data":
+                    if current_file is not None:
+                        current_file.write(payload, max_file_size)
+                        if strict and current_file.error:
+                            raise current_file.error
+                    elif current_field is not None:
+                        field_value += payload
+                        if len(field_value) > MAX_FIELD_SIZE:
+                            raise HTTPException(status_code=400, detail=f"Form field '{current_field}' too large")
+                elif event == "end":
+                    if current_file is not None:
+                        current_file.finish()
+                        if strict and current_file.error:
+                            raise current_file.error
+                        current_file = None
+                    elif current_field is not None:
+                        fields[current_field] = field_value.decode("utf-8")
+                        current_field = None
+            events.clear()
+        parser.finalize()
+    except BaseException:
+        for ingested in files:
+            ingested.discard()
+        raise
+
+    return fields, files
@@ -0,0 +1,136 @@
+"""
+API key usage accounting for Movie Booking SDK
+Aggregates per-key request counters in memory and writes them behind in batches
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .database import bulk_write
+
+logger = logging.getLogger(__name__)
+
+# Usage accounting configuration
+USAGE_FLUSH_INTERVAL_SECONDS = float(os.environ.get("API_KEY_USAGE_FLUSH_SECONDS", "30"))
+USAGE_MAX_PENDING_KEYS = int(os.environ.get("API_KEY_USAGE_MAX_PENDING", "10000"))  # distinct keys between flushes
+
+class UsageAccumulator:
+    """Write-behind accumulator for API key usage_count / last_used_at
+
+    Requests only touch an in-memory dict; a background task flushes the
+    aggregated counters with a single bulk_write every flush interval, so a
+    worker crash loses at most one interval of usage. Keys are only
+    format-checked before they get here, so the number of distinct keys
+    held is capped: reaching max_pending flushes early, and requests with
+    new keys are not counted while it is full.
+    """
+
+    def __init__(self, flush_interval: float = USAGE_FLUSH_INTERVAL_SECONDS,
+                 max_pending: int = USAGE_MAX_PENDING_KEYS):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending: Dict[str, dict] = {}
+        self.dropped = 0
+        self._task: Optional[asyncio.Task] = None
+        self._early_flush: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def record(self, key_hash: str, used_at: Optional[datetime] = None):
+        """Count one request made with the given API key hash"""
+        used_at = used_at or datetime.utcnow()
+        entry = self.pending.get(key_hash)
+        if entry is None:
+            if len(self.pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self.pending[key_hash] = {"count": 1, "last_used_at": used_at}
+            if len(self.pending) >= self.max_pending:
+                self._flush_early()
+            return
+
+        entry["count"] += 1
+        if used_at > entry["last_used_at"]:
+            entry["last_used_at"] = used_at
+
+    def _merge_back(self, key_hash: str, entry: dict):
+        """Return an unflushed entry to the pending counters"""
+        current = self.pending.get(key_hash)
+        if current is None:
+            self.pending[key_hash] = entry
+            return
+
+        current["count"] += entry["count"]
+        if entry["last_used_at"] > current["last_used_at"]:
+            current["last_used_at"] = entry["last_used_at"]
+
+    async def flush(self) -> int:
+        """Write all pending counters to the api_keys collection"""
+        async with self._flush_lock:
+            if not self.pending:
+                return 0
+
+            batch, self.pending = self.pending, {}
+            key_hashes = list(batch.keys())
+            operations = [
+                UpdateOne(
+                    {"key_hash": key_hash},
+                    {
+                        "$inc": {"usage_count": batch[key_hash]["count"]},
+                        "$max": {"last_used_at": batch[key_hash]["last_used_at"]}
+                    }
+                )
+                for key_hash in key_hashes
+            ]
+
+            try:
+                await bulk_write("api_keys", operations)
+            except BulkWriteError as e:
+                # Unordered batch: only the failed operations need retrying
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                for index in failed:
+                    self._merge_back(key_hashes[index], batch[key_hashes[index]])
+                logger.error(f"Failed to flush usage for {len(failed)} API keys: {e}")
+                return len(operations) - len(failed)
+            except Exception as e:
+                for key_hash in key_hashes:
+                    self._merge_back(key_hash, batch[key_hash])
+                logger.error(f"Failed to flush API key usage: {e}")
+                return 0
+
+            return len(operations)
+
+    def _flush_early(self):
+        """Start a flush now instead of waiting for the interval"""
+        if self._early_flush is None or self._early_flush.done():
+            self._early_flush = asyncio.create_task(self.flush())
+
+    async def _run(self):
+        """Periodically flush pending counters"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """Start the background flush task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush whatever is still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+# Global usage accumulator instance
+usage_accumulator = UsageAccumulator()
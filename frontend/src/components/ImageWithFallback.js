@@ -7,9 +7,12 @@ const ImageWithFallback = ({
   className, 
   style,
   movieConfig,
+  placeholder,
   ...props 
 }) => {
   const [imgSrc, setImgSrc] = useState(src);
+  // Blurhash/LQIP/dominant color computed at upload time, inlined by the API
+  const preview = placeholder || movieConfig?.image_placeholders?.[src];
   const [isLoading, setIsLoading] = useState(true);
   const [hasError, setHasError] = useState(false);
 
@@ -54,7 +57,22 @@ const ImageWithFallback = ({
 
   return (
     <div className="relative">
-      {isLoading && (
+      {isLoading && preview && (
+        <div
+          className={`${className} absolute inset-0`}
+          style={{
+            ...style,
+            backgroundColor: preview.dominant_color,
+            backgroundImage: preview.lqip ? `url(${preview.lqip})` : undefined,
+            backgroundSize: 'cover',
+            backgroundPosition: 'center',
+            filter: 'blur(12px)',
+            transform: 'scale(1.05)'
+          }}
+          aria-hidden="true"
+        />
+      )}
+      {isLoading && !preview && (
         <div 
           className={`${className} absolute inset-0 flex items-center justify-center bg-gradient-to-br from-gray-800 to-gray-900 animate-pulse`}
           style={style}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Backfill derived fields on stored movie configurations.
+
+Assigns ids to theaters missing one, geocodes theaters from their ZIP
+codes (backend/geo.py), parses every showtime into minutes since midnight,
+re-derives its time-of-day category and computes UTC starts for dated
+slots (backend/showtimes.py) and stores the autocomplete prefixes and
+title key (backend/search.py), for movies written before these were
+derived on write. Rewritten movies get a new version (movies without one
+start at 1), so delta-syncing clients fetch a snapshot. Then rebuilds the
+showtimes and theater_locations read models. Safe to re-run.
+
+Usage: MONGO_URL=... DB_NAME=... python scripts/backfill_movies.py [--dry-run]
+"""
+
+import sys
+import uuid
+import asyncio
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+load_dotenv(ROOT_DIR / "backend" / ".env")
+
+from backend.database import database, connect_to_mongo, close_mongo_connection, bulk_write
+from backend.showtimes import normalize_theaters, showtime_index
+from backend.geo import InvalidLocation, locate_theater, theater_locator
+from backend.search import PREFIX_FIELDS, search_fields
+
+BATCH_SIZE = 200
+
+def count_unparsed(theaters: list) -> int:
+    return sum(
+        1
+        for theater in theaters
+        for format_info in theater.get("formats") or []
+        for slot in format_info.get("times") or []
+        if not isinstance(slot, dict) or slot.get("minutes") is None
+    )
+
+def geocode(theater: dict) -> dict:
+    # Theaters saved through PUT /movies/{id} used to be stored without ids
+    theater = {**theater, "id": theater.get("id") or str(uuid.uuid4())}
+    try:
+        return locate_theater(theater)
+    except InvalidLocation:
+        return theater
+
+async def backfill(dry_run: bool):
+    await connect_to_mongo()
+    scanned = changed = unparsed = 0
+    operations = []
+    try:
+        projection = {
+            "_id": 0, "id": 1, "version": 1, "theaters": 1, "search_prefixes": 1, "title_key": 1,
+            **{field: 1 for field in PREFIX_FIELDS}
+        }
+        async for movie in database.db.movie_configurations.find({}, projection):
+            scanned += 1
+            theaters = movie.get("theaters") or []
+            normalized = normalize_theaters([geocode(theater) for theater in theaters], strict=False)
+            unparsed += count_unparsed(normalized)
+            derived = search_fields(movie)
+            rewritten = normalized != theaters or any(movie.get(field) != value for field, value in derived.items())
+            if not rewritten and movie.get("version") is not None:
+                continue
+
+            changed += 1
+            # Not logged in movie_changes, so clients behind this version get a snapshot.
+            # $inc keeps concurrent API writes' versions; version is only $set where missing.
+            fields = {"theaters": normalized, **derived} if rewritten else {}
+            if movie.get("version") is not None:
+                operations.append(UpdateOne(
+                    {"id": movie["id"], "version": {"$exists": True}},
+                    {"$set": fields, "$inc": {"version": 1}}
+                ))
+            else:
+                operations.append(UpdateOne(
+                    {"id": movie["id"], "version": {"$exists": False}},
+                    {"$set": {**fields, "version": 2 if rewritten else 1}}
+                ))
+            if len(operations) >= BATCH_SIZE:
+                if not dry_run:
+                    await bulk_write("movie_configurations", operations)
+                operations = []
+
+        if operations and not dry_run:
+            await bulk_write("movie_configurations", operations)
+        if not dry_run:
+            synced = await showtime_index.refresh_all()
+            print(f"Synced showtimes for {synced} movies")
+            located = await theater_locator.refresh_all()
+            print(f"Synced theater locations for {located} movies")
+    finally:
+        await close_mongo_connection()
+
+    action = "would update" if dry_run else "updated"
+    print(f"Scanned {scanned} movies, {action} {changed}")
+    if unparsed:
+        print(f"{unparsed} showtimes could not be parsed and were left as they are")
+
+def main():
+    asyncio.run(backfill("--dry-run" in sys.argv[1:]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark /uploads file serving: plain StaticFiles vs the UploadFiles mount
+in backend/static_files.py (1MB chunks, range requests, zero-copy sends).
+
+Serves a generated file through uvicorn on localhost when it is installed,
+otherwise in-process over an ASGI transport.
+
+Usage: python scripts/benchmark_uploads.py [file_size_mb] [iterations]
+"""
+
+import os
+import sys
+import time
+import random
+import socket
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+
+import httpx
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.static_files import UploadFiles
+
+RANGE_SIZE = 64 * 1024
+
+def build_app(directory: str) -> Starlette:
+    return Starlette(routes=[
+        Mount("/static", StaticFiles(directory=directory)),
+        Mount("/uploads", UploadFiles(directory=directory)),
+    ])
+
+def start_uvicorn(app: Starlette):
+    """Run uvicorn in a background thread, returning (server, base_url)"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+async def full_download(client: httpx.AsyncClient, url: str, iterations: int) -> float:
+    """Return MB/s for whole-file GETs"""
+    total = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        async with client.stream("GET", url) as response:
+            async for chunk in response.aiter_raw():
+                total += len(chunk)
+    return total / (time.perf_counter() - start) / (1024 * 1024)
+
+async def range_latency(client: httpx.AsyncClient, url: str, size: int, iterations: int) -> float:
+    """Return mean milliseconds for random 64KB range requests (full body when unsupported)"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        offset = random.randrange(0, size - RANGE_SIZE)
+        response = await client.get(url, headers={"Range": f"bytes={offset}-{offset + RANGE_SIZE - 1}"})
+        response.read()
+    return (time.perf_counter() - start) / iterations * 1000
+
+async def run(base_url: str, transport, size: int, iterations: int):
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, timeout=None) as client:
+        for label, prefix in (("StaticFiles", "/static"), ("UploadFiles", "/uploads")):
+            url = f"{prefix}/trailer.bin"
+            probe = await client.get(url, headers={"Range": "bytes=0-0"})
+            throughput = await full_download(client, url, iterations)
+            latency = await range_latency(client, url, size, iterations * 10)
+            print(f"   {label:<12} {throughput:10.1f} MB/s   range: {latency:7.2f} ms   "
+                  f"(Range -> {probe.status_code}, Cache-Control: {probe.headers.get('cache-control', '-')})")
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    size = size_mb * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "trailer.bin"), "wb") as f:
+            f.write(os.urandom(size))
+
+        app = build_app(directory)
+        try:
+            server, base_url = start_uvicorn(app)
+            transport = None
+            mode = "uvicorn"
+        except ImportError:
+            server, base_url = None, "http://testserver"
+            transport = httpx.ASGITransport(app=app)
+            mode = "in-process ASGI"
+
+        print(f"📦 Upload file serving ({size_mb}MB file, {iterations} downloads, {mode})")
+        print("=" * 50)
+        asyncio.run(run(base_url, transport, size, iterations))
+
+        if server is not None:
+            server.should_exit = True
+
+if __name__ == "__main__":
+    main()
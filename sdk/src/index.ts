@@ -27,7 +27,9 @@ export type {
   TheaterLocation,
   SDKOptions,
   BookingEvent,
-  CustomizationPreset
+  CustomizationPreset,
+  CategorizedShowtimes,
+  ColumnarShowtimes
 } from './types';
 
 // Utilities
@@ -35,7 +37,8 @@ export {
   validateTheme,
   generateGradientCSS,
   optimizeImageUrl,
-  formatShowtime
+  formatShowtime,
+  decodeColumnarShowtimes
 } from './utils';
 
 // Constants
@@ -197,6 +197,65 @@ export interface TheaterFormat {
   available_seats?: number;
 }
 
+// Categorized showtimes (GET /movies/{id}/showtimes/categorized)
+export type TimeCategory = 'morning' | 'afternoon' | 'evening' | 'late_night';
+
+export interface CategorizedTimeSlot {
+  time: string;
+  minutes?: number | null;
+  category: TimeCategory;
+  available_seats?: number | null;
+  price_modifier: number;
+}
+
+export interface CategorizedScreeningFormat {
+  category_id: string | null;
+  category_name: string;
+  times_by_category: Record<TimeCategory, CategorizedTimeSlot[]>;
+}
+
+export interface CategorizedTheater {
+  theater_id: string;
+  theater_name: string;
+  theater_address: string;
+  screening_formats: CategorizedScreeningFormat[];
+}
+
+export interface CategorizedShowtimes {
+  movie_id: string;
+  movie_title: string;
+  total_theaters: number;
+  theaters: CategorizedTheater[];
+  filters_applied: {
+    time_category: string | null;
+    screening_category: string | null;
+  };
+}
+
+// ?format=columnar: parallel arrays, one entry per slot, with theaters,
+// screening categories and times dictionary-encoded by index
+export interface ColumnarShowtimes {
+  movie_id: string;
+  movie_title: string;
+  format: 'columnar';
+  total_theaters: number;
+  total_showtimes: number;
+  theaters: { id: string[]; name: string[]; address: string[] };
+  screening_categories: { id: Array<string | null>; name: string[] };
+  time_categories: TimeCategory[];
+  times: string[];
+  showtimes: {
+    theater: number[];
+    screening_category: number[];
+    time_category: number[];
+    time: number[];
+    minutes: Array<number | null>;
+    available_seats: Array<number | null>;
+    price_modifier: number[];
+  };
+  filters_applied: CategorizedShowtimes['filters_applied'];
+}
+
 // Booking Configuration
 export interface BookingConfig {
   movie_id: string;
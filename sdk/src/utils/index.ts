@@ -1,4 +1,4 @@
-import { ThemeConfig, GradientConfig } from '../types';
+import { ThemeConfig, GradientConfig, CategorizedShowtimes, CategorizedTheater, CategorizedScreeningFormat, ColumnarShowtimes } from '../types';
 
 // Theme validation
 export const validateTheme = (theme: ThemeConfig): boolean => {
@@ -392,4 +392,56 @@ export const getScreeningCategoryTypeIcon = (type: string): string => {
     special_event: '🎉'
   };
   return icons[type as keyof typeof icons] || '📽️';
-};
\ No newline at end of file
+};
+
+// Columnar showtimes decoding
+export const decodeColumnarShowtimes = (payload: ColumnarShowtimes): CategorizedShowtimes => {
+  // Slots arrive in theater, then format, then time order, so a new theater
+  // or screening category index starts a new group
+  const { showtimes, theaters: theaterDict, screening_categories: categoryDict } = payload;
+  const theaters: CategorizedTheater[] = [];
+  let theater: CategorizedTheater | undefined;
+  let format: CategorizedScreeningFormat | undefined;
+  let theaterCode = -1;
+  let categoryCode = -1;
+
+  for (let i = 0; i < showtimes.theater.length; i++) {
+    if (showtimes.theater[i] !== theaterCode) {
+      theaterCode = showtimes.theater[i];
+      categoryCode = -1;
+      theater = {
+        theater_id: theaterDict.id[theaterCode],
+        theater_name: theaterDict.name[theaterCode],
+        theater_address: theaterDict.address[theaterCode],
+        screening_formats: []
+      };
+      theaters.push(theater);
+    }
+    if (showtimes.screening_category[i] !== categoryCode) {
+      categoryCode = showtimes.screening_category[i];
+      format = {
+        category_name: categoryDict.name[categoryCode],
+        category_id: categoryDict.id[categoryCode],
+        times_by_category: { morning: [], afternoon: [], evening: [], late_night: [] }
+      };
+      theater!.screening_formats.push(format);
+    }
+
+    const category = payload.time_categories[showtimes.time_category[i]];
+    format!.times_by_category[category].push({
+      time: payload.times[showtimes.time[i]],
+      minutes: showtimes.minutes[i],
+      category,
+      available_seats: showtimes.available_seats[i],
+      price_modifier: showtimes.price_modifier[i]
+    });
+  }
+
+  return {
+    movie_id: payload.movie_id,
+    movie_title: payload.movie_title,
+    total_theaters: theaters.length,
+    theaters,
+    filters_applied: payload.filters_applied
+  };
+};
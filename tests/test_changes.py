@@ -0,0 +1,173 @@
+"""
+Tests for the movie change log in backend/changes.py
+
+changes_since reads movie_changes through find_documents, which is
+replaced here by an in-memory log:
+    python -m pytest tests/test_changes.py
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import changes
+from backend.changes import diff_movie, changes_since
+
+def run(coro):
+    return asyncio.run(coro)
+
+def slot(time, date=None, **fields):
+    return {"time": time, "date": date, **fields}
+
+def movie(*theaters, **fields):
+    return {"id": "m1", "movie_title": "Dune", "version": 3, "theaters": list(theaters), **fields}
+
+def theater(theater_id, *formats, **fields):
+    return {"id": theater_id, "name": f"Theater {theater_id}", "formats": list(formats), **fields}
+
+def format_info(category_id, *times, **fields):
+    return {"category_id": category_id, "category_name": category_id.upper(), "times": list(times), **fields}
+
+def ops(changes_list):
+    return [(change["op"], change["kind"]) for change in changes_list]
+
+# diff_movie
+
+def test_diff_unchanged_movie_is_empty():
+    before = movie(theater("t1", format_info("imax", slot("7:00 PM"))))
+    assert diff_movie(before, before) == []
+
+def test_diff_ignores_bookkeeping_fields():
+    before = movie(theater("t1"))
+    after = {**before, "version": 4, "updated_at": "later", "search_prefixes": ["d", "du"]}
+    assert diff_movie(before, after) == []
+
+def test_diff_movie_fields():
+    changes_list = diff_movie(movie(), movie(movie_title="Dune: Part Two", director="Villeneuve"))
+    assert changes_list == [{
+        "op": "update", "kind": "movie",
+        "value": {"movie_title": "Dune: Part Two", "director": "Villeneuve"}
+    }]
+
+def test_diff_theater_add_remove_update():
+    before = movie(theater("t1"), theater("t2"))
+    after = movie(theater("t1", name="Renamed"), theater("t3"))
+
+    changes_list = diff_movie(before, after)
+
+    assert sorted(ops(changes_list)) == [("add", "theater"), ("remove", "theater"), ("update", "theater")]
+    by_op = {change["op"]: change for change in changes_list}
+    assert by_op["add"]["theater_id"] == "t3" and by_op["add"]["value"]["id"] == "t3"
+    assert by_op["remove"] == {"op": "remove", "kind": "theater", "theater_id": "t2"}
+    assert by_op["update"]["value"] == {"name": "Renamed"}
+
+def test_diff_format_add_remove_update():
+    before = movie(theater("t1", format_info("imax"), format_info("3d")))
+    after = movie(theater("t1", format_info("imax", price=18), format_info("dolby")))
+
+    changes_list = diff_movie(before, after)
+
+    assert sorted(ops(changes_list)) == [("add", "format"), ("remove", "format"), ("update", "format")]
+    by_op = {change["op"]: change for change in changes_list}
+    assert by_op["add"]["category_id"] == "dolby"
+    assert by_op["remove"] == {"op": "remove", "kind": "format", "theater_id": "t1", "category_id": "3d"}
+    assert by_op["update"]["value"] == {"price": 18}
+    assert all(change["theater_id"] == "t1" for change in changes_list)
+
+def test_diff_slot_add_remove_update():
+    before = movie(theater("t1", format_info("imax",
+                                             slot("7:00 PM", "2026-10-20"),
+                                             slot("9:30 PM", "2026-10-20", seats=100))))
+    after = movie(theater("t1", format_info("imax",
+                                            slot("9:30 PM", "2026-10-20", seats=80),
+                                            slot("7:00 PM", "2026-10-21"))))
+
+    changes_list = diff_movie(before, after)
+
+    assert sorted(ops(changes_list)) == [("add", "slot"), ("remove", "slot"), ("update", "slot")]
+    by_op = {change["op"]: change for change in changes_list}
+    assert by_op["add"]["slot"] == "2026-10-21@7:00 PM"
+    assert by_op["remove"]["slot"] == "2026-10-20@7:00 PM"
+    assert by_op["update"]["slot"] == "2026-10-20@9:30 PM"
+    assert by_op["update"]["value"]["seats"] == 80
+    assert all(change["category_id"] == "imax" for change in changes_list)
+
+def test_diff_slots_match_on_parsed_minutes():
+    before = movie(theater("t1", format_info("imax", slot("7:00 PM", minutes=1140))))
+    after = movie(theater("t1", format_info("imax", slot("19:00", minutes=1140))))
+
+    changes_list = diff_movie(before, after)
+
+    assert ops(changes_list) == [("update", "slot")]
+    assert changes_list[0]["slot"] == "*@1140"
+
+def test_diff_removed_theater_hides_nested_changes():
+    before = movie(theater("t1", format_info("imax", slot("7:00 PM"))))
+    assert diff_movie(before, movie()) == [{"op": "remove", "kind": "theater", "theater_id": "t1"}]
+
+# changes_since
+
+@pytest.fixture
+def change_log(monkeypatch):
+    """In-memory movie_changes for one movie; append entries by version"""
+    log = []
+
+    async def find_documents(collection, filter_dict, limit=100, sort=None, projection=None):
+        assert collection == "movie_changes"
+        since = filter_dict["version"]["$gt"]
+        entries = sorted((entry for entry in log if entry["version"] > since), key=lambda entry: entry["version"])
+        return [dict(entry) for entry in entries[:limit]]
+
+    monkeypatch.setattr(changes, "find_documents", find_documents)
+    return log
+
+def logged(*versions, age=0):
+    changed_at = datetime.utcnow() - timedelta(seconds=age)
+    return [{"version": version, "changed_at": changed_at,
+             "changes": [{"op": "update", "kind": "movie", "value": {"v": version}}]}
+            for version in versions]
+
+def test_changes_since_current_version(change_log):
+    change_log += logged(2, 3)
+    assert run(changes_since("m1", 3, 3)) == []
+
+def test_changes_since_returns_contiguous_run(change_log):
+    change_log += logged(2, 3, 4)
+    assert [entry["version"] for entry in run(changes_since("m1", 2, 4))] == [3, 4]
+
+def test_changes_since_version_never_had_needs_snapshot(change_log):
+    change_log += logged(2, 3)
+    assert run(changes_since("m1", 5, 3)) is None
+
+def test_changes_since_compacted_log_needs_snapshot(change_log, monkeypatch):
+    monkeypatch.setattr(changes, "MOVIE_CHANGE_RETENTION", 3)
+    change_log += logged(5, 6)
+    assert run(changes_since("m1", 2, 6)) is None
+
+def test_changes_since_unversioned_movie_needs_snapshot(change_log):
+    assert run(changes_since("m1", 0, 1, datetime.utcnow())) is None
+
+def test_changes_since_stops_before_unlogged_version(change_log):
+    change_log += logged(2, 3, 5)
+    assert [entry["version"] for entry in run(changes_since("m1", 1, 5))] == [2, 3]
+
+def test_changes_since_waits_for_version_being_logged(change_log):
+    # Version 4 was bumped before 5, but 5 reached the log first
+    change_log += logged(2, 3, 5)
+    assert run(changes_since("m1", 3, 5)) == []
+
+def test_changes_since_waits_for_latest_version_being_logged(change_log):
+    change_log += logged(2, 3)
+    assert run(changes_since("m1", 3, 4, datetime.utcnow())) == []
+
+def test_changes_since_unlogged_version_needs_snapshot_after_grace(change_log):
+    change_log += logged(2, 3) + logged(5, age=changes.MOVIE_CHANGE_LOG_GRACE_SECONDS + 1)
+    assert run(changes_since("m1", 3, 5)) is None
+
+def test_changes_since_unlogged_latest_version_needs_snapshot_after_grace(change_log):
+    # e.g. bumped by scripts/backfill_movies.py, which doesn't log
+    change_log += logged(2, 3)
+    updated_at = datetime.utcnow() - timedelta(days=1)
+    assert run(changes_since("m1", 3, 4, updated_at)) is None
+    assert run(changes_since("m1", 3, 4)) is None
@@ -0,0 +1,48 @@
+"""
+Tests for the image optimization step in backend/image_pipeline.py
+
+process_image runs in-process here rather than on the worker pool:
+    python -m pytest tests/test_image_pipeline.py
+"""
+
+from PIL import Image
+
+from backend.image_pipeline import process_image
+
+def write_png(path, size, mode="RGB"):
+    Image.new(mode, size, (40, 80, 120, 255)[:len(mode)]).save(path, "PNG")
+    return path
+
+def widths_by_format(result):
+    ladder = {}
+    for variant in result["variants"]:
+        ladder.setdefault(variant["format"], []).append(variant["width"])
+    return ladder
+
+def test_width_ladder_stops_at_master_width(tmp_path):
+    source = write_png(tmp_path / "poster.png", (800, 600))
+
+    result = process_image(str(source), str(tmp_path), "poster", [320, 640, 960])
+
+    assert result["format"] == "JPEG"
+    for widths in widths_by_format(result).values():
+        assert widths == [320, 640, 800]
+
+def test_oversized_master_is_downscaled(tmp_path):
+    source = write_png(tmp_path / "poster.png", (2400, 1200))
+
+    result = process_image(str(source), str(tmp_path), "poster", [640], max_width=1200)
+
+    assert (result["width"], result["height"]) == (1200, 600)
+    for widths in widths_by_format(result).values():
+        assert widths == [640]
+
+def test_no_configured_widths_renders_master_width_only(tmp_path):
+    source = write_png(tmp_path / "poster.png", (500, 300), mode="RGBA")
+
+    result = process_image(str(source), str(tmp_path), "poster", [])
+
+    assert result["format"] == "PNG"
+    assert widths_by_format(result) and all(widths == [500] for widths in widths_by_format(result).values())
+    for variant in result["variants"]:
+        assert (tmp_path / variant["filename"]).stat().st_size == variant["size"]
@@ -0,0 +1,149 @@
+"""
+Tests for the upload storage backends in backend/storage.py
+
+The S3 backend runs against moto's in-process S3 stand-in:
+    pip install moto && python -m pytest tests/test_storage.py
+"""
+
+import os
+import asyncio
+
+import pytest
+
+moto = pytest.importorskip("moto")
+boto3 = pytest.importorskip("boto3")
+requests = pytest.importorskip("requests")
+
+from backend.storage import LocalStorage, S3Storage, StorageError, DirectUploadNotSupported, S3_MIN_PART_SIZE
+
+BUCKET = "movie-sdk-test"
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def read_all(store, key):
+    return b"".join([chunk async for chunk in store.iter_chunks(key)])
+
+def write_file(path, size):
+    data = os.urandom(size)
+    path.write_bytes(data)
+    return data
+
+# Local filesystem backend
+
+def test_local_put_read_delete(tmp_path):
+    store = LocalStorage(tmp_path / "uploads")
+    source = tmp_path / "poster.jpg"
+    data = write_file(source, 4096)
+
+    run(store.put_file("poster.jpg", source, "image/jpeg"))
+
+    assert not source.exists()
+    assert store.url_for("poster.jpg") == "/uploads/poster.jpg"
+    assert run(store.exists("poster.jpg"))
+    assert run(read_all(store, "poster.jpg")) == data
+
+    run(store.delete("poster.jpg"))
+    assert not run(store.exists("poster.jpg"))
+
+def test_local_rejects_keys_outside_root(tmp_path):
+    store = LocalStorage(tmp_path / "uploads")
+    with pytest.raises(StorageError):
+        run(store.delete("../secrets.txt"))
+
+def test_local_has_no_direct_uploads(tmp_path):
+    store = LocalStorage(tmp_path / "uploads")
+    with pytest.raises(DirectUploadNotSupported):
+        run(store.presign_upload("incoming/a.jpg", "image/jpeg", 1024))
+
+# S3-compatible backend
+
+@pytest.fixture
+def s3_store(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield S3Storage(
+            bucket=BUCKET,
+            prefix="uploads/",
+            region="us-east-1",
+            endpoint_url=None,
+            public_url="",
+            part_size=S3_MIN_PART_SIZE,
+            max_concurrency=4
+        )
+
+def test_s3_put_file_sets_metadata_and_removes_source(s3_store, tmp_path):
+    source = tmp_path / "poster.jpg"
+    data = write_file(source, 2048)
+
+    run(s3_store.put_file("poster.jpg", source, "image/jpeg"))
+
+    head = s3_store.client.head_object(Bucket=BUCKET, Key="uploads/poster.jpg")
+    assert head["ContentType"] == "image/jpeg"
+    assert head["CacheControl"] == "public, max-age=31536000, immutable"
+    assert not source.exists()
+    assert run(read_all(s3_store, "poster.jpg")) == data
+    assert s3_store.url_for("poster.jpg") == f"https://{BUCKET}.s3.us-east-1.amazonaws.com/uploads/poster.jpg"
+
+def test_s3_large_files_use_multipart(s3_store, tmp_path):
+    source = tmp_path / "trailer.bin"
+    data = write_file(source, S3_MIN_PART_SIZE * 2 + 1024)
+
+    run(s3_store.put_file("trailer.bin", source, "application/octet-stream"))
+
+    head = s3_store.client.head_object(Bucket=BUCKET, Key="uploads/trailer.bin")
+    assert head["ETag"].strip('"').endswith("-3")  # three parts
+    assert run(read_all(s3_store, "trailer.bin")) == data
+
+def test_s3_local_copy_and_delete(s3_store, tmp_path):
+    source = tmp_path / "logo.png"
+    data = write_file(source, 1000)
+    run(s3_store.put_file("logo.png", source, "image/png"))
+
+    async def copy_then_check():
+        async with s3_store.local_copy("logo.png") as path:
+            assert path.read_bytes() == data
+            return path
+
+    path = run(copy_then_check())
+    assert not path.exists()
+
+    run(s3_store.delete("logo.png"))
+    assert not run(s3_store.exists("logo.png"))
+    with pytest.raises(FileNotFoundError):
+        run(read_all(s3_store, "logo.png"))
+
+def test_s3_presigned_post_upload(s3_store):
+    data = os.urandom(3000)
+    ticket = run(s3_store.presign_upload("incoming/c1/a.png", "image/png", len(data)))
+
+    assert ticket["method"] == "POST"
+    response = requests.post(ticket["url"], data=ticket["fields"], files={"file": ("a.png", data)})
+    assert response.status_code in (200, 201, 204)
+    assert run(read_all(s3_store, "incoming/c1/a.png")) == data
+
+def test_s3_presigned_multipart_upload(s3_store):
+    data = os.urandom(S3_MIN_PART_SIZE + 4096)
+    ticket = run(s3_store.presign_upload("incoming/c1/big.jpg", "image/jpeg", len(data)))
+
+    assert ticket["method"] == "MULTIPART"
+    assert len(ticket["part_urls"]) == 2
+
+    parts = []
+    for index, url in enumerate(ticket["part_urls"]):
+        chunk = data[index * ticket["part_size"]:(index + 1) * ticket["part_size"]]
+        response = requests.put(url, data=chunk)
+        assert response.status_code == 200
+        parts.append({"part_number": index + 1, "etag": response.headers["ETag"]})
+
+    run(s3_store.complete_multipart_upload("incoming/c1/big.jpg", ticket["upload_id"], parts))
+    assert run(read_all(s3_store, "incoming/c1/big.jpg")) == data
+
+def test_s3_abort_multipart_upload(s3_store):
+    ticket = run(s3_store.presign_upload("incoming/c1/gone.jpg", "image/jpeg", S3_MIN_PART_SIZE + 1))
+    run(s3_store.abort_multipart_upload("incoming/c1/gone.jpg", ticket["upload_id"]))
+
+    uploads = s3_store.client.list_multipart_uploads(Bucket=BUCKET)
+    assert not uploads.get("Uploads")